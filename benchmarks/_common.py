@@ -0,0 +1,146 @@
+"""Shared plumbing for the triopg benchmarks.
+
+Every benchmark script prints one JSON object per measurement on stdout
+(or to ``--output``), so results can be diffed and tracked over time.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import platform
+import sys
+import tempfile
+import time
+
+import asyncpg
+import trio
+from asyncpg.cluster import Cluster
+
+import triopg
+
+
+@contextlib.contextmanager
+def temporary_cluster():
+    """Same throwaway cluster as the ``cluster`` fixture of the test suite"""
+    cluster_dir = tempfile.mkdtemp()
+    cluster = Cluster(cluster_dir)
+
+    cluster.init()
+    try:
+        cluster.start(port='dynamic')
+        yield cluster
+        cluster.stop()
+    finally:
+        cluster.destroy()
+
+
+@contextlib.contextmanager
+def connection_specs(dsn=None):
+    """Yield asyncpg connection kwargs, starting a local cluster if no `dsn`"""
+    if dsn:
+        yield {'dsn': dsn}
+    else:
+        with temporary_cluster() as cluster:
+            yield {'database': 'postgres', **cluster.get_connection_spec()}
+
+
+def argument_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--dsn',
+        help='benchmark against this server instead of a temporary cluster'
+    )
+    parser.add_argument(
+        '--iterations',
+        type=int,
+        default=1000,
+        help='operations per worker (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--output',
+        type=argparse.FileType('w'),
+        default=sys.stdout,
+        help='write JSON lines here instead of stdout'
+    )
+    return parser
+
+
+def csv_list(cast):
+    """argparse `type` parsing a comma separated list"""
+    return lambda value: [cast(item) for item in value.split(',')]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(
+        len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1)))
+    )
+    return sorted_values[index]
+
+
+def summarize(benchmark, impl, timings, elapsed, **extra):
+    """Build a result record from per-operation `timings` (in seconds)"""
+    timings = sorted(timings)
+    ops = len(timings)
+    return {
+        'benchmark': benchmark,
+        'impl': impl,
+        'operations': ops,
+        'elapsed_s': round(elapsed, 6),
+        'ops_per_s': round(ops / elapsed, 1) if elapsed else None,
+        'mean_us': round(sum(timings) / ops * 1e6, 1) if ops else None,
+        'p50_us': round(percentile(timings, 0.50) * 1e6, 1),
+        'p99_us': round(percentile(timings, 0.99) * 1e6, 1),
+        **extra,
+    }
+
+
+class Reporter:
+    def __init__(self, output):
+        self._output = output
+        self._meta = {
+            'python': platform.python_version(),
+            'trio': trio.__version__,
+            'asyncpg': asyncpg.__version__,
+            'triopg': triopg.__version__,
+        }
+
+    def report(self, record):
+        self._output.write(json.dumps({**record, **self._meta}) + '\n')
+        self._output.flush()
+
+
+async def timed_trio_workers(concurrency, iterations, operation):
+    """Run `operation(worker_index)` `iterations` times in each trio worker
+
+    Return ``(timings, elapsed)``.
+    """
+    timings = []
+
+    async def _worker(index):
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await operation(index)
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    async with trio.open_nursery() as nursery:
+        for index in range(concurrency):
+            nursery.start_soon(_worker, index)
+    return timings, time.perf_counter() - start
+
+
+async def timed_asyncio_workers(concurrency, iterations, operation):
+    """asyncio flavor of `timed_trio_workers`, must run on the asyncio side"""
+    timings = []
+
+    async def _worker(index):
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await operation(index)
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_worker(index) for index in range(concurrency)))
+    return timings, time.perf_counter() - start
@@ -0,0 +1,126 @@
+"""Measure the cost of a warm pool acquire.
+
+A warm acquire reuses the connection proxy cached by the pool. A cold one
+goes through a copy of the proxy triopg used before proxies were cached: a
+new proxy per acquire, with method wrappers built on first access by
+``__getattr__``::
+
+    python benchmarks/bench_acquire.py --iterations 5000
+
+Latency and memory are measured in separate runs since tracing allocations
+slows everything down. Memory is what triopg code (or the legacy proxy
+copied here) allocates per acquire, measured while keeping every returned
+connection proxy alive.
+"""
+import os
+import time
+import tracemalloc
+from functools import wraps
+from inspect import iscoroutinefunction
+
+import trio_asyncio
+
+import triopg
+from _common import Reporter, argument_parser, connection_specs, summarize
+
+
+class LegacyConnectionProxy:
+    def __init__(self, asyncpg_conn):
+        self._asyncpg_conn = asyncpg_conn
+
+    def __getattr__(self, attr):
+        target = getattr(self._asyncpg_conn, attr)
+
+        if iscoroutinefunction(target):
+
+            @wraps(target)
+            @trio_asyncio.aio_as_trio
+            async def wrapper(*args, **kwargs):
+                return await target(*args, **kwargs)
+
+            setattr(self, attr, wrapper)
+
+            return wrapper
+
+        return target
+
+
+class LegacyAcquireContext:
+    def __init__(self, asyncpg_acquire_context):
+        self._asyncpg_acquire_context = asyncpg_acquire_context
+
+    @trio_asyncio.aio_as_trio
+    async def __aenter__(self, *args):
+        proxy = await self._asyncpg_acquire_context.__aenter__(*args)
+        return LegacyConnectionProxy(proxy._con)
+
+    @trio_asyncio.aio_as_trio
+    async def __aexit__(self, *args):
+        return await self._asyncpg_acquire_context.__aexit__(*args)
+
+
+async def acquire_and_query(pool, cold):
+    if cold:
+        acquire_context = LegacyAcquireContext(pool._asyncpg_pool.acquire())
+    else:
+        acquire_context = pool.acquire()
+    async with acquire_context as conn:
+        await conn.fetchval('SELECT 1')
+    return conn
+
+
+def triopg_traces(snapshot):
+    patterns = [os.path.join(os.path.dirname(triopg.__file__), '*'), __file__]
+    return snapshot.filter_traces(
+        [tracemalloc.Filter(True, pattern) for pattern in patterns]
+    )
+
+
+async def main(args, specs):
+    reporter = Reporter(args.output)
+    async with triopg.create_pool(min_size=1, max_size=1, **specs) as pool:
+        for mode in ('cold', 'warm'):
+            cold = mode == 'cold'
+            # Warm up asyncpg's statement cache and the proxy cache
+            await acquire_and_query(pool, cold=False)
+
+            timings = []
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                op_start = time.perf_counter()
+                await acquire_and_query(pool, cold)
+                timings.append(time.perf_counter() - op_start)
+            elapsed = time.perf_counter() - start
+
+            kept = []
+            tracemalloc.start()
+            try:
+                before = triopg_traces(tracemalloc.take_snapshot())
+                for _ in range(args.iterations):
+                    kept.append(await acquire_and_query(pool, cold))
+                after = triopg_traces(tracemalloc.take_snapshot())
+            finally:
+                tracemalloc.stop()
+            diff = after.compare_to(before, 'filename')
+            alloc_bytes = sum(stat.size_diff for stat in diff)
+            alloc_blocks = sum(stat.count_diff for stat in diff)
+
+            reporter.report(
+                summarize(
+                    'acquire',
+                    'legacy proxy' if cold else 'triopg.create_pool',
+                    timings,
+                    elapsed,
+                    mode=mode,
+                    alloc_bytes_per_op=round(alloc_bytes / args.iterations),
+                    alloc_blocks_per_op=round(
+                        alloc_blocks / args.iterations, 2
+                    ),
+                )
+            )
+
+
+if __name__ == '__main__':
+    args = argument_parser(__doc__.splitlines()[0]).parse_args()
+    with connection_specs(args.dsn) as specs:
+        trio_asyncio.run(main, args, specs)
@@ -0,0 +1,197 @@
+"""Measure the cost of the trio_asyncio bridge crossed by every triopg call.
+
+The same operations are run against raw asyncpg (on the asyncio side, no
+bridge involved) and through ``triopg.connect``/``triopg.create_pool``::
+
+    python benchmarks/bench_bridge.py --concurrency 1,8,32 > bridge.jsonl
+
+Each worker gets its own connection for the ``connect`` flavors, while the
+pool flavors share a pool of ``concurrency`` connections. The trio native
+pool (``create_pool(trio_native=True)``) is measured next to the asyncpg
+backed one.
+"""
+from contextlib import AsyncExitStack
+
+import asyncpg
+import trio_asyncio
+
+import triopg
+from _common import (
+    Reporter,
+    argument_parser,
+    connection_specs,
+    csv_list,
+    summarize,
+    timed_asyncio_workers,
+    timed_trio_workers,
+)
+
+FETCH_QUERY = 'SELECT * FROM generate_series(1, $1)'
+INSERT_QUERY = 'INSERT INTO triopg_bench (value) VALUES ($1)'
+EXECUTEMANY_ARGS = [(i, ) for i in range(10)]
+
+# Written once for both flavors: asyncpg and triopg share the same API,
+# only the kind of event loop the coroutine runs on differs.
+
+
+async def op_fetch(conn):
+    await conn.fetch(FETCH_QUERY, 10)
+
+
+async def op_fetchval(conn):
+    await conn.fetchval('SELECT $1::int', 1)
+
+
+async def op_execute(conn):
+    await conn.execute('SELECT 1')
+
+
+async def op_executemany(conn):
+    await conn.executemany(INSERT_QUERY, EXECUTEMANY_ARGS)
+
+
+async def op_cursor(conn):
+    async with conn.transaction():
+        async for _ in conn.cursor(FETCH_QUERY, 100):
+            pass
+
+
+async def op_prepare(conn):
+    stmt = await conn.prepare('SELECT $1::int')
+    await stmt.fetchval(1)
+
+
+OPERATIONS = {
+    'fetch': op_fetch,
+    'fetchval': op_fetchval,
+    'execute': op_execute,
+    'executemany': op_executemany,
+    'cursor': op_cursor,
+    'prepare': op_prepare,
+}
+# Operations also available as shortcuts directly on the pool objects
+POOL_SHORTCUTS = {'fetch', 'fetchval', 'execute', 'executemany'}
+
+IMPLS = (
+    'asyncpg.connect',
+    'asyncpg.create_pool',
+    'triopg.connect',
+    'triopg.create_pool',
+    'triopg.create_pool[trio_native]',
+)
+
+
+def _pool_operation(name, pool):
+    operation = OPERATIONS[name]
+    if name in POOL_SHORTCUTS:
+        return lambda index: operation(pool)
+
+    async def _acquire_and_run(index):
+        async with pool.acquire() as conn:
+            await operation(conn)
+
+    return _acquire_and_run
+
+
+@trio_asyncio.aio_as_trio
+async def run_asyncpg(name, specs, concurrency, iterations, pooled):
+    operation = OPERATIONS[name]
+    if pooled:
+        async with asyncpg.create_pool(
+                min_size=concurrency, max_size=concurrency, **specs
+        ) as pool:
+            return await timed_asyncio_workers(
+                concurrency, iterations, _pool_operation(name, pool)
+            )
+
+    conns = [await asyncpg.connect(**specs) for _ in range(concurrency)]
+    try:
+        return await timed_asyncio_workers(
+            concurrency, iterations, lambda index: operation(conns[index])
+        )
+    finally:
+        for conn in conns:
+            await conn.close()
+
+
+async def run_triopg(
+        name, specs, concurrency, iterations, pooled, trio_native=False
+):
+    operation = OPERATIONS[name]
+    if pooled:
+        async with triopg.create_pool(
+                min_size=concurrency,
+                max_size=concurrency,
+                trio_native=trio_native,
+                **specs
+        ) as pool:
+            return await timed_trio_workers(
+                concurrency, iterations, _pool_operation(name, pool)
+            )
+
+    async with AsyncExitStack() as stack:
+        conns = [
+            await stack.enter_async_context(triopg.connect(**specs))
+            for _ in range(concurrency)
+        ]
+        return await timed_trio_workers(
+            concurrency, iterations, lambda index: operation(conns[index])
+        )
+
+
+RUNNERS = {
+    'asyncpg.connect': lambda *args: run_asyncpg(*args, False),
+    'asyncpg.create_pool': lambda *args: run_asyncpg(*args, True),
+    'triopg.connect': lambda *args: run_triopg(*args, False),
+    'triopg.create_pool': lambda *args: run_triopg(*args, True),
+    'triopg.create_pool[trio_native]':
+    lambda *args: run_triopg(*args, True, trio_native=True),
+}
+
+
+async def main(args, specs):
+    reporter = Reporter(args.output)
+    async with triopg.connect(**specs) as conn:
+        await conn.execute(
+            'CREATE UNLOGGED TABLE IF NOT EXISTS triopg_bench (value int)'
+        )
+
+    for name in args.benchmarks:
+        for concurrency in args.concurrency:
+            for impl in args.impls:
+                timings, elapsed = await RUNNERS[impl](
+                    name, specs, concurrency, args.iterations
+                )
+                reporter.report(
+                    summarize(
+                        name, impl, timings, elapsed, concurrency=concurrency
+                    )
+                )
+
+    async with triopg.connect(**specs) as conn:
+        await conn.execute('DROP TABLE triopg_bench')
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        '--benchmarks',
+        type=csv_list(str),
+        default=list(OPERATIONS),
+        help='comma separated subset of: %s' % ', '.join(OPERATIONS)
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=csv_list(int),
+        default=[1, 8, 32],
+        help='comma separated concurrency levels (default: 1,8,32)'
+    )
+    parser.add_argument(
+        '--impls',
+        type=csv_list(str),
+        default=list(IMPLS),
+        help='comma separated subset of: %s' % ', '.join(IMPLS)
+    )
+    args = parser.parse_args()
+    with connection_specs(args.dsn) as specs:
+        trio_asyncio.run(main, args, specs)
@@ -0,0 +1,139 @@
+"""Measure the peak memory of fetching a large result set.
+
+Each implementation runs in its own process, whose peak RSS after the query
+is compared to the one before it::
+
+    python benchmarks/bench_fetch_memory.py --rows 500000
+
+``pool.fetch`` holds all the rows at once, ``pool.fetch(max_bytes)`` gives
+up as soon as the rows exceed the guard, and ``pool.stream`` only holds a
+chunk of rows at a time.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import trio_asyncio
+
+import triopg
+from _common import Reporter, argument_parser, connection_specs, csv_list
+
+IMPLS = ('pool.fetch', 'pool.fetch(max_bytes)', 'pool.stream')
+
+SCHEMA = """
+    DROP TABLE IF EXISTS bench_large;
+    CREATE TABLE bench_large (id int, payload text);
+"""
+
+FILL_QUERY = """
+    INSERT INTO bench_large SELECT i, repeat('x', 100)
+    FROM generate_series(1, $1) i
+"""
+
+QUERY = 'SELECT id, payload FROM bench_large'
+
+
+def peak_rss_mb():
+    # In kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def fill_table(specs, rows):
+    async with triopg.connect(**specs) as conn:
+        await conn.execute(SCHEMA)
+        await conn.execute(FILL_QUERY, rows)
+
+
+async def measure(args, specs):
+    async with triopg.create_pool(min_size=1, max_size=1, **specs) as pool:
+        await pool.fetchval('SELECT 1')
+        before = peak_rss_mb()
+        start = time.perf_counter()
+        rows = 0
+        outcome = 'ok'
+        if args.impl == 'pool.fetch':
+            rows = len(await pool.fetch(QUERY))
+        elif args.impl == 'pool.fetch(max_bytes)':
+            try:
+                rows = len(await pool.fetch(QUERY, max_bytes=args.max_bytes))
+            except triopg.ResultTooLargeError:
+                outcome = 'ResultTooLargeError'
+        else:
+            stream = pool.stream(QUERY, chunk_size=args.chunk_size)
+            async with stream as records:
+                async for _ in records:
+                    rows += 1
+        elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    return {
+        'benchmark': 'large_fetch_memory',
+        'impl': args.impl,
+        'rows': rows,
+        'outcome': outcome,
+        'elapsed_s': round(elapsed, 6),
+        'rss_before_mb': round(before, 1),
+        'peak_rss_mb': round(peak, 1),
+        'rss_growth_mb': round(peak - before, 1),
+        'max_bytes': args.max_bytes,
+        'chunk_size': args.chunk_size,
+    }
+
+
+def run_impl(args, specs, impl):
+    # ru_maxrss never goes down, each implementation needs a fresh process
+    command = [sys.executable, __file__, '--impl', impl]
+    command += ['--specs', json.dumps(specs)]
+    command += ['--max-bytes', str(args.max_bytes)]
+    command += ['--chunk-size', str(args.chunk_size)]
+    output = subprocess.run(
+        command, check=True, stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout
+    return json.loads(output)
+
+
+def main(args, specs):
+    reporter = Reporter(args.output)
+    trio_asyncio.run(fill_table, specs, args.rows)
+    for impl in args.impls:
+        reporter.report(run_impl(args, specs, impl))
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        '--rows',
+        type=int,
+        default=500000,
+        help='rows in the result set (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--max-bytes',
+        type=int,
+        default=50 * 2**20,
+        help='fetch guard in bytes (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=1000,
+        help='rows per round trip of pool.stream (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--impls',
+        type=csv_list(str),
+        default=list(IMPLS),
+        help='comma separated implementations (default: all)'
+    )
+    # Set when running a single implementation in a child process
+    parser.add_argument('--impl', help=argparse.SUPPRESS)
+    parser.add_argument('--specs', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.impl:
+        result = trio_asyncio.run(measure, args, json.loads(args.specs))
+        print(json.dumps(result))
+    else:
+        with connection_specs(args.dsn) as specs:
+            main(args, specs)
@@ -0,0 +1,122 @@
+"""Measure the cold-start latency of a pool, with and without warm-up.
+
+Each round creates a new pool, then every connection runs each of a few
+"hot" queries once, concurrently, as the first requests after a deploy
+would. Without warm-up, those first queries prepare their statement and
+introspect the custom types they use under traffic. With
+``warm_up_queries``, that work is done by ``create_pool`` before it
+returns::
+
+    python benchmarks/bench_warm_up.py --rounds 20 --pool-size 10
+
+``pool_startup`` is the time taken to open the pool, ``first_queries`` the
+latency of the queries run right after.
+"""
+import time
+
+import trio
+import trio_asyncio
+
+import triopg
+from _common import Reporter, argument_parser, connection_specs, summarize
+
+SCHEMA = """
+    DROP TABLE IF EXISTS bench_users;
+    DROP TYPE IF EXISTS bench_mood, bench_address;
+    CREATE TYPE bench_mood AS ENUM ('sad', 'ok', 'happy');
+    CREATE TYPE bench_address AS (street text, city text);
+    CREATE TABLE bench_users (
+        id int PRIMARY KEY,
+        mood bench_mood,
+        address bench_address,
+        tags text[]
+    );
+    INSERT INTO bench_users
+    SELECT i, 'ok', ROW('street', 'city')::bench_address, ARRAY['a', 'b']
+    FROM generate_series(1, 100) i;
+"""
+
+HOT_QUERIES = [
+    'SELECT mood FROM bench_users WHERE id = $1',
+    'SELECT address FROM bench_users WHERE id = $1',
+    'SELECT tags FROM bench_users WHERE id = $1',
+    'SELECT id, mood, address, tags FROM bench_users WHERE id = $1',
+]
+
+
+async def first_queries(pool, pool_size):
+    timings = []
+
+    async def run_hot_queries():
+        async with pool.acquire() as conn:
+            for query in HOT_QUERIES:
+                start = time.perf_counter()
+                await conn.fetchrow(query, 1)
+                timings.append(time.perf_counter() - start)
+
+    async with trio.open_nursery() as nursery:
+        for _ in range(pool_size):
+            nursery.start_soon(run_hot_queries)
+    return timings
+
+
+async def main(args, specs):
+    reporter = Reporter(args.output)
+    async with triopg.connect(**specs) as conn:
+        await conn.execute(SCHEMA)
+
+    for trio_native in (False, True):
+        for mode in ('cold', 'warm'):
+            warm_up_queries = HOT_QUERIES if mode == 'warm' else None
+            startup_timings = []
+            query_timings = []
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                startup_start = time.perf_counter()
+                pool = triopg.create_pool(
+                    trio_native=trio_native,
+                    min_size=args.pool_size,
+                    max_size=args.pool_size,
+                    warm_up_queries=warm_up_queries,
+                    **specs
+                )
+                async with pool:
+                    startup_timings.append(time.perf_counter() - startup_start)
+                    query_timings += await first_queries(pool, args.pool_size)
+            elapsed = time.perf_counter() - start
+
+            impl = 'trio native pool' if trio_native else 'asyncpg pool'
+            for benchmark, timings in (
+                ('pool_startup', startup_timings),
+                ('first_queries', query_timings),
+            ):
+                reporter.report(
+                    summarize(
+                        benchmark,
+                        impl,
+                        timings,
+                        elapsed,
+                        mode=mode,
+                        pool_size=args.pool_size,
+                        max_us=round(max(timings) * 1e6, 1),
+                    )
+                )
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        '--rounds',
+        type=int,
+        default=20,
+        help='pools created per mode (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        default=10,
+        help='connections opened by each pool (default: %(default)s)'
+    )
+    args = parser.parse_args()
+    with connection_specs(args.dsn) as specs:
+        trio_asyncio.run(main, args, specs)
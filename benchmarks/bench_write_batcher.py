@@ -0,0 +1,89 @@
+"""Measure small concurrent writes, one commit each or group committed.
+
+Every worker inserts one row at a time, either with ``pool.execute`` (a
+pool acquire, a bridge crossing and a commit per row) or through a
+``pool.write_batcher()`` shared by all workers::
+
+    python benchmarks/bench_write_batcher.py --concurrency 1,16,64
+
+``synchronous_commit`` is left on, so each commit waits for its WAL flush
+as it would in production.
+"""
+import trio_asyncio
+
+import triopg
+from _common import (
+    Reporter,
+    argument_parser,
+    connection_specs,
+    csv_list,
+    summarize,
+    timed_trio_workers,
+)
+
+SCHEMA = """
+    DROP TABLE IF EXISTS bench_events;
+    CREATE TABLE bench_events (worker int, value text);
+"""
+
+INSERT_QUERY = 'INSERT INTO bench_events VALUES ($1, $2)'
+
+
+async def main(args, specs):
+    reporter = Reporter(args.output)
+    async with triopg.connect(**specs) as conn:
+        await conn.execute(SCHEMA)
+
+    pool = triopg.create_pool(
+        min_size=args.pool_size, max_size=args.pool_size, **specs
+    )
+    async with pool:
+        for concurrency in args.concurrency:
+            for impl in ('pool.execute', 'pool.write_batcher'):
+                if impl == 'pool.execute':
+                    timings, elapsed = await timed_trio_workers(
+                        concurrency, args.iterations,
+                        lambda index: pool.execute(INSERT_QUERY, index, 'x')
+                    )
+                else:
+                    batcher = pool.write_batcher(max_delay=args.max_delay)
+                    async with batcher:
+                        timings, elapsed = await timed_trio_workers(
+                            concurrency, args.iterations, lambda index:
+                            batcher.execute(INSERT_QUERY, index, 'x')
+                        )
+                reporter.report(
+                    summarize(
+                        'small_writes',
+                        impl,
+                        timings,
+                        elapsed,
+                        concurrency=concurrency,
+                        pool_size=args.pool_size,
+                    )
+                )
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        '--concurrency',
+        type=csv_list(int),
+        default=[1, 16, 64],
+        help='comma separated numbers of workers (default: 1,16,64)'
+    )
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        default=10,
+        help='connections in the pool (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--max-delay',
+        type=float,
+        default=0.002,
+        help='write batcher max_delay in seconds (default: %(default)s)'
+    )
+    args = parser.parse_args()
+    with connection_specs(args.dsn) as specs:
+        trio_asyncio.run(main, args, specs)
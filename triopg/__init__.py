@@ -1,7 +1,16 @@
 """Top-level package for triopg."""
 
 from ._version import __version__
-from ._triopg import connect, create_pool, NOTIFY_OVERFLOW
+from ._triopg import connect, create_pool, NOTIFY_OVERFLOW, TrioNativePool
+from ._batching import WriteBatcher
+from ._limits import ResultTooLargeError
+from ._notify import NotificationHub
+from ._result_cache import ResultCache, ResultCacheStatistics
+from ._routing import RoutingPool
+from ._sizing import PoolResize
+from ._statements import StatementCacheStatistics
+from ._stats import Histogram, PoolStatistics
+from ._tracing import QueryEvent, QueryTracer
 from .exceptions import *  # NOQA
 
 __all__ = (
@@ -9,4 +18,17 @@ __all__ = (
     'connect',
     'create_pool',
     'NOTIFY_OVERFLOW',
+    'TrioNativePool',
+    'NotificationHub',
+    'WriteBatcher',
+    'ResultCache',
+    'ResultCacheStatistics',
+    'ResultTooLargeError',
+    'RoutingPool',
+    'Histogram',
+    'PoolStatistics',
+    'PoolResize',
+    'StatementCacheStatistics',
+    'QueryEvent',
+    'QueryTracer',
 ) + exceptions.__all__  # NOQA
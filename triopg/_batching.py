@@ -0,0 +1,169 @@
+from itertools import groupby
+
+import trio
+import asyncpg
+
+# Errors that can be caused by a single statement of a batch
+_STATEMENT_ERRORS = (asyncpg.PostgresError, asyncpg.InterfaceError)
+
+
+class _BatchItem:
+    __slots__ = ('statement', 'args', 'submitted_at', 'done', 'error')
+
+    def __init__(self, statement, args):
+        self.statement = statement
+        self.args = args
+        self.submitted_at = trio.current_time()
+        self.done = trio.Event()
+        self.error = None
+
+
+def _statement_of(item):
+    return item.statement
+
+
+def _cancelled_error():
+    return asyncpg.InterfaceError(
+        'write batcher was cancelled before committing the statement'
+    )
+
+
+class WriteBatcher:
+    """Commit statements submitted by concurrent tasks together
+
+    Statements passed to `execute` are gathered for up to `max_delay`
+    seconds after the first one (or until `max_batch_size` of them are
+    waiting), then run in a single transaction on one connection of `pool`.
+    Consecutive submissions of the same statement are run with a single
+    `executemany`.
+
+    If the batch fails, it is run again statement by statement, each in its
+    own savepoint, so that only the failing ones raise (the others are still
+    committed together).
+
+    For example:
+
+    async with pool.write_batcher() as batcher:
+        async with trio.open_nursery() as nursery:
+            for event in events:
+                nursery.start_soon(batcher.execute, 'INSERT ...', *event)
+    """
+
+    def __init__(self, pool, *, max_delay=0.002, max_batch_size=100):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size is expected to be at least 1')
+        self._pool = pool
+        self._max_delay = max_delay
+        self._max_batch_size = max_batch_size
+        self._pending = []
+        self._wakeup = trio.Event()
+        self._closing = False
+        self._nursery = None
+        self._nursery_manager = None
+
+    async def execute(self, statement, *args):
+        """Run `statement` with `args` in the next batch
+
+        Return once the batch is committed (None, unlike
+        `TrioConnectionProxy.execute`), or raise the statement's own error
+        or the one that prevented the batch from being committed.
+
+        Cancelling the call withdraws the statement only if its batch didn't
+        start running yet.
+        """
+        if self._nursery is None or self._closing:
+            raise asyncpg.InterfaceError('write batcher is closed')
+        item = _BatchItem(statement, args)
+        self._pending.append(item)
+        self._wakeup.set()
+        try:
+            await item.done.wait()
+        except trio.Cancelled:
+            if not item.done.is_set():
+                try:
+                    self._pending.remove(item)
+                except ValueError:
+                    pass  # Already running
+            raise
+        if item.error is not None:
+            raise item.error
+
+    async def _wait(self):
+        self._wakeup = trio.Event()
+        await self._wakeup.wait()
+
+    async def _run(self):
+        while True:
+            while not self._pending:
+                if self._closing:
+                    return
+                await self._wait()
+            if not self._closing:
+                deadline = self._pending[0].submitted_at + self._max_delay
+                with trio.move_on_at(deadline):
+                    while (len(self._pending) < self._max_batch_size
+                           and not self._closing):
+                        await self._wait()
+            batch = self._pending[:self._max_batch_size]
+            del self._pending[:self._max_batch_size]
+            await self._commit(batch)
+
+    async def _commit(self, batch):
+        try:
+            async with self._pool.acquire() as conn:
+                try:
+                    async with conn.transaction():
+                        await self._execute_batch(conn, batch)
+                except _STATEMENT_ERRORS:
+                    async with conn.transaction():
+                        await self._execute_one_by_one(conn, batch)
+        except Exception as exc:
+            # Nothing was committed
+            for item in batch:
+                if item.error is None:
+                    item.error = exc
+        except BaseException:
+            for item in batch:
+                if item.error is None:
+                    item.error = _cancelled_error()
+            raise
+        finally:
+            for item in batch:
+                item.done.set()
+
+    async def _execute_batch(self, conn, batch):
+        for statement, items in groupby(batch, key=_statement_of):
+            items = list(items)
+            if len(items) == 1:
+                await conn.execute(statement, *items[0].args)
+            else:
+                args = [item.args for item in items]
+                await conn.executemany(statement, args)
+
+    async def _execute_one_by_one(self, conn, batch):
+        for item in batch:
+            try:
+                async with conn.transaction():
+                    await conn.execute(item.statement, *item.args)
+            except _STATEMENT_ERRORS as exc:
+                item.error = exc
+
+    async def __aenter__(self):
+        nursery_manager = trio.open_nursery()
+        self._nursery = await nursery_manager.__aenter__()
+        self._nursery_manager = nursery_manager
+        self._nursery.start_soon(self._run)
+        return self
+
+    async def __aexit__(self, *exc):
+        # Commit what is still pending before returning
+        self._closing = True
+        self._wakeup.set()
+        try:
+            return await self._nursery_manager.__aexit__(*exc)
+        finally:
+            self._nursery = None
+            for item in self._pending:
+                item.error = _cancelled_error()
+                item.done.set()
+            self._pending.clear()
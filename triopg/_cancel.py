@@ -0,0 +1,32 @@
+import trio
+
+# Time given to a connection interrupted by a trio cancellation to become
+# usable again (the server acknowledging the cancel request, then the
+# rollback or reset), after which it is terminated
+CANCEL_RECOVERY_TIMEOUT = 5.0
+
+# asyncio only keeps weak references to tasks, the background cleanups are
+# kept alive here until they are done
+_background_tasks = set()
+
+
+def _is_cancelled(exc_value):
+    return isinstance(exc_value, trio.Cancelled)
+
+
+def _aio_spawn(loop, aio_coroutine):
+    """Run `aio_coroutine` as an asyncio task nobody waits for
+
+    Its exceptions are dropped: it is only used for cleanups that terminate
+    the connection when they fail.
+    """
+
+    async def run():
+        try:
+            await aio_coroutine
+        except Exception:
+            pass
+
+    task = loop.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
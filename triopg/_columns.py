@@ -0,0 +1,116 @@
+from array import array
+
+import trio_asyncio
+
+from ._tracing import QueryEvent, _aio_timed_call, _trace_query
+
+# Rows fetched per round trip by `fetch_columns`
+DEFAULT_COLUMNS_CHUNK_SIZE = 10000
+
+# Fixed width Postgres types, stored as `array.array` of this typecode (or
+# NumPy arrays of this dtype) instead of lists of Python objects
+_FIXED_WIDTH_TYPES = {
+    'bool': ('B', 'bool'),
+    'int2': ('h', 'int16'),
+    'int4': ('i', 'int32'),
+    'int8': ('q', 'int64'),
+    'oid': ('I', 'uint32'),
+    'float4': ('f', 'float32'),
+    'float8': ('d', 'float64'),
+}
+
+
+class _ColumnsBuilder:
+    """Transpose chunks of records into columns, on the asyncio side"""
+
+    def __init__(self, attributes):
+        self.names = [attribute.name for attribute in attributes]
+        self.dtypes = []
+        self.columns = []
+        for attribute in attributes:
+            typecode, dtype = _FIXED_WIDTH_TYPES.get(
+                attribute.type.name, (None, None)
+            )
+            self.dtypes.append(dtype)
+            self.columns.append([] if typecode is None else array(typecode))
+        self.rows = 0
+
+    def extend(self, records):
+        self.rows += len(records)
+        for index, values in enumerate(zip(*records)):
+            column = self.columns[index]
+            size = len(column)
+            try:
+                column.extend(values)
+            except TypeError:
+                # NULL in a fixed width column, fall back to Python objects
+                column = column.tolist()[:size]
+                column.extend(values)
+                self.columns[index] = column
+                self.dtypes[index] = None
+
+    def result(self, numpy=False):
+        if numpy:
+            import numpy as np
+            columns = [
+                column if dtype is None else np.frombuffer(column, dtype)
+                for column, dtype in zip(self.columns, self.dtypes)
+            ]
+        else:
+            columns = self.columns
+        return dict(zip(self.names, columns))
+
+
+async def _aio_fetch_columns(get_statement, args, timeout, chunk_size):
+    statement = await get_statement()
+    builder = _ColumnsBuilder(statement.get_attributes())
+    if chunk_size is None:
+        builder.extend(await statement.fetch(*args, timeout=timeout))
+        return builder
+
+    # Cursors only live in transactions
+    conn = statement._connection
+    if conn.is_in_transaction():
+        await _aio_fetch_chunks(builder, statement, args, timeout, chunk_size)
+    else:
+        async with conn.transaction():
+            await _aio_fetch_chunks(
+                builder, statement, args, timeout, chunk_size
+            )
+    return builder
+
+
+async def _aio_fetch_chunks(builder, statement, args, timeout, chunk_size):
+    cursor = await statement.cursor(*args, timeout=timeout)
+    while True:
+        records = await cursor.fetch(chunk_size, timeout=timeout)
+        builder.extend(records)
+        if len(records) < chunk_size:
+            break
+    await cursor._close_portal(timeout)
+
+
+_aio_fetch_columns_call = trio_asyncio.aio_as_trio(_aio_fetch_columns)
+
+
+async def _fetch_columns(
+        tracer, query, get_statement, args, timeout, chunk_size, numpy
+):
+    """Fetch the rows of the statement returned by `get_statement` as columns
+
+    `get_statement` is an asyncio coroutine function returning an asyncpg
+    prepared statement. Records are transposed into columns by chunks of
+    `chunk_size` on the asyncio side, only the columns cross the bridge.
+    """
+    if chunk_size is not None and chunk_size <= 0:
+        raise ValueError('chunk_size is expected to be greater than zero')
+    aio_args = (get_statement, args, timeout, chunk_size)
+    if tracer is None:
+        builder = await _aio_fetch_columns_call(*aio_args)
+    else:
+        event = QueryEvent('fetch_columns', query, len(args))
+        builder = await _trace_query(
+            tracer, event, _aio_timed_call, event, _aio_fetch_columns,
+            aio_args, {}
+        )
+    return builder.result(numpy)
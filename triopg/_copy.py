@@ -0,0 +1,171 @@
+import asyncio
+
+import trio
+import trio_asyncio
+
+# Number of items pulled from a trio async iterable per bridge crossing
+DEFAULT_COPY_CHUNK_SIZE = 1024
+# Bytes of COPY output accumulated on the asyncio side per bridge crossing
+DEFAULT_COPY_OUT_CHUNK_SIZE = 64 * 1024
+# Chunks of COPY output buffered for a slow trio output
+DEFAULT_COPY_OUT_BUFFER_SIZE = 4
+
+
+def _is_async_iterable(obj):
+    return hasattr(obj, '__aiter__')
+
+
+_TRIO_OUTPUTS = (trio.Path, trio.abc.SendStream, trio.abc.SendChannel)
+
+
+def _is_trio_output(obj):
+    return isinstance(obj, _TRIO_OUTPUTS)
+
+
+class _CopyInStream:
+    """Feed a trio async iterable to an asyncpg ``COPY ... FROM STDIN``
+
+    Items are pulled from `source` by a trio task and handed over to the
+    asyncio side by chunks of `chunk_size` through an unbuffered memory
+    channel: at most one chunk is being built while the previous one is
+    written to the server, so a fast producer is throttled by the COPY
+    instead of piling up in memory.
+    """
+
+    def __init__(self, source, chunk_size):
+        if chunk_size <= 0:
+            raise ValueError('chunk_size is expected to be greater than zero')
+        self._source = source
+        self._chunk_size = chunk_size
+        self._send_channel, self._receive_channel = trio.open_memory_channel(0)
+        self._error = None
+        self._exhausted = False
+
+    async def pump(self):
+        async with self._send_channel:
+            chunk = []
+            try:
+                async for item in self._source:
+                    chunk.append(item)
+                    if len(chunk) >= self._chunk_size:
+                        await self._send_channel.send(chunk)
+                        chunk = []
+            except Exception as exc:
+                # Raised from the asyncio side instead, so asyncpg aborts
+                # the COPY cleanly before propagating it
+                self._error = exc
+                return
+            if chunk:
+                await self._send_channel.send(chunk)
+            self._exhausted = True
+
+    async def _aio_chunks(self):
+        receive = trio_asyncio.trio_as_aio(self._receive_channel.receive)
+        while True:
+            try:
+                chunk = await receive()
+            except trio.EndOfChannel:
+                if self._error is not None:
+                    raise self._error
+                if not self._exhausted:
+                    # The pump was cancelled along with the COPY: don't let
+                    # asyncpg commit what was sent so far
+                    raise asyncio.CancelledError()
+                return
+            yield chunk
+
+    async def aio_records(self):
+        async for chunk in self._aio_chunks():
+            for record in chunk:
+                yield record
+
+    async def aio_data(self):
+        async for chunk in self._aio_chunks():
+            yield b''.join(chunk)
+
+
+async def _copy_in_streamed(copy, source_kwarg, source, chunk_size):
+    """Run `copy` with its `source_kwarg` streamed from trio `source`"""
+    if chunk_size is None:
+        chunk_size = DEFAULT_COPY_CHUNK_SIZE
+    stream = _CopyInStream(source, chunk_size)
+    if source_kwarg == 'records':
+        aio_source = stream.aio_records()
+    else:
+        aio_source = stream.aio_data()
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(stream.pump)
+        return await copy(**{source_kwarg: aio_source})
+
+
+class _CopyOutStream:
+    """Feed the output of an asyncpg ``COPY ... TO STDOUT`` to trio
+
+    asyncpg's data is accumulated on the asyncio side and only crosses the
+    bridge by chunks of at least `chunk_size` bytes, into a memory channel
+    of `max_buffer_size` chunks drained by a trio task. Once the channel is
+    full, asyncpg stops reading from the socket and the server is throttled
+    by the trio output.
+    """
+
+    def __init__(self, chunk_size, max_buffer_size):
+        if chunk_size <= 0:
+            raise ValueError('chunk_size is expected to be greater than zero')
+        if max_buffer_size < 0:
+            raise ValueError('max_buffer_size is expected to be positive')
+        self._chunk_size = chunk_size
+        self._send_channel, self._receive_channel = trio.open_memory_channel(
+            max_buffer_size
+        )
+        self._aio_send = trio_asyncio.trio_as_aio(self._send_channel.send)
+        self._pending = []
+        self._pending_size = 0
+
+    def _take_pending(self):
+        chunk = b''.join(self._pending)
+        self._pending.clear()
+        self._pending_size = 0
+        return chunk
+
+    async def aio_sink(self, data):
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if self._pending_size >= self._chunk_size:
+            await self._aio_send(self._take_pending())
+
+    async def finish(self):
+        async with self._send_channel:
+            if self._pending:
+                await self._send_channel.send(self._take_pending())
+
+    async def drain(self, write):
+        async with self._receive_channel:
+            async for chunk in self._receive_channel:
+                await write(chunk)
+
+
+async def _copy_out_streamed(copy, output, chunk_size, max_buffer_size):
+    """Run `copy` with its output written to trio `output`"""
+    if isinstance(output, trio.Path):
+        async with await output.open('wb') as file:
+            return await _copy_out_streamed(
+                copy, file, chunk_size, max_buffer_size
+            )
+    if isinstance(output, trio.abc.SendChannel):
+        write = output.send
+    elif isinstance(output, trio.abc.SendStream):
+        write = output.send_all
+    else:
+        # Opened trio.Path
+        write = output.write
+
+    if chunk_size is None:
+        chunk_size = DEFAULT_COPY_OUT_CHUNK_SIZE
+    if max_buffer_size is None:
+        max_buffer_size = DEFAULT_COPY_OUT_BUFFER_SIZE
+    stream = _CopyOutStream(chunk_size, max_buffer_size)
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(stream.drain, write)
+        result = await copy(output=stream.aio_sink)
+        await stream.finish()
+    return result
@@ -0,0 +1,45 @@
+import asyncio
+import inspect
+import math
+from functools import wraps
+
+import trio
+
+
+def _takes_timeout(target):
+    """Whether `target` accepts a keyword `timeout` argument"""
+    try:
+        parameter = inspect.signature(target).parameters.get('timeout')
+    except (TypeError, ValueError):
+        return False
+    return parameter is not None and parameter.kind in (
+        parameter.KEYWORD_ONLY, parameter.POSITIONAL_OR_KEYWORD
+    )
+
+
+def _bounded_by_deadline(f):
+    """Cap the `timeout` argument of async `f` with the trio deadline
+
+    asyncpg then gives up on the query (and cancels it on the server) on its
+    own, on the asyncio side, when nobody is waiting for it any more. If it
+    does so because of the deadline, the `asyncio.TimeoutError` is turned
+    into the `trio.Cancelled` of the expiring cancel scope.
+    """
+
+    @wraps(f)
+    async def wrapper(*args, **kwargs):
+        deadline = trio.current_effective_deadline()
+        if deadline == math.inf:
+            return await f(*args, **kwargs)
+        remaining = max(deadline - trio.current_time(), 0)
+        timeout = kwargs.get('timeout')
+        if timeout is not None and timeout <= remaining:
+            return await f(*args, **kwargs)
+        kwargs['timeout'] = remaining
+        try:
+            return await f(*args, **kwargs)
+        except asyncio.TimeoutError:
+            await trio.sleep_until(deadline)
+            raise
+
+    return wrapper
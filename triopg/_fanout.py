@@ -0,0 +1,88 @@
+import math
+
+import trio
+from async_generator import asynccontextmanager
+
+from ._rows import _is_row_class
+
+FETCH_METHODS = ('fetch', 'fetchrow', 'fetchval')
+
+
+async def _in_order(receive_channel, window):
+    # Results completed ahead of their turn wait here, the window bounds how
+    # many of them there can be
+    completed = {}
+    next_index = 0
+    async for index, result in receive_channel:
+        completed[index] = result
+        while next_index in completed:
+            result = completed.pop(next_index)
+            next_index += 1
+            window.release()
+            yield result
+
+
+async def _as_completed(receive_channel, window):
+    async for index, result in receive_channel:
+        window.release()
+        yield index, result
+
+
+@asynccontextmanager
+async def _map(pool, query, args, concurrency, ordered, method, kwargs):
+    if method not in FETCH_METHODS:
+        raise ValueError(
+            'method is expected to be one of {}'.format(
+                ', '.join(FETCH_METHODS)
+            )
+        )
+    if concurrency is None:
+        concurrency = pool.statistics().max_size
+    elif concurrency <= 0:
+        raise ValueError('concurrency is expected to be greater than zero')
+    prepare_kwargs = {}
+    record_class = kwargs.get('record_class')
+    if record_class is not None and not _is_row_class(record_class):
+        # asyncpg sets the record class of a statement when preparing it
+        kwargs = dict(kwargs)
+        prepare_kwargs['record_class'] = kwargs.pop('record_class')
+    if hasattr(args, '__len__'):
+        # No need to hold more connections than there are queries
+        concurrency = max(min(concurrency, len(args)), 1)
+    # Queries running or waiting to be consumed (the results channel is
+    # unbounded, but never holds more than that)
+    window = trio.Semaphore(2 * concurrency)
+    send_items, receive_items = trio.open_memory_channel(0)
+    send_results, receive_results = trio.open_memory_channel(math.inf)
+
+    async def _send_items():
+        async with send_items:
+            for index, query_args in enumerate(args):
+                await window.acquire()
+                await send_items.send((index, query_args))
+
+    async def _run_queries(receive_items, send_results):
+        async with receive_items, send_results:
+            async with pool.acquire() as conn:
+                # Parsed and planned once per connection
+                statement = await conn.prepare(query, **prepare_kwargs)
+                run = getattr(statement, method)
+                async for index, query_args in receive_items:
+                    result = await run(*query_args, **kwargs)
+                    await send_results.send((index, result))
+
+    async with receive_results:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(_send_items)
+            async with receive_items, send_results:
+                for _ in range(concurrency):
+                    nursery.start_soon(
+                        _run_queries, receive_items.clone(),
+                        send_results.clone()
+                    )
+            if ordered:
+                yield _in_order(receive_results, window)
+            else:
+                yield _as_completed(receive_results, window)
+            # Stop early if the results were not all consumed
+            nursery.cancel_scope.cancel()
@@ -0,0 +1,113 @@
+import math
+from sys import getsizeof
+
+import asyncpg
+import trio_asyncio
+
+# Rows fetched per round trip by fetches bounded by `max_bytes`
+FETCH_CHUNK_SIZE = 1000
+
+# Rows fetched per round trip by `stream()`
+DEFAULT_STREAM_CHUNK_SIZE = 1000
+
+
+class ResultTooLargeError(asyncpg.InterfaceError):
+    """The rows of a `fetch` exceed its `max_rows` or `max_bytes` limits
+
+    Raised as soon as the limit is crossed, before the rest of the rows are
+    fetched. Use `stream()` to go through such results instead.
+    """
+
+
+def _fetch_limits(max_rows, max_bytes, defaults=None):
+    """Return the ``(max_rows, max_bytes)`` of a fetch, None if unbounded
+
+    Limits left to None fall back to the pool's `defaults`, `math.inf`
+    lifts them.
+    """
+    if defaults is not None:
+        default_rows, default_bytes = defaults
+        max_rows = default_rows if max_rows is None else max_rows
+        max_bytes = default_bytes if max_bytes is None else max_bytes
+    for name, value in (('max_rows', max_rows), ('max_bytes', max_bytes)):
+        if value is not None and value <= 0:
+            raise ValueError(
+                '{} is expected to be greater than zero'.format(name)
+            )
+    if max_rows == math.inf:
+        max_rows = None
+    if max_bytes == math.inf:
+        max_bytes = None
+    if max_rows is None and max_bytes is None:
+        return None
+    return max_rows, max_bytes
+
+
+def _records_size(records):
+    # Shallow size of the records and their values, an estimate of the
+    # memory they hold on to
+    return sum(
+        getsizeof(record) + sum(map(getsizeof, record)) for record in records
+    )
+
+
+def _too_many_rows(max_rows):
+    return ResultTooLargeError(
+        'query returned more than {} rows, use stream() to iterate over '
+        'them instead'.format(max_rows)
+    )
+
+
+async def _aio_guarded_fetch(
+        conn, query, *args, limits, timeout=None, record_class=None
+):
+    """Same as `asyncpg.Connection.fetch`, bounded by `_fetch_limits`"""
+    max_rows, max_bytes = limits
+    # Rolled back (to a savepoint when already in a transaction) when the
+    # limits are crossed, so `INSERT ... RETURNING` and such don't stick.
+    # Cursors only live in transactions anyway.
+    async with conn.transaction():
+        if max_bytes is not None:
+            return await _aio_fetch_chunks(
+                conn, query, args, max_rows, max_bytes, timeout, record_class
+            )
+        # The server stops one row past the limit
+        records = await conn._execute(
+            query, args, max_rows + 1, timeout, record_class=record_class
+        )
+        if len(records) > max_rows:
+            raise _too_many_rows(max_rows)
+        return records
+
+
+async def _aio_fetch_chunks(
+        conn, query, args, max_rows, max_bytes, timeout, record_class
+):
+    chunk_size = FETCH_CHUNK_SIZE
+    if max_rows is not None:
+        chunk_size = min(chunk_size, max_rows + 1)
+    cursor = await conn.cursor(
+        query, *args, timeout=timeout, record_class=record_class
+    )
+    records = []
+    size = 0
+    while True:
+        chunk = await cursor.fetch(chunk_size, timeout=timeout)
+        records.extend(chunk)
+        size += _records_size(chunk)
+        if max_rows is not None and len(records) > max_rows:
+            await cursor._close_portal(timeout)
+            raise _too_many_rows(max_rows)
+        if size > max_bytes:
+            await cursor._close_portal(timeout)
+            raise ResultTooLargeError(
+                'query returned more than {} bytes of rows, use stream() to '
+                'iterate over them instead'.format(max_bytes)
+            )
+        if len(chunk) < chunk_size:
+            break
+    await cursor._close_portal(timeout)
+    return records
+
+
+_aio_guarded_fetch_call = trio_asyncio.aio_as_trio(_aio_guarded_fetch)
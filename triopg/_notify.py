@@ -0,0 +1,333 @@
+from collections import OrderedDict
+from itertools import count
+
+import trio
+import asyncpg
+from async_generator import asynccontextmanager
+
+NOTIFY_OVERFLOW = object()
+
+OVERFLOW_POLICIES = ('notify', 'drop_oldest')
+
+COALESCE_POLICIES = ('latest', 'dedupe')
+
+
+class _NotificationBuffer:
+    """Memory channel fed with notifications from asyncpg listener callbacks
+
+    Callbacks can't wait, so once `max_buffer_size` payloads are buffered:
+
+    - ``'notify'``: new payloads are dropped and `NOTIFY_OVERFLOW` is
+      delivered in their place
+    - ``'drop_oldest'``: the oldest buffered payload is dropped
+    """
+
+    def __init__(self, max_buffer_size, overflow='notify'):
+        if max_buffer_size < 1:
+            raise ValueError('max_buffer_size is expected to be at least 1')
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                'overflow is expected to be one of {}'.format(
+                    ', '.join(OVERFLOW_POLICIES)
+                )
+            )
+        self._max_buffer_size = max_buffer_size
+        self._overflow = overflow
+        # Room for the NOTIFY_OVERFLOW marker
+        self.send_channel, self.receive_channel = trio.open_memory_channel(
+            max_buffer_size + 1
+        )
+
+    def push(self, payload):
+        used = self.send_channel.statistics().current_buffer_used
+        if used >= self._max_buffer_size:
+            if self._overflow == 'drop_oldest':
+                self.receive_channel.receive_nowait()
+            else:
+                if used == self._max_buffer_size:
+                    self.send_channel.send_nowait(NOTIFY_OVERFLOW)
+                return  # drop payload on the floor
+        self.send_channel.send_nowait(payload)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.receive_channel.aclose()
+        await self.send_channel.aclose()
+
+
+class _CoalescingBuffer(trio.abc.ReceiveChannel):
+    """Notification buffer merging payloads until they are received
+
+    - ``coalesce='latest'``: only the latest payload per ``key(payload)``
+      is kept
+    - ``coalesce='dedupe'``: only the first payload per ``key(payload)`` is
+      kept
+    - ``batch``: `receive` returns all buffered payloads at once, as a list
+
+    `key` defaults to the payload itself. Payloads are received in the order
+    their key first showed up. `overflow` applies once `max_buffer_size`
+    distinct keys are buffered, so a storm of notifications about a few
+    keys costs as many payloads in memory and wakes the receiver once.
+    """
+
+    def __init__(
+            self,
+            max_buffer_size,
+            overflow='notify',
+            coalesce=None,
+            key=None,
+            batch=False
+    ):
+        if max_buffer_size < 1:
+            raise ValueError('max_buffer_size is expected to be at least 1')
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                'overflow is expected to be one of {}'.format(
+                    ', '.join(OVERFLOW_POLICIES)
+                )
+            )
+        if coalesce is not None and coalesce not in COALESCE_POLICIES:
+            raise ValueError(
+                'coalesce is expected to be one of {}'.format(
+                    ', '.join(COALESCE_POLICIES)
+                )
+            )
+        if key is not None and coalesce is None:
+            raise ValueError('key is only used along with coalesce')
+        self._max_buffer_size = max_buffer_size
+        self._overflow = overflow
+        self._coalesce = coalesce
+        if coalesce is None:
+            # Every payload gets a key of its own
+            self._key = _unique_keys()
+        else:
+            self._key = (lambda payload: payload) if key is None else key
+        self._batch = batch
+        self._pending = OrderedDict()
+        self._has_pending = trio.Event()
+        self._closed = False
+
+    @property
+    def receive_channel(self):
+        return self
+
+    def push(self, payload):
+        if self._closed:
+            return
+        if payload is NOTIFY_OVERFLOW:
+            # Coalesced like any other payload, but never counted nor dropped
+            self._pending[NOTIFY_OVERFLOW] = NOTIFY_OVERFLOW
+            self._has_pending.set()
+            return
+        key = self._key(payload)
+        if key in self._pending:
+            if self._coalesce == 'latest':
+                self._pending[key] = payload
+            return
+        used = len(self._pending) - (NOTIFY_OVERFLOW in self._pending)
+        if used >= self._max_buffer_size:
+            if self._overflow == 'notify':
+                self._pending[NOTIFY_OVERFLOW] = NOTIFY_OVERFLOW
+                return  # drop payload on the floor
+            for oldest in self._pending:
+                if oldest is not NOTIFY_OVERFLOW:
+                    del self._pending[oldest]
+                    break
+        self._pending[key] = payload
+        self._has_pending.set()
+
+    async def receive(self):
+        if self._pending:
+            await trio.sleep(0)
+        while not self._pending:
+            if self._closed:
+                raise trio.ClosedResourceError()
+            if self._has_pending.is_set():
+                self._has_pending = trio.Event()
+            await self._has_pending.wait()
+        if self._closed:
+            raise trio.ClosedResourceError()
+        if self._batch:
+            payloads = list(self._pending.values())
+            self._pending.clear()
+            return payloads
+        return self._pending.popitem(last=False)[1]
+
+    async def aclose(self):
+        self._closed = True
+        self._pending.clear()
+        self._has_pending.set()
+        await trio.sleep(0)
+
+
+def _unique_keys():
+    keys = count()
+    return lambda payload: next(keys)
+
+
+def _notification_buffer(
+        max_buffer_size, overflow='notify', coalesce=None, key=None,
+        batch=False
+):
+    if coalesce is None and key is None and not batch:
+        return _NotificationBuffer(max_buffer_size, overflow)
+    return _CoalescingBuffer(max_buffer_size, overflow, coalesce, key, batch)
+
+
+class NotificationHub:
+    """Share a single LISTENing connection between many subscribers
+
+    The hub holds one connection from `pool` while it is open, issues a
+    single LISTEN per channel (whatever its number of subscribers) and fans
+    notifications out to each subscriber's own buffer.
+
+    If the connection is lost, the hub acquires a new one (retrying every
+    `reconnect_delay` seconds) and LISTENs again. Notifications sent in the
+    meantime are lost, so `NOTIFY_OVERFLOW` is then delivered to all
+    subscribers.
+
+    For example:
+
+    async with pool.notification_hub() as hub:
+        async with hub.subscribe('some.changes', max_buffer_size=10) as notifications:
+            async for notification in notifications:
+                ...
+    """
+
+    def __init__(self, pool, *, reconnect_delay=1.0):
+        self._pool = pool
+        self._reconnect_delay = reconnect_delay
+        self._subscribers = {}
+        self._conn = None
+        self._listening = set()
+        self._lock = trio.Lock()
+        self._nursery = None
+        self._nursery_manager = None
+
+    def _is_listening(self, channel):
+        """Whether `channel` notifications are being received right now"""
+        return self._conn is not None and channel in self._listening
+
+    def _dispatch(self, conn, pid, channel, payload):
+        for buffer in self._subscribers.get(channel, ()):
+            buffer.push(payload)
+
+    async def _update_listening(self, channel):
+        async with self._lock:
+            conn = self._conn
+            if conn is None:
+                return  # Done on reconnection
+            wanted = channel in self._subscribers
+            try:
+                if wanted and channel not in self._listening:
+                    await conn.add_listener(channel, self._dispatch)
+                    self._listening.add(channel)
+                elif not wanted and channel in self._listening:
+                    self._listening.discard(channel)
+                    await conn.remove_listener(channel, self._dispatch)
+            except (OSError, asyncpg.ConnectionDoesNotExistError):
+                pass  # Connection lost, done on reconnection
+            except asyncpg.InterfaceError:
+                if not conn.is_closed():
+                    raise
+
+    async def _serve(self, conn, connected, reconnecting):
+        lost = trio.Event()
+
+        def _on_termination(asyncpg_conn):
+            lost.set()
+
+        conn.add_termination_listener(_on_termination)
+        try:
+            async with self._lock:
+                # Subscribers can come and go while we LISTEN
+                channels = list(self._subscribers)
+                for channel in channels:
+                    await conn.add_listener(channel, self._dispatch)
+                self._listening = set(channels)
+                self._conn = conn
+            if reconnecting:
+                # Notifications sent while nobody was listening are lost,
+                # tell subscribers now that resyncing won't miss any more
+                for buffers in self._subscribers.values():
+                    for buffer in buffers:
+                        buffer.push(NOTIFY_OVERFLOW)
+            connected()
+            await lost.wait()
+        finally:
+            self._conn = None
+            self._listening = set()
+            conn.remove_termination_listener(_on_termination)
+
+    async def _run(self, task_status=trio.TASK_STATUS_IGNORED):
+        connected = False
+
+        def _connected():
+            nonlocal connected
+            if not connected:
+                connected = True
+                task_status.started()
+
+        while True:
+            try:
+                async with self._pool.acquire() as conn:
+                    await self._serve(conn, _connected, connected)
+            except Exception:
+                # Failing to connect the first time is the caller's problem
+                if not connected:
+                    raise
+            await trio.sleep(self._reconnect_delay)
+
+    @asynccontextmanager
+    async def subscribe(
+            self,
+            channel,
+            max_buffer_size,
+            overflow='notify',
+            *,
+            coalesce=None,
+            key=None,
+            batch=False
+    ):
+        """Subscribe to `channel` notifications and return a channel to iterate over
+
+        max_buffer_size - number of payloads buffered for this subscriber
+        overflow, coalesce, key, batch - how payloads are buffered, see
+          `TrioConnectionProxy.listen`
+        """
+        if self._nursery is None:
+            raise asyncpg.InterfaceError('notification hub is closed')
+        buffer = _notification_buffer(
+            max_buffer_size, overflow, coalesce, key, batch
+        )
+        async with buffer:
+            self._subscribers.setdefault(channel, set()).add(buffer)
+            try:
+                await self._update_listening(channel)
+                yield buffer.receive_channel
+            finally:
+                buffers = self._subscribers[channel]
+                buffers.discard(buffer)
+                if not buffers:
+                    del self._subscribers[channel]
+                with trio.CancelScope(shield=True):
+                    await self._update_listening(channel)
+
+    async def __aenter__(self):
+        nursery_manager = trio.open_nursery()
+        nursery = await nursery_manager.__aenter__()
+        try:
+            await nursery.start(self._run)
+        except BaseException as exc:
+            await nursery_manager.__aexit__(type(exc), exc, exc.__traceback__)
+            raise
+        self._nursery_manager = nursery_manager
+        self._nursery = nursery
+        return self
+
+    async def __aexit__(self, *exc):
+        self._nursery.cancel_scope.cancel()
+        self._nursery = None
+        return await self._nursery_manager.__aexit__(*exc)
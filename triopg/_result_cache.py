@@ -0,0 +1,242 @@
+from collections import OrderedDict, namedtuple
+
+import trio
+import asyncpg
+
+ResultCacheStatistics = namedtuple(
+    'ResultCacheStatistics', [
+        'size',
+        'max_size',
+        'hits',
+        'misses',
+        'evictions',
+        'expirations',
+        'invalidations',
+    ]
+)
+ResultCacheStatistics.__doc__ = """Query result cache counters
+
+Returned by `ResultCache.statistics()`. ``evictions`` counts the entries
+dropped to stay within ``max_size``, ``expirations`` those found past their
+TTL and ``invalidations`` those dropped by a notification (or
+`ResultCache.invalidate`).
+"""
+
+# Use the cache's own TTL
+_DEFAULT_TTL = object()
+
+
+class _CacheEntry:
+    __slots__ = ('result', 'expires_at', 'channels')
+
+    def __init__(self, result, expires_at, channels):
+        self.result = result
+        self.expires_at = expires_at
+        self.channels = channels
+
+
+class ResultCache:
+    """Cache the results of read queries run on `pool`
+
+    `fetch`, `fetchrow` and `fetchval` results are cached by query and
+    arguments, for `ttl` seconds (None for no expiry) and up to `max_size`
+    results, the least recently used ones being evicted first. Cache hits
+    don't acquire a connection nor cross over to asyncio.
+
+    Entries can be tied to NOTIFY `channels`: any notification on one of
+    them (received on a single connection through the pool's
+    `NotificationHub`) invalidates its entries.
+
+    For example:
+
+    async with pool.result_cache(ttl=30) as cache:
+        user = await cache.fetchrow(
+            'SELECT * FROM users WHERE id = $1', user_id, channels=['users']
+        )
+    """
+
+    def __init__(self, pool, *, max_size=1000, ttl=60.0):
+        if max_size <= 0:
+            raise ValueError('max_size is expected to be greater than zero')
+        self._pool = pool
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        # Keys of the entries tied to each channel
+        self._channel_keys = {}
+        # Bumped when the entries of a channel (or all of them) are dropped,
+        # so that results fetched in the meantime aren't cached
+        self._channel_generations = {}
+        self._generation = 0
+        self._listening = set()
+        self._listen_lock = trio.Lock()
+        self._hub = None
+        self._subscriptions = None
+        self._nursery = None
+        self._nursery_manager = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    async def fetch(
+            self, query, *args, ttl=_DEFAULT_TTL, channels=(), **kwargs
+    ):
+        records = await self._fetch(
+            'fetch', query, args, ttl, channels, kwargs
+        )
+        # Callers get their own list to modify
+        return list(records)
+
+    async def fetchrow(
+            self, query, *args, ttl=_DEFAULT_TTL, channels=(), **kwargs
+    ):
+        return await self._fetch(
+            'fetchrow', query, args, ttl, channels, kwargs
+        )
+
+    async def fetchval(
+            self, query, *args, ttl=_DEFAULT_TTL, channels=(), **kwargs
+    ):
+        return await self._fetch(
+            'fetchval', query, args, ttl, channels, kwargs
+        )
+
+    async def _fetch(self, method, query, args, ttl, channels, kwargs):
+        if self._nursery is None:
+            raise asyncpg.InterfaceError('result cache is closed')
+        options = sorted(
+            item for item in kwargs.items() if item[0] != 'timeout'
+        )
+        key = (method, query, args, tuple(options))
+        try:
+            entry = self._entries.get(key)
+        except TypeError:
+            # Unhashable arguments, can't be cached
+            return await getattr(self._pool, method)(query, *args, **kwargs)
+        if entry is not None:
+            expires_at = entry.expires_at
+            if expires_at is None or expires_at > trio.current_time():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry.result
+            self._remove(key)
+            self._expirations += 1
+        self._misses += 1
+
+        channels = tuple(channels)
+        for channel in channels:
+            await self._listen(channel)
+        listening = self._is_listening(channels)
+        generations = self._generations(channels)
+        result = await getattr(self._pool, method)(query, *args, **kwargs)
+        # Changes notified while the hub reconnects are missed, results read
+        # in the meantime can't be trusted for long
+        if (listening and self._is_listening(channels)
+                and self._generations(channels) == generations):
+            self._store(key, result, ttl, channels)
+        return result
+
+    def _is_listening(self, channels):
+        return all(self._hub._is_listening(channel) for channel in channels)
+
+    def _generations(self, channels):
+        return self._generation, [
+            self._channel_generations.get(channel, 0) for channel in channels
+        ]
+
+    def _store(self, key, result, ttl, channels):
+        if ttl is _DEFAULT_TTL:
+            ttl = self._ttl
+        expires_at = None if ttl is None else trio.current_time() + ttl
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _CacheEntry(result, expires_at, channels)
+        for channel in channels:
+            self._channel_keys.setdefault(channel, set()).add(key)
+        while len(self._entries) > self._max_size:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for channel in entry.channels:
+            keys = self._channel_keys[channel]
+            keys.discard(key)
+            if not keys:
+                del self._channel_keys[channel]
+
+    def invalidate(self, channel):
+        """Drop the entries tied to `channel`"""
+        self._channel_generations[channel] = (
+            self._channel_generations.get(channel, 0) + 1
+        )
+        for key in list(self._channel_keys.get(channel, ())):
+            self._remove(key)
+            self._invalidations += 1
+
+    def clear(self):
+        """Drop all the entries"""
+        self._generation += 1
+        self._invalidations += len(self._entries)
+        self._entries.clear()
+        self._channel_keys.clear()
+
+    def statistics(self):
+        return ResultCacheStatistics(
+            size=len(self._entries),
+            max_size=self._max_size,
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            expirations=self._expirations,
+            invalidations=self._invalidations,
+        )
+
+    async def _listen(self, channel):
+        if channel in self._listening:
+            return
+        async with self._listen_lock:
+            if channel in self._listening:
+                return
+            if self._hub is None:
+                self._hub, self._subscriptions = await self._nursery.start(
+                    self._run_hub
+                )
+            await self._subscriptions.start(
+                self._invalidate_on_notify, channel
+            )
+            self._listening.add(channel)
+
+    async def _run_hub(self, task_status=trio.TASK_STATUS_IGNORED):
+        async with self._pool.notification_hub() as hub:
+            # Subscriptions are closed before the hub on exit
+            async with trio.open_nursery() as subscriptions:
+                task_status.started((hub, subscriptions))
+                await trio.sleep_forever()
+
+    async def _invalidate_on_notify(
+            self, channel, task_status=trio.TASK_STATUS_IGNORED
+    ):
+        # Payloads don't matter: the overflow marker (also sent once the hub
+        # LISTENs again after reconnecting) invalidates just the same
+        async with self._hub.subscribe(channel, max_buffer_size=1) as pending:
+            task_status.started()
+            async for _ in pending:
+                self.invalidate(channel)
+
+    async def __aenter__(self):
+        nursery_manager = trio.open_nursery()
+        self._nursery = await nursery_manager.__aenter__()
+        self._nursery_manager = nursery_manager
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._subscriptions is not None:
+            # Stops the hub as well, but only once it is unsubscribed
+            self._subscriptions.cancel_scope.cancel()
+        else:
+            self._nursery.cancel_scope.cancel()
+        self._nursery = None
+        return await self._nursery_manager.__aexit__(*exc)
@@ -0,0 +1,272 @@
+import asyncio
+
+import trio
+import asyncpg
+from async_generator import asynccontextmanager
+
+from ._result_cache import ResultCache
+
+STRATEGIES = ('round_robin', 'least_outstanding')
+
+# Errors telling that the server can't be reached (or is going away), as
+# opposed to errors about the query itself
+_CONNECTION_ERRORS = (
+    OSError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.AdminShutdownError,
+    asyncpg.CrashShutdownError,
+)
+
+
+def _is_connection_error(exc):
+    # asyncio.TimeoutError is an OSError on Python 3.11+, but a timeout says
+    # more about the query than about the server
+    return (
+        isinstance(exc, _CONNECTION_ERRORS)
+        and not isinstance(exc, asyncio.TimeoutError)
+    )
+
+
+class _Replica:
+    __slots__ = ('pool', 'outstanding', 'unhealthy_until')
+
+    def __init__(self, pool):
+        self.pool = pool
+        # Calls and acquired connections currently running on the replica
+        self.outstanding = 0
+        self.unhealthy_until = -float('inf')
+
+
+class _ReplicaAcquireContext:
+    def __init__(self, routing_pool):
+        self._routing_pool = routing_pool
+        self._replica = None
+        self._context = None
+
+    async def __aenter__(self):
+        routing_pool = self._routing_pool
+        while True:
+            replica = routing_pool._choose_replica()
+            if replica is None:
+                self._context = routing_pool.primary.acquire()
+                return await self._context.__aenter__()
+            context = replica.pool.acquire()
+            replica.outstanding += 1
+            try:
+                conn = await context.__aenter__()
+            except BaseException as exc:
+                replica.outstanding -= 1
+                if not _is_connection_error(exc):
+                    raise
+                routing_pool._mark_unhealthy(replica)
+                continue
+            self._replica = replica
+            self._context = context
+            return conn
+
+    async def __aexit__(self, *exc):
+        try:
+            return await self._context.__aexit__(*exc)
+        finally:
+            if self._replica is not None:
+                self._replica.outstanding -= 1
+                if _is_connection_error(exc[1]):
+                    self._routing_pool._mark_unhealthy(self._replica)
+
+
+class RoutingPool:
+    """Send reads to replica pools and everything else to a primary pool
+
+    `fetch`, `fetchrow`, `fetchval` and `fetch_columns` run on a replica
+    picked by `strategy`:
+
+    - ``'round_robin'``: each replica in turn
+    - ``'least_outstanding'``: the replica running the fewest calls and
+      acquired connections (from this pool) at the moment
+
+    Pass ``primary=True`` to run them on the primary instead (e.g. to read
+    your own writes). `acquire` returns a primary connection, unless given
+    ``replica=True``.
+
+    A replica failing with a connection error is taken out of rotation for
+    `unhealthy_delay` seconds and the read is retried on the next one, or on
+    the primary once no replica is left.
+
+    Pools are given unopened, they are opened and closed along with the
+    routing pool.
+    """
+
+    def __init__(
+            self,
+            primary,
+            replicas,
+            *,
+            strategy='round_robin',
+            unhealthy_delay=5.0
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                'strategy is expected to be one of {}'.format(
+                    ', '.join(STRATEGIES)
+                )
+            )
+        self.primary = primary
+        self.replicas = tuple(replicas)
+        self._replicas = [_Replica(pool) for pool in self.replicas]
+        self._strategy = strategy
+        self._unhealthy_delay = unhealthy_delay
+        self._next_index = 0
+
+    def _choose_replica(self):
+        """Return the next replica in rotation, None if there is none"""
+        replicas = self._replicas
+        if not replicas:
+            return None
+        now = trio.current_time()
+        start = self._next_index
+        # Start from the next replica each time, so that ties on outstanding
+        # calls are broken in turn too
+        self._next_index = (start + 1) % len(replicas)
+        chosen = None
+        for offset in range(len(replicas)):
+            replica = replicas[(start + offset) % len(replicas)]
+            if replica.unhealthy_until > now:
+                continue
+            if self._strategy == 'round_robin':
+                return replica
+            if chosen is None or replica.outstanding < chosen.outstanding:
+                chosen = replica
+        return chosen
+
+    def _mark_unhealthy(self, replica):
+        replica.unhealthy_until = trio.current_time() + self._unhealthy_delay
+
+    def healthy_replicas(self):
+        """Return the replica pools currently in rotation"""
+        now = trio.current_time()
+        return [
+            replica.pool for replica in self._replicas
+            if replica.unhealthy_until <= now
+        ]
+
+    async def _read(self, method, primary, *args, **kwargs):
+        if not primary:
+            while True:
+                replica = self._choose_replica()
+                if replica is None:
+                    break
+                replica.outstanding += 1
+                try:
+                    return await getattr(replica.pool, method)(*args, **kwargs)
+                except BaseException as exc:
+                    if not _is_connection_error(exc):
+                        raise
+                    self._mark_unhealthy(replica)
+                finally:
+                    replica.outstanding -= 1
+        return await getattr(self.primary, method)(*args, **kwargs)
+
+    def acquire(self, *, replica=False):
+        if replica:
+            return _ReplicaAcquireContext(self)
+        return self.primary.acquire()
+
+    async def fetch(self, query, *args, primary=False, **kwargs):
+        return await self._read('fetch', primary, query, *args, **kwargs)
+
+    async def fetchval(self, query, *args, primary=False, **kwargs):
+        return await self._read('fetchval', primary, query, *args, **kwargs)
+
+    async def fetchrow(self, query, *args, primary=False, **kwargs):
+        return await self._read('fetchrow', primary, query, *args, **kwargs)
+
+    async def fetch_columns(self, query, *args, primary=False, **kwargs):
+        return await self._read(
+            'fetch_columns', primary, query, *args, **kwargs
+        )
+
+    @asynccontextmanager
+    async def stream(self, query, *args, primary=False, **kwargs):
+        # Not retried elsewhere, rows may already have been consumed
+        async with self.acquire(replica=not primary) as conn:
+            async with conn.stream(query, *args, **kwargs) as rows:
+                yield rows
+
+    async def execute(self, statement: str, *args, **kwargs):
+        return await self.primary.execute(statement, *args, **kwargs)
+
+    async def executemany(self, statement: str, args, **kwargs):
+        return await self.primary.executemany(statement, args, **kwargs)
+
+    async def parallel_executemany(self, statement: str, args, **kwargs):
+        return await self.primary.parallel_executemany(
+            statement, args, **kwargs
+        )
+
+    def notification_hub(self, **kwargs):
+        return self.primary.notification_hub(**kwargs)
+
+    def write_batcher(self, **kwargs):
+        return self.primary.write_batcher(**kwargs)
+
+    def result_cache(self, **kwargs):
+        # Reads go to the replicas, the invalidations come from the primary
+        return ResultCache(self, **kwargs)
+
+    async def copy_from_query(self, query, *args, output, **kwargs):
+        return await self.primary.copy_from_query(
+            query, *args, output=output, **kwargs
+        )
+
+    async def copy_from_table(self, table_name, *, output, **kwargs):
+        return await self.primary.copy_from_table(
+            table_name, output=output, **kwargs
+        )
+
+    async def copy_to_table(self, table_name, *, source, **kwargs):
+        return await self.primary.copy_to_table(
+            table_name, source=source, **kwargs
+        )
+
+    async def copy_records_to_table(self, table_name, *, records, **kwargs):
+        return await self.primary.copy_records_to_table(
+            table_name, records=records, **kwargs
+        )
+
+    async def close(self):
+        await self._close_pools([self.primary, *self.replicas])
+
+    def terminate(self):
+        for pool in (self.primary, *self.replicas):
+            pool.terminate()
+
+    async def _close_pools(self, pools):
+        # Same order as `_exit_pools`
+        if pools:
+            try:
+                await pools[-1].close()
+            finally:
+                await self._close_pools(pools[:-1])
+
+    async def _exit_pools(self, pools, *exc):
+        # Last opened first, each pool is closed even if another one fails
+        if pools:
+            try:
+                await pools[-1].__aexit__(*exc)
+            finally:
+                await self._exit_pools(pools[:-1], *exc)
+
+    async def __aenter__(self):
+        entered = []
+        try:
+            for pool in (self.primary, *self.replicas):
+                await pool.__aenter__()
+                entered.append(pool)
+        except BaseException as exc:
+            await self._exit_pools(entered, type(exc), exc, exc.__traceback__)
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._exit_pools([self.primary, *self.replicas], *exc)
@@ -0,0 +1,109 @@
+import inspect
+from functools import lru_cache
+from operator import itemgetter
+
+import asyncpg
+
+_POSITIONAL_KINDS = (
+    inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD
+)
+_ARGUMENT_KINDS = _POSITIONAL_KINDS + (inspect.Parameter.KEYWORD_ONLY,)
+
+
+def _is_row_class(record_class):
+    """Whether `record_class` is built by triopg rather than by asyncpg"""
+    return record_class is not None and not (
+        isinstance(record_class, type)
+        and issubclass(record_class, asyncpg.Record)
+    )
+
+
+def _statement_row_class(record_class):
+    """Check `record_class` given to a prepared statement query
+
+    asyncpg sets the `asyncpg.Record` subclass of a statement when preparing
+    it, only row classes built by triopg can be given per query.
+    """
+    if record_class is None or _is_row_class(record_class):
+        return record_class
+    raise asyncpg.InterfaceError(
+        'the asyncpg.Record subclass of a prepared statement is set by '
+        'prepare(..., record_class={!r})'.format(record_class)
+    )
+
+
+def _values_getter(indexes):
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda record: (record[index],)
+    if indexes:
+        return itemgetter(*indexes)
+    return lambda record: ()
+
+
+@lru_cache(maxsize=256)
+def _row_factory(row_class, columns):
+    """Return a function building `row_class` from records with `columns`
+
+    `row_class` constructor parameters are matched with columns by name
+    once, so each row then costs an `itemgetter` call and the constructor
+    call. Columns without a matching parameter are ignored.
+    """
+    indexes = {}
+    for index, column in enumerate(columns):
+        indexes.setdefault(column, index)
+    positional = []
+    keywords = []
+    # Once a defaulted parameter is skipped, the next ones are keywords
+    skipped = False
+    for parameter in inspect.signature(row_class).parameters.values():
+        if parameter.kind not in _ARGUMENT_KINDS:
+            continue  # *args and **kwargs
+        index = indexes.get(parameter.name)
+        if index is None:
+            if parameter.default is parameter.empty:
+                raise asyncpg.InterfaceError(
+                    'no column matches {!r} argument {!r}'.format(
+                        row_class, parameter.name
+                    )
+                )
+            skipped = True
+        elif parameter.kind in _POSITIONAL_KINDS and not skipped:
+            positional.append(index)
+        else:
+            keywords.append((parameter.name, index))
+    get_values = _values_getter(positional)
+    if not keywords:
+        return lambda record: row_class(*get_values(record))
+
+    def factory(record):
+        kwargs = {name: record[index] for name, index in keywords}
+        return row_class(*get_values(record), **kwargs)
+
+    return factory
+
+
+def _build_rows(row_class, records):
+    if not records:
+        return []
+    factory = _row_factory(row_class, tuple(records[0].keys()))
+    return list(map(factory, records))
+
+
+def _build_row(row_class, record):
+    if record is None:
+        return None
+    return _row_factory(row_class, tuple(record.keys()))(record)
+
+
+async def _fetch_with_record_class(fetch, build, record_class, args, kwargs):
+    """Call `fetch`, with records built into `record_class` if needed
+
+    asyncpg builds `asyncpg.Record` subclasses itself, other classes (or
+    callables) are built by `build` from the returned records.
+    """
+    if _is_row_class(record_class):
+        return build(record_class, await fetch(*args, **kwargs))
+    if record_class is not None:
+        kwargs['record_class'] = record_class
+    return await fetch(*args, **kwargs)
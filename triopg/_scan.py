@@ -0,0 +1,152 @@
+import trio
+from async_generator import asynccontextmanager
+
+# Rows sampled per partition to find the partition boundaries
+SAMPLE_ROWS_PER_PARTITION = 1000
+
+_RELATION_QUERY = """
+    SELECT $1::regclass::text, reltuples FROM pg_class
+    WHERE oid = $1::regclass
+"""
+
+_PRIMARY_KEY_QUERY = """
+    SELECT a.attname FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+    WHERE i.indrelid = $1::regclass AND i.indisprimary
+"""
+
+_BOUNDARIES_QUERY = """
+    SELECT percentile_disc($1::float8[]) WITHIN GROUP (ORDER BY {key})
+    FROM {table} TABLESAMPLE SYSTEM ($2)
+"""
+
+
+def _quote_ident(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+class _ScanPlan:
+    def __init__(self, table, key, columns, boundaries):
+        self.key = key
+        self._select = 'SELECT {} FROM {}'.format(
+            ', '.join(map(_quote_ident, columns)) if columns else '*', table
+        )
+        self._order_by = ' ORDER BY {} LIMIT '.format(_quote_ident(key))
+        self._quoted_key = _quote_ident(key)
+        bounds = [None, *boundaries, None]
+        self.ranges = list(zip(bounds, bounds[1:]))
+
+    def page_query(self, lower, upper, after):
+        """Return the query and arguments of the page after key `after`"""
+        conditions = []
+        args = []
+        if after is not None:
+            args.append(after)
+            conditions.append('{} > ${}'.format(self._quoted_key, len(args)))
+        elif lower is not None:
+            args.append(lower)
+            conditions.append('{} >= ${}'.format(self._quoted_key, len(args)))
+        if upper is not None:
+            args.append(upper)
+            conditions.append('{} < ${}'.format(self._quoted_key, len(args)))
+        query = self._select
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += self._order_by + '${}'.format(len(args) + 1)
+        return query, args
+
+
+async def _plan_scan(conn, table, key, columns, partitions):
+    relation, reltuples = await conn.fetchrow(_RELATION_QUERY, table)
+    if key is None:
+        keys = [row[0] for row in await conn.fetch(_PRIMARY_KEY_QUERY, table)]
+        if len(keys) != 1:
+            raise ValueError(
+                '{} has no single column primary key, a unique non null '
+                'key column is expected'.format(relation)
+            )
+        key = keys[0]
+    if columns is not None and key not in columns:
+        # Needed to resume after the last row of each page
+        columns = [*columns, key]
+
+    boundaries = []
+    if partitions > 1:
+        # reltuples is unknown (0 or -1) until the table is analyzed
+        sample_rows = SAMPLE_ROWS_PER_PARTITION * partitions
+        percent = (
+            min(100.0, 100.0 * sample_rows / reltuples)
+            if reltuples > 0 else 100.0
+        )
+        fractions = [i / partitions for i in range(1, partitions)]
+        bounds = await conn.fetchval(
+            _BOUNDARIES_QUERY.format(key=_quote_ident(key), table=relation),
+            fractions, percent
+        )
+        for bound in bounds or ():
+            # Duplicates when a few keys hold most of the sampled rows
+            if bound is None or boundaries and bound == boundaries[-1]:
+                continue
+            boundaries.append(bound)
+    return _ScanPlan(relation, key, columns, boundaries)
+
+
+async def _scan_range(pool, plan, key_range, page_size, limiter, send_channel):
+    lower, upper = key_range
+    async with send_channel, limiter:
+        async with pool.acquire() as conn:
+            after = None
+            while True:
+                query, args = plan.page_query(lower, upper, after)
+                page = await conn.fetch(query, *args, page_size)
+                if page:
+                    await send_channel.send(page)
+                if len(page) < page_size:
+                    return
+                after = page[-1][plan.key]
+
+
+@asynccontextmanager
+async def _scan(
+        pool, table, key, columns, partitions, concurrency, page_size,
+        per_partition
+):
+    if concurrency is None:
+        concurrency = pool.statistics().max_size
+    elif concurrency <= 0:
+        raise ValueError('concurrency is expected to be greater than zero')
+    if partitions is None:
+        partitions = concurrency
+    elif partitions <= 0:
+        raise ValueError('partitions is expected to be greater than zero')
+    if page_size <= 0:
+        raise ValueError('page_size is expected to be greater than zero')
+    async with pool.acquire() as conn:
+        plan = await _plan_scan(conn, table, key, columns, partitions)
+    limiter = trio.CapacityLimiter(concurrency)
+
+    async with trio.open_nursery() as nursery:
+        if per_partition:
+            channels = []
+            for key_range in plan.ranges:
+                send_channel, receive_channel = trio.open_memory_channel(0)
+                nursery.start_soon(
+                    _scan_range, pool, plan, key_range, page_size, limiter,
+                    send_channel
+                )
+                channels.append(receive_channel)
+            yield channels
+        else:
+            send_channel, receive_channel = trio.open_memory_channel(
+                concurrency
+            )
+            async with send_channel:
+                for key_range in plan.ranges:
+                    nursery.start_soon(
+                        _scan_range, pool, plan, key_range, page_size, limiter,
+                        send_channel.clone()
+                    )
+            async with receive_channel:
+                yield receive_channel
+        # Stop early if the pages were not all consumed
+        nursery.cancel_scope.cancel()
@@ -0,0 +1,89 @@
+from collections import deque, namedtuple
+
+import trio
+
+# Number of resize decisions kept for `PoolStatistics.resizes`
+RESIZE_HISTORY = 100
+
+PoolResize = namedtuple(
+    'PoolResize', [
+        'time',
+        'old_target_size',
+        'new_target_size',
+        'reason',
+        'acquire_wait',
+        'peak_in_use',
+    ]
+)
+PoolResize.__doc__ = """Target size change of an adaptive pool
+
+``reason`` is ``'acquire_wait'`` when growing, ``'low_utilization'`` when
+shrinking. ``acquire_wait`` is the mean acquire wait (in seconds) and
+``peak_in_use`` the most connections in use at once over the interval that
+led to the decision, ``time`` is `trio.current_time()` at the end of it.
+"""
+
+
+class _SizeController:
+    """Move a pool's target size between its bounds, once per `interval`
+
+    The target grows (by the number of waiting tasks) when the mean acquire
+    wait over the interval exceeds `target_acquire_wait`, or when tasks have
+    been waiting the whole interval. It shrinks (by half of the unused
+    slots) when acquires were fast and fewer connections than the target
+    were ever in use at once.
+    """
+
+    def __init__(self, min_size, max_size, target_acquire_wait, interval):
+        if target_acquire_wait <= 0:
+            raise ValueError(
+                'target_acquire_wait is expected to be greater than zero'
+            )
+        if interval <= 0:
+            raise ValueError(
+                'resize_interval is expected to be greater than zero'
+            )
+        # At least one connection, or nobody would ever get to wait
+        self.lower = max(min_size, 1)
+        self.upper = max_size
+        self.target_acquire_wait = target_acquire_wait
+        self.interval = interval
+        self.target_size = self.lower
+        self.resizes = deque(maxlen=RESIZE_HISTORY)
+        self._seen_count = 0
+        self._seen_total = 0.0
+
+    def decide(self, metrics, peak_in_use):
+        """Return the target size for the next interval"""
+        acquire_wait = metrics.acquire_wait
+        count = acquire_wait.count - self._seen_count
+        total = acquire_wait.total - self._seen_total
+        self._seen_count = acquire_wait.count
+        self._seen_total = acquire_wait.total
+        mean_wait = total / count if count else 0.0
+
+        old_target_size = target_size = self.target_size
+        starving = metrics.waiters and not count
+        if mean_wait > self.target_acquire_wait or starving:
+            growth = max(metrics.waiters, 1)
+            target_size = min(self.upper, target_size + growth)
+            reason = 'acquire_wait'
+        elif peak_in_use < target_size:
+            unused = target_size - peak_in_use
+            target_size = max(self.lower, target_size - max(unused // 2, 1))
+            reason = 'low_utilization'
+        if target_size == old_target_size:
+            return target_size
+
+        self.target_size = target_size
+        self.resizes.append(
+            PoolResize(
+                time=trio.current_time(),
+                old_target_size=old_target_size,
+                new_target_size=target_size,
+                reason=reason,
+                acquire_wait=mean_wait,
+                peak_in_use=peak_in_use,
+            )
+        )
+        return target_size
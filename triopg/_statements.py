@@ -0,0 +1,93 @@
+from collections import OrderedDict, namedtuple
+
+from asyncpg.prepared_stmt import PreparedStatement
+
+StatementCacheStatistics = namedtuple(
+    'StatementCacheStatistics',
+    ['max_size', 'hits', 'misses', 'evictions', 'invalidations']
+)
+StatementCacheStatistics.__doc__ = """Prepared statement cache counters
+
+Part of `PoolStatistics` (as ``statement_cache``) for pools created with
+a ``prepared_statement_cache_size``. Counters are summed over the pool
+connections, ``max_size`` is per connection.
+"""
+
+
+def _reattached(asyncpg_statement):
+    """Return `asyncpg_statement`, usable by the current pool acquisition
+
+    asyncpg statements refuse to run once their connection went back to the
+    pool, even though the server side statement outlives the release. A new
+    statement sharing the prepared state costs no round trip.
+    """
+    conn = asyncpg_statement._connection
+    if asyncpg_statement._con_release_ctr == conn._pool_release_ctr:
+        return asyncpg_statement
+    return PreparedStatement(
+        conn, asyncpg_statement._query, asyncpg_statement._state
+    )
+
+
+class _StatementRegistry:
+    """Prepared statement cache settings and counters shared by a pool"""
+
+    def __init__(self, max_size):
+        if max_size <= 0:
+            raise ValueError(
+                'prepared_statement_cache_size is expected to be greater '
+                'than zero'
+            )
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def invalidate(self):
+        # Connection caches compare this to their own on their next use
+        self.invalidations += 1
+
+    def statistics(self):
+        return StatementCacheStatistics(
+            max_size=self.max_size,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            invalidations=self.invalidations,
+        )
+
+
+class _StatementCache:
+    """LRU of the statement proxies prepared on a pool connection"""
+
+    def __init__(self, registry, asyncpg_conn):
+        self._registry = registry
+        self._asyncpg_conn = asyncpg_conn
+        self._invalidations = registry.invalidations
+        self._statements = OrderedDict()
+
+    def get(self, query):
+        registry = self._registry
+        if self._invalidations != registry.invalidations:
+            self._invalidations = registry.invalidations
+            self._statements.clear()
+            # Cache misses are prepared from asyncpg's caches, which would
+            # return the same outdated statements
+            self._asyncpg_conn._drop_local_statement_cache()
+            self._asyncpg_conn._drop_local_type_cache()
+        try:
+            statement = self._statements[query]
+        except KeyError:
+            registry.misses += 1
+            return None
+        self._statements.move_to_end(query)
+        registry.hits += 1
+        return statement
+
+    def put(self, query, statement):
+        self._statements[query] = statement
+        if len(self._statements) > self._registry.max_size:
+            # Dropped asyncpg statements are closed once garbage collected
+            self._statements.popitem(last=False)
+            self._registry.evictions += 1
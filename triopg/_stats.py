@@ -0,0 +1,188 @@
+from bisect import bisect_left
+from collections import namedtuple
+import os
+import sys
+
+import trio
+
+# Bucket upper bounds, in seconds: 10µs, 20µs, 40µs... up to ~42s, then +inf
+HISTOGRAM_BOUNDS = tuple(1e-5 * 2**i for i in range(23)) + (float('inf'),)
+
+
+class Histogram:
+    """Durations histogram with fixed exponential buckets
+
+    Recording a value is O(log(buckets)) and allocates nothing, so
+    histograms can be kept up to date on hot paths.
+    """
+
+    __slots__ = ('count', 'total', 'max', '_counts')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._counts = [0] * len(HISTOGRAM_BOUNDS)
+
+    def record(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self._counts[bisect_left(HISTOGRAM_BOUNDS, value)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def buckets(self):
+        """Return ``(upper_bound, count)`` pairs for the non-empty buckets"""
+        return [
+            (bound, count)
+            for bound, count in zip(HISTOGRAM_BOUNDS, self._counts) if count
+        ]
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given `fraction` of values"""
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BOUNDS, self._counts):
+            seen += count
+            if seen >= threshold:
+                return min(bound, self.max)
+        return self.max  # pragma: no cover
+
+    def copy(self):
+        histogram = Histogram()
+        histogram.count = self.count
+        histogram.total = self.total
+        histogram.max = self.max
+        histogram._counts = self._counts.copy()
+        return histogram
+
+    def __repr__(self):
+        return '<Histogram count={} mean={:.6f} p99={:.6f} max={:.6f}>'.format(
+            self.count, self.mean, self.percentile(0.99), self.max
+        )
+
+
+PoolStatistics = namedtuple(
+    'PoolStatistics', [
+        'size',
+        'min_size',
+        'max_size',
+        'idle',
+        'in_use',
+        'waiters',
+        'acquire_wait',
+        'hold_time',
+        'call_sites',
+        'statement_cache',
+        'target_size',
+        'resizes',
+    ]
+)
+PoolStatistics.__doc__ = """Snapshot of a pool state returned by `pool.statistics()`
+
+``acquire_wait`` and ``hold_time`` are `Histogram` of the time (in seconds)
+spent waiting for a connection and holding it. ``call_sites`` maps a
+``"filename:lineno"`` to a ``(acquire_wait, hold_time)`` pair, it is only
+populated if the pool was created with ``track_call_sites=True``.
+``statement_cache`` holds `StatementCacheStatistics` if the pool was created
+with a ``prepared_statement_cache_size``. ``target_size`` is the number of
+connections the pool lets out at once: ``max_size`` unless the pool sizes
+itself adaptively, in which case ``resizes`` holds its most recent
+`PoolResize` decisions.
+"""
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _call_site():
+    """Return the first caller frame outside of the triopg package"""
+    frame = sys._getframe(2)
+    while (frame.f_back is not None
+           and os.path.dirname(frame.f_code.co_filename) == _PACKAGE_DIR):
+        frame = frame.f_back
+    return '{}:{}'.format(frame.f_code.co_filename, frame.f_lineno)
+
+
+class _Acquisition:
+    __slots__ = ('started_at', 'acquired_at', 'call_site')
+
+
+class _PoolMetrics:
+    """Acquire/release bookkeeping shared by the pool implementations"""
+
+    def __init__(self, track_call_sites=False):
+        self.waiters = 0
+        self.in_use = 0
+        self.acquire_wait = Histogram()
+        self.hold_time = Histogram()
+        self.call_sites = {} if track_call_sites else None
+
+    def acquire_started(self):
+        acquisition = _Acquisition()
+        acquisition.started_at = trio.current_time()
+        acquisition.call_site = (
+            _call_site() if self.call_sites is not None else None
+        )
+        self.waiters += 1
+        return acquisition
+
+    def acquire_failed(self, acquisition):
+        self.waiters -= 1
+
+    def acquired(self, acquisition):
+        acquisition.acquired_at = now = trio.current_time()
+        self.waiters -= 1
+        self.in_use += 1
+        wait = now - acquisition.started_at
+        self.acquire_wait.record(wait)
+        if acquisition.call_site is not None:
+            self._call_site_histograms(acquisition.call_site)[0].record(wait)
+
+    def released(self, acquisition):
+        self.in_use -= 1
+        hold = trio.current_time() - acquisition.acquired_at
+        self.hold_time.record(hold)
+        if acquisition.call_site is not None:
+            self._call_site_histograms(acquisition.call_site)[1].record(hold)
+
+    def _call_site_histograms(self, call_site):
+        try:
+            return self.call_sites[call_site]
+        except KeyError:
+            histograms = (Histogram(), Histogram())
+            self.call_sites[call_site] = histograms
+            return histograms
+
+    def statistics(
+            self,
+            size,
+            min_size,
+            max_size,
+            idle,
+            statement_cache=None,
+            target_size=None,
+            resizes=()
+    ):
+        return PoolStatistics(
+            size=size,
+            min_size=min_size,
+            max_size=max_size,
+            idle=idle,
+            in_use=self.in_use,
+            waiters=self.waiters,
+            acquire_wait=self.acquire_wait.copy(),
+            hold_time=self.hold_time.copy(),
+            call_sites={
+                call_site: tuple(histogram.copy() for histogram in histograms)
+                for call_site, histograms in self.call_sites.items()
+            } if self.call_sites is not None else None,
+            statement_cache=statement_cache,
+            target_size=max_size if target_size is None else target_size,
+            resizes=tuple(resizes),
+        )
@@ -13,8 +13,7 @@ async def asyncio_loop():
         yield loop
 
 
-@pytest.fixture(scope='session')
-def cluster():
+def _run_cluster():
     cluster_dir = tempfile.mkdtemp()
     cluster = Cluster(cluster_dir)
 
@@ -27,11 +26,27 @@ def cluster():
         cluster.destroy()
 
 
+@pytest.fixture(scope='session')
+def cluster():
+    yield from _run_cluster()
+
+
+@pytest.fixture(scope='session')
+def replica_cluster():
+    # A separate server standing in for a read replica
+    yield from _run_cluster()
+
+
 @pytest.fixture
 def postgresql_connection_specs(cluster):
     return {'database': 'postgres', **cluster.get_connection_spec()}
 
 
+@pytest.fixture
+def replica_connection_specs(replica_cluster):
+    return {'database': 'postgres', **replica_cluster.get_connection_spec()}
+
+
 @pytest.fixture()
 async def asyncpg_conn(asyncio_loop, postgresql_connection_specs):
     conn = await trio_asyncio.aio_as_trio(asyncpg.connect
@@ -51,19 +66,34 @@ def asyncpg_execute(asyncpg_conn):
     return _asyncpg_execute
 
 
-@pytest.fixture(params=["from_connect", "from_pool"])
+@pytest.fixture(params=["from_connect", "from_pool", "from_native_pool"])
 async def triopg_conn(request, asyncio_loop, postgresql_connection_specs):
     if request.param == "from_connect":
         async with triopg.connect(**postgresql_connection_specs) as conn:
             yield conn
 
     else:
-        async with triopg.create_pool(**postgresql_connection_specs) as pool:
+        async with triopg.create_pool(
+                trio_native=request.param == "from_native_pool",
+                **postgresql_connection_specs) as pool:
             async with pool.acquire() as conn:
                 yield conn
 
 
-@pytest.fixture
-async def triopg_pool(asyncio_loop, postgresql_connection_specs):
-    async with triopg.create_pool(**postgresql_connection_specs) as pool:
+@pytest.fixture(params=["asyncpg_pool", "native_pool"])
+async def triopg_pool(request, asyncio_loop, postgresql_connection_specs):
+    async with triopg.create_pool(trio_native=request.param == "native_pool",
+                                  **postgresql_connection_specs) as pool:
         yield pool
+
+
+@pytest.fixture(params=["asyncpg_pool", "native_pool"])
+def pool_factory(request, asyncio_loop, postgresql_connection_specs):
+    def _pool_factory(**kwargs):
+        return triopg.create_pool(
+            trio_native=request.param == "native_pool",
+            **postgresql_connection_specs,
+            **kwargs
+        )
+
+    return _pool_factory
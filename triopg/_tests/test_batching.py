@@ -0,0 +1,104 @@
+import pytest
+import trio
+import trio.testing
+import asyncpg
+
+INSERT = "INSERT INTO batching_test VALUES ($1, $2)"
+UPDATE = "UPDATE batching_test SET value = $2 WHERE id = $1"
+# One transaction ID per committed batch
+COUNT_TRANSACTIONS = "SELECT count(DISTINCT xmin::text) FROM batching_test"
+
+
+@pytest.fixture
+async def pool(pool_factory):
+    async with pool_factory() as pool:
+        await pool.execute(
+            "CREATE TABLE batching_test (id int PRIMARY KEY, value text)"
+        )
+        try:
+            yield pool
+        finally:
+            await pool.execute("DROP TABLE batching_test")
+
+
+async def start_in_order(nursery, async_fn, *args):
+    # trio doesn't guarantee tasks start in the order they are spawned
+    nursery.start_soon(async_fn, *args)
+    await trio.testing.wait_all_tasks_blocked()
+
+
+async def execute_all(batcher, statements):
+    async with trio.open_nursery() as nursery:
+        for statement, *args in statements:
+            await start_in_order(nursery, batcher.execute, statement, *args)
+
+
+@pytest.mark.trio
+async def test_group_commit(pool):
+    async with pool.write_batcher(max_delay=0.5) as batcher:
+        inserts = [(INSERT, i, str(i)) for i in range(50)]
+        await execute_all(batcher, inserts + [(UPDATE, 0, "updated")])
+    assert await pool.fetchval("SELECT count(*) FROM batching_test") == 50
+    assert await pool.fetchval(COUNT_TRANSACTIONS) == 1
+    assert await pool.fetchval(
+        "SELECT value FROM batching_test WHERE id = 0"
+    ) == "updated"
+
+
+@pytest.mark.trio
+async def test_max_batch_size(pool):
+    async with pool.write_batcher(max_delay=0.5, max_batch_size=10) as batcher:
+        with trio.fail_after(0.5):
+            await execute_all(
+                batcher, [(INSERT, i, str(i)) for i in range(50)]
+            )
+    assert await pool.fetchval(COUNT_TRANSACTIONS) == 5
+
+
+@pytest.mark.trio
+async def test_per_item_errors(pool):
+    errors = {}
+
+    async def execute(key, *args):
+        try:
+            await batcher.execute(*args)
+        except Exception as exc:
+            errors[key] = exc
+
+    async with pool.write_batcher(max_delay=0.5) as batcher:
+        async with trio.open_nursery() as nursery:
+            await start_in_order(nursery, execute, "first", INSERT, 1, "a")
+            await start_in_order(nursery, execute, "duplicate", INSERT, 1, "b")
+            await start_in_order(
+                nursery, execute, "bad argument", INSERT, "2", "c"
+            )
+            await start_in_order(nursery, execute, "last", INSERT, 3, "d")
+
+    assert set(errors) == {"duplicate", "bad argument"}
+    assert isinstance(errors["duplicate"], asyncpg.UniqueViolationError)
+    assert isinstance(errors["bad argument"], asyncpg.DataError)
+    rows = await pool.fetch("SELECT * FROM batching_test ORDER BY id")
+    assert [tuple(row) for row in rows] == [(1, "a"), (3, "d")]
+
+
+@pytest.mark.trio
+async def test_cancel_pending(pool):
+    async with pool.write_batcher(max_delay=0.5) as batcher:
+        with trio.move_on_after(0.1):
+            await batcher.execute(INSERT, 1, "cancelled")
+        await batcher.execute(INSERT, 2, "kept")
+    ids = await pool.fetchval("SELECT array_agg(id) FROM batching_test")
+    assert ids == [2]
+
+
+@pytest.mark.trio
+async def test_close(pool):
+    async with trio.open_nursery() as nursery:
+        async with pool.write_batcher(max_delay=10) as batcher:
+            nursery.start_soon(batcher.execute, INSERT, 1, "a")
+            await trio.testing.wait_all_tasks_blocked()
+        # Pending statements are committed right away on exit
+    assert await pool.fetchval("SELECT count(*) FROM batching_test") == 1
+
+    with pytest.raises(asyncpg.InterfaceError):
+        await batcher.execute(INSERT, 2, "b")
@@ -0,0 +1,129 @@
+import asyncio
+import gc
+import os
+import signal
+
+import pytest
+import trio
+
+import triopg
+from triopg import _cancel
+
+SLEEP = "SELECT pg_sleep(10)"
+
+
+async def cancel_latency(async_fn, delay=0.1):
+    """Run `async_fn` until cancelled after `delay`
+
+    Return the time it took to return once cancelled.
+    """
+    cancelled_at = None
+
+    with trio.CancelScope() as cancel_scope:
+
+        async def cancel():
+            nonlocal cancelled_at
+            await trio.sleep(delay)
+            cancelled_at = trio.current_time()
+            cancel_scope.cancel()
+
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(cancel)
+            await async_fn()
+    assert cancel_scope.cancelled_caught
+    return trio.current_time() - cancelled_at
+
+
+async def wait_idle(pool):
+    with trio.fail_after(5):
+        while pool.statistics().idle != 1:
+            await trio.sleep(0.01)
+
+
+@pytest.mark.trio
+async def test_pool_cancel(pool_factory):
+    async with pool_factory(min_size=1, max_size=1) as pool:
+        pid = await pool.fetchval("SELECT pg_backend_pid()")
+
+        async def acquire_and_sleep():
+            async with pool.acquire() as conn:
+                await conn.execute(SLEEP)
+
+        async def acquire_and_sleep_in_transaction():
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(SLEEP)
+
+        for async_fn in [
+                acquire_and_sleep,
+                acquire_and_sleep_in_transaction,
+                lambda: pool.fetchval(SLEEP),
+        ]:
+            assert await cancel_latency(async_fn) < 0.1
+            # Returned without waiting for the connection to be released...
+            assert pool.statistics().idle == 0
+            # ...which happens once the server cancelled the query
+            await wait_idle(pool)
+            assert await pool.fetchval("SELECT pg_backend_pid()") == pid
+
+
+@pytest.mark.trio
+async def test_connection_cancel(asyncio_loop, postgresql_connection_specs):
+    async def connect_and_sleep():
+        nonlocal conn
+        async with triopg.connect(**postgresql_connection_specs) as conn:
+            await conn.execute(SLEEP)
+
+    conn = None
+    assert await cancel_latency(connect_and_sleep) < 0.1
+    assert not conn._asyncpg_conn.is_closed()
+    with trio.fail_after(5):
+        while not conn._asyncpg_conn.is_closed():
+            await trio.sleep(0.01)
+
+
+@pytest.mark.trio
+async def test_background_cleanup_kept_alive(asyncio_loop):
+    done = []
+
+    async def cleanup():
+        await asyncio.sleep(0.05)
+        done.append(True)
+
+    _cancel._aio_spawn(asyncio_loop, cleanup())
+    assert len(_cancel._background_tasks) == 1
+    # Nothing else references the task
+    gc.collect()
+    with trio.fail_after(5):
+        while not done:
+            await trio.sleep(0.01)
+    await trio.sleep(0.01)
+    assert not _cancel._background_tasks
+
+
+@pytest.mark.trio
+@pytest.mark.skipif(not hasattr(signal, "SIGSTOP"), reason="needs SIGSTOP")
+async def test_transaction_cancel_unresponsive_server(
+        pool_factory, monkeypatch
+):
+    monkeypatch.setattr(_cancel, "CANCEL_RECOVERY_TIMEOUT", 0.2)
+    async with pool_factory(min_size=1, max_size=1) as pool:
+        pid = await pool.fetchval("SELECT pg_backend_pid()")
+
+        async def freeze_and_sleep():
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute("SELECT 1")
+                    # The server will never acknowledge the cancellation
+                    os.kill(pid, signal.SIGSTOP)
+                    await conn.execute(SLEEP)
+
+        try:
+            latency = await cancel_latency(freeze_and_sleep)
+        finally:
+            os.kill(pid, signal.SIGCONT)
+        # Gave up on the rollback after CANCEL_RECOVERY_TIMEOUT
+        assert 0.2 <= latency < 1
+        # The connection was terminated and replaced
+        with trio.fail_after(5):
+            assert await pool.fetchval("SELECT pg_backend_pid()") != pid
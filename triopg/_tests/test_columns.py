@@ -0,0 +1,113 @@
+from array import array
+
+import pytest
+
+import triopg
+
+QUERY = """
+    SELECT
+        i AS id,
+        i * 1.5::float8 AS ratio,
+        i % 2 = 0 AS even,
+        'row ' || i AS label
+    FROM generate_series(1, $1) i"""
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("chunk_size", [None, 1, 3, 1000])
+async def test_fetch_columns(triopg_conn, chunk_size):
+    columns = await triopg_conn.fetch_columns(QUERY, 10, chunk_size=chunk_size)
+    assert list(columns) == ["id", "ratio", "even", "label"]
+    assert columns["id"] == array("i", range(1, 11))
+    assert columns["ratio"] == array("d", [i * 1.5 for i in range(1, 11)])
+    assert columns["even"] == array("B", [i % 2 == 0 for i in range(1, 11)])
+    assert columns["label"] == ["row {}".format(i) for i in range(1, 11)]
+
+    columns = await triopg_conn.fetch_columns(QUERY, 0, chunk_size=chunk_size)
+    assert columns == {
+        "id": array("i"),
+        "ratio": array("d"),
+        "even": array("B"),
+        "label": [],
+    }
+
+
+@pytest.mark.trio
+async def test_fetch_columns_nulls(triopg_conn):
+    columns = await triopg_conn.fetch_columns(
+        """
+        SELECT i::int8 AS id, nullif(i, 3)::int2 AS small
+        FROM generate_series(1, 5) i""",
+        chunk_size=2
+    )
+    assert columns["id"] == array("q", range(1, 6))
+    # Fixed width columns holding NULLs are lists
+    assert columns["small"] == [1, 2, None, 4, 5]
+
+
+@pytest.mark.trio
+async def test_fetch_columns_transactions(triopg_conn):
+    await triopg_conn.execute("CREATE TEMPORARY TABLE cols (id int)")
+    # Chunks are fetched in a transaction of their own...
+    columns = await triopg_conn.fetch_columns(
+        "INSERT INTO cols SELECT generate_series(1, 5) RETURNING id",
+        chunk_size=2
+    )
+    assert columns["id"] == array("i", range(1, 6))
+    assert not triopg_conn.is_in_transaction()
+
+    # ...or in the current one
+    async with triopg_conn.transaction():
+        await triopg_conn.fetch_columns(
+            "INSERT INTO cols VALUES (6) RETURNING id", chunk_size=2
+        )
+        assert await triopg_conn.fetchval(
+            "SELECT count(*) FROM pg_cursors WHERE name != ''"
+        ) == 0
+    assert await triopg_conn.fetchval("SELECT count(*) FROM cols") == 6
+
+    with pytest.raises(ValueError):
+        await triopg_conn.fetch_columns("SELECT 1", chunk_size=0)
+
+
+@pytest.mark.trio
+async def test_statement_fetch_columns(triopg_conn):
+    statement = await triopg_conn.prepare(QUERY)
+    columns = await statement.fetch_columns(3, chunk_size=2)
+    assert columns["id"] == array("i", [1, 2, 3])
+    assert await statement.fetch_columns(1) == {
+        "id": array("i", [1]),
+        "ratio": array("d", [1.5]),
+        "even": array("B", [False]),
+        "label": ["row 1"],
+    }
+
+
+@pytest.mark.trio
+async def test_pool_fetch_columns(triopg_pool):
+    columns = await triopg_pool.fetch_columns(QUERY, 4, chunk_size=None)
+    assert columns["id"] == array("i", [1, 2, 3, 4])
+
+
+@pytest.mark.trio
+async def test_fetch_columns_numpy(triopg_conn):
+    numpy = pytest.importorskip("numpy")
+    columns = await triopg_conn.fetch_columns(QUERY, 4, numpy=True)
+    assert columns["id"].dtype == numpy.int32
+    assert columns["even"].tolist() == [False, True, False, True]
+    assert columns["label"] == ["row 1", "row 2", "row 3", "row 4"]
+
+
+@pytest.mark.trio
+async def test_fetch_columns_traced(asyncio_loop, postgresql_connection_specs):
+    events = []
+
+    class Tracer(triopg.QueryTracer):
+        def after_query(self, event):
+            events.append(event)
+
+    async with triopg.connect(tracer=Tracer(),
+                              **postgresql_connection_specs) as conn:
+        await conn.fetch_columns(QUERY, 5, chunk_size=2)
+    (event,) = events
+    assert (event.method, event.rows) == ("fetch_columns", 5)
@@ -0,0 +1,261 @@
+import itertools
+
+import pytest
+import trio
+import trio.testing
+
+import triopg
+
+
+@pytest.fixture
+async def copy_conn(triopg_conn):
+    await triopg_conn.execute(
+        """
+        DROP TABLE IF EXISTS copied;
+        CREATE TABLE copied (id int PRIMARY KEY, name text)"""
+    )
+    return triopg_conn
+
+
+async def _records(count):
+    for i in range(count):
+        if i % 100 == 0:
+            await trio.sleep(0)
+        yield (i, str(i))
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("chunk_size", [None, 1, 7, 1000])
+async def test_copy_records_from_async_iterable(copy_conn, chunk_size):
+    status = await copy_conn.copy_records_to_table(
+        "copied", records=_records(250), chunk_size=chunk_size
+    )
+    assert status == "COPY 250"
+    assert await copy_conn.fetchval("SELECT sum(id) FROM copied") == sum(
+        range(250)
+    )
+
+
+@pytest.mark.trio
+async def test_copy_records_from_memory_channel(copy_conn):
+    send_channel, receive_channel = trio.open_memory_channel(0)
+
+    async def _producer():
+        async with send_channel:
+            async for record in _records(100):
+                await send_channel.send(record)
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(_producer)
+        status = await copy_conn.copy_records_to_table(
+            "copied",
+            records=receive_channel,
+            columns=["id", "name"],
+            chunk_size=10
+        )
+    assert status == "COPY 100"
+
+    # Plain iterables are still handed to asyncpg as-is
+    status = await copy_conn.copy_records_to_table(
+        "copied", records=[(100, "100")]
+    )
+    assert status == "COPY 1"
+
+
+@pytest.mark.trio
+async def test_copy_data_from_async_iterable(copy_conn):
+    async def _lines():
+        for i in range(50):
+            yield "{},name {}\n".format(i, i).encode()
+
+    status = await copy_conn.copy_to_table(
+        "copied", source=_lines(), format="csv", chunk_size=8
+    )
+    assert status == "COPY 50"
+    assert await copy_conn.fetchval(
+        "SELECT name FROM copied WHERE id = 42"
+    ) == "name 42"
+
+
+@pytest.mark.trio
+async def test_copy_from_failing_source(copy_conn):
+    class SourceError(Exception):
+        pass
+
+    async def _failing_records():
+        async for record in _records(50):
+            yield record
+        raise SourceError()
+
+    with pytest.raises(SourceError):
+        await copy_conn.copy_records_to_table(
+            "copied", records=_failing_records(), chunk_size=10
+        )
+    # The COPY is aborted and the connection still usable
+    assert await copy_conn.fetchval("SELECT count(*) FROM copied") == 0
+
+    await copy_conn.copy_records_to_table(
+        "copied", records=_records(10), chunk_size=3
+    )
+    with pytest.raises(triopg.UniqueViolationError):
+        await copy_conn.copy_records_to_table(
+            "copied", records=_records(10), chunk_size=3
+        )
+    assert await copy_conn.fetchval("SELECT count(*) FROM copied") == 10
+
+
+@pytest.mark.trio
+async def test_copy_from_endless_source_cancelled(copy_conn):
+    # Records are streamed: an endless source doesn't pile up in memory
+    produced = 0
+
+    async def _endless_records():
+        nonlocal produced
+        for i in itertools.count():
+            produced += 1
+            yield (i, None)
+
+    with trio.move_on_after(0.5):
+        await copy_conn.copy_records_to_table(
+            "copied", records=_endless_records(), chunk_size=100
+        )
+    assert produced > 100
+    assert await copy_conn.fetchval("SELECT count(*) FROM copied") == 0
+
+
+@pytest.mark.trio
+async def test_copy_invalid_chunk_size(copy_conn):
+    with pytest.raises(ValueError):
+        await copy_conn.copy_records_to_table(
+            "copied", records=_records(1), chunk_size=0
+        )
+
+
+@pytest.mark.trio
+async def test_pool_copy_records(triopg_pool):
+    await triopg_pool.execute(
+        """
+        DROP TABLE IF EXISTS copied;
+        CREATE TABLE copied (id int PRIMARY KEY, name text)"""
+    )
+    status = await triopg_pool.copy_records_to_table(
+        "copied", records=_records(20)
+    )
+    assert status == "COPY 20"
+    status = await triopg_pool.copy_to_table(
+        "copied", source=_records_csv(20, 40), format="csv"
+    )
+    assert status == "COPY 20"
+    assert await triopg_pool.fetchval("SELECT count(*) FROM copied") == 40
+
+
+async def _records_csv(start, stop):
+    for i in range(start, stop):
+        yield "{},{}\n".format(i, i).encode()
+
+
+EXPORT_QUERY = "SELECT i, repeat('x', 100) FROM generate_series(1, 5000) i"
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("chunk_size", [None, 1, 10000])
+async def test_copy_out_to_memory_channel(triopg_conn, chunk_size):
+    send_channel, receive_channel = trio.open_memory_channel(0)
+    chunks = []
+
+    async def _consumer():
+        async for chunk in receive_channel:
+            chunks.append(chunk)
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(_consumer)
+        async with send_channel:
+            status = await triopg_conn.copy_from_query(
+                EXPORT_QUERY,
+                output=send_channel,
+                chunk_size=chunk_size,
+                max_buffer_size=1
+            )
+    assert status == "COPY 5000"
+    data = b"".join(chunks)
+    assert data.splitlines()[-1] == b"5000\t" + b"x" * 100
+    assert len(data.splitlines()) == 5000
+    if chunk_size == 10000:
+        assert all(len(chunk) >= 10000 for chunk in chunks[:-1])
+
+
+@pytest.mark.trio
+async def test_copy_out_to_stream_and_path(triopg_conn, tmp_path):
+    send_stream, receive_stream = trio.testing.memory_stream_one_way_pair()
+    received = bytearray()
+
+    async def _reader():
+        async with receive_stream:
+            while True:
+                data = await receive_stream.receive_some()
+                if not data:
+                    break
+                received.extend(data)
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(_reader)
+        async with send_stream:
+            await triopg_conn.copy_from_query(
+                "SELECT * FROM generate_series(1, $1)",
+                3,
+                output=send_stream,
+                format="csv"
+            )
+    assert bytes(received) == b"1\n2\n3\n"
+
+    await triopg_conn.execute(
+        """
+        DROP TABLE IF EXISTS exported;
+        CREATE TABLE exported AS SELECT generate_series(1, 3) AS id"""
+    )
+    path = trio.Path(tmp_path / "exported.csv")
+    status = await triopg_conn.copy_from_table(
+        "exported", output=path, format="csv"
+    )
+    assert status == "COPY 3"
+    assert await path.read_bytes() == b"1\n2\n3\n"
+
+
+@pytest.mark.trio
+async def test_copy_out_slow_output(triopg_conn):
+    send_channel, receive_channel = trio.open_memory_channel(0)
+
+    # A stuck consumer throttles the COPY, which can then be cancelled
+    with trio.move_on_after(0.5) as cancel_scope:
+        await triopg_conn.copy_from_query(
+            "SELECT * FROM generate_series(1, 10000000)",
+            output=send_channel,
+            chunk_size=1024,
+            max_buffer_size=2
+        )
+    assert cancel_scope.cancelled_caught
+    assert receive_channel.statistics().current_buffer_used == 0
+    assert await triopg_conn.fetchval("SELECT 1") == 1
+
+
+@pytest.mark.trio
+async def test_copy_out_failing_output(triopg_conn):
+    send_channel, receive_channel = trio.open_memory_channel(1)
+    await receive_channel.aclose()
+
+    with pytest.raises(trio.BrokenResourceError):
+        await triopg_conn.copy_from_query(
+            EXPORT_QUERY, output=send_channel, chunk_size=1024
+        )
+    assert await triopg_conn.fetchval("SELECT 1") == 1
+
+
+@pytest.mark.trio
+async def test_pool_copy_out(triopg_pool):
+    send_channel, receive_channel = trio.open_memory_channel(10)
+    async with send_channel:
+        status = await triopg_pool.copy_from_query(
+            "SELECT 1", output=send_channel
+        )
+    assert status == "COPY 1"
+    assert [chunk async for chunk in receive_channel] == [b"1\n"]
@@ -0,0 +1,111 @@
+import asyncio
+
+import asyncpg
+import pytest
+import trio
+
+from triopg._deadlines import _bounded_by_deadline
+
+QUERY = "SELECT 1"
+
+
+@_bounded_by_deadline
+async def get_timeout(timeout=None):
+    return timeout
+
+
+@pytest.mark.trio
+async def test_bounded_by_deadline():
+    assert await get_timeout() is None
+    assert await get_timeout(timeout=3) == 3
+    with trio.move_on_after(10):
+        assert 9 < await get_timeout() <= 10
+        assert 9 < await get_timeout(timeout=60) <= 10
+        assert await get_timeout(timeout=3) == 3
+        with trio.CancelScope(shield=True):
+            assert await get_timeout() is None
+
+
+@pytest.mark.trio
+async def test_bounded_by_deadline_timeout():
+    @_bounded_by_deadline
+    async def time_out(timeout=None):
+        raise asyncio.TimeoutError()
+
+    # The timeout derived from the deadline expires with the cancel scope
+    with trio.move_on_after(0.05) as scope:
+        await time_out()
+    assert scope.cancelled_caught
+
+    with trio.move_on_after(10):
+        with pytest.raises(asyncio.TimeoutError):
+            await time_out(timeout=1)
+
+
+@pytest.fixture
+def timeouts(monkeypatch):
+    """Record the `timeout` asyncpg query methods are called with"""
+    recorded = []
+    methods = [
+        (asyncpg.connection.Connection, "fetchval"),
+        (asyncpg.connection.Connection, "execute"),
+        (asyncpg.prepared_stmt.PreparedStatement, "fetchval"),
+        (asyncpg.cursor.Cursor, "fetch"),
+    ]
+    for cls, name in methods:
+        original = getattr(cls, name)
+        key = "{}.{}".format(cls.__name__, name)
+
+        async def spy(self, *args, _original=original, _key=key, **kwargs):
+            recorded.append((_key, kwargs.get("timeout")))
+            return await _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(cls, name, spy)
+
+    def _timeouts(key):
+        # Consumed, so each check only sees its own calls
+        found = [timeout for name, timeout in recorded if name == key]
+        recorded.clear()
+        assert found, "{} not called".format(key)
+        return found
+
+    return _timeouts
+
+
+async def assert_deadline_propagated(call, timeouts, key):
+    await call()
+    assert set(timeouts(key)) == {None}
+    with trio.move_on_after(10):
+        await call()
+    # Given to asyncpg, which cancels the query on its own once it expires
+    assert all(9 < timeout <= 10 for timeout in timeouts(key))
+
+
+@pytest.mark.trio
+async def test_deadline_propagation(triopg_conn, timeouts):
+    statement = await triopg_conn.prepare(QUERY)
+
+    async def cursor_fetch():
+        async with triopg_conn.transaction():
+            return [row async for row in triopg_conn.cursor(QUERY)]
+
+    for call, key in [
+        (lambda: triopg_conn.fetchval(QUERY), "Connection.fetchval"),
+        (lambda: triopg_conn.execute(QUERY), "Connection.execute"),
+        (lambda: statement.fetchval(), "PreparedStatement.fetchval"),
+        (lambda: triopg_conn.fetch_columns(QUERY), "Cursor.fetch"),
+        (cursor_fetch, "Cursor.fetch"),
+    ]:
+        await assert_deadline_propagated(call, timeouts, key)
+
+    # Shorter timeouts are left alone
+    with trio.move_on_after(10):
+        await triopg_conn.fetchval(QUERY, timeout=3)
+    assert timeouts("Connection.fetchval") == [3]
+
+
+@pytest.mark.trio
+async def test_pool_deadline_propagation(triopg_pool, timeouts):
+    await assert_deadline_propagated(
+        lambda: triopg_pool.fetchval(QUERY), timeouts, "Connection.fetchval"
+    )
@@ -0,0 +1,111 @@
+from typing import NamedTuple
+
+import pytest
+import trio
+import asyncpg
+
+DOUBLE = "SELECT $1::int * 2"
+SLEEP_AND_DOUBLE = "SELECT $1::int * 2 FROM pg_sleep($2)"
+BACKEND_PID = "SELECT pg_backend_pid() FROM pg_sleep($1)"
+SLEEP_AND_DIVIDE = "SELECT 1 / $1::int FROM pg_sleep($2)"
+
+
+@pytest.mark.trio
+async def test_fetch_many(triopg_pool):
+    args = [(i,) for i in range(100)]
+    values = await triopg_pool.fetch_many(DOUBLE, args, method="fetchval")
+    assert values == [i * 2 for i in range(100)]
+    results = await triopg_pool.fetch_many(DOUBLE, args[:3])
+    rows = [[tuple(row) for row in result] for result in results]
+    assert rows == [[(0,)], [(2,)], [(4,)]]
+    row = (await triopg_pool.fetch_many(DOUBLE, [(1,)], method="fetchrow"))[0]
+    assert tuple(row) == (2,)
+    assert await triopg_pool.fetch_many(DOUBLE, []) == []
+
+
+@pytest.mark.trio
+async def test_map_order(triopg_pool):
+    # A lazy iterable, later queries completing first
+    delays = [(30 - i) / 600 for i in range(30)]
+    args = ((i, delay) for i, delay in enumerate(delays))
+    async with triopg_pool.map(SLEEP_AND_DOUBLE, args,
+                               method="fetchval") as results:
+        values = [result async for result in results]
+    assert values == [i * 2 for i in range(30)]
+
+    args = [(i, delay) for i, delay in enumerate(delays)]
+    async with triopg_pool.map(SLEEP_AND_DOUBLE, args, method="fetchval",
+                               ordered=False) as results:
+        pairs = [pair async for pair in results]
+    assert sorted(pairs) == [(i, i * 2) for i in range(30)]
+    assert pairs[0][0] != 0
+
+
+@pytest.mark.trio
+async def test_map_concurrency(triopg_pool):
+    pids = await triopg_pool.fetch_many(
+        BACKEND_PID, [(0.01,)] * 20, concurrency=3, method="fetchval"
+    )
+    assert len(set(pids)) <= 3
+    assert triopg_pool.statistics().max_size == 10
+    with trio.fail_after(1):
+        # Run on all 10 connections by default
+        await triopg_pool.fetch_many(
+            BACKEND_PID, [(0.2,)] * 10, method="fetchval"
+        )
+
+
+@pytest.mark.trio
+async def test_map_error_cancels(triopg_pool):
+    args = [(1, 10)] * 5 + [(0, 0)]
+    with trio.fail_after(5):
+        with pytest.raises(asyncpg.DivisionByZeroError):
+            await triopg_pool.fetch_many(
+                SLEEP_AND_DIVIDE, args, method="fetchval"
+            )
+    # The cancelled queries give their connections back
+    with trio.fail_after(5):
+        while triopg_pool.statistics().in_use:
+            await trio.sleep(0.01)
+
+
+@pytest.mark.trio
+async def test_map_leave_early(triopg_pool):
+    args = [(0, 0)] + [(i, 10) for i in range(1, 20)]
+    with trio.fail_after(5):
+        async with triopg_pool.map(SLEEP_AND_DOUBLE, args,
+                                   method="fetchval") as results:
+            async for result in results:
+                assert result == 0
+                break
+
+
+class Doubled(NamedTuple):
+    value: int
+
+
+class DoubledRecord(asyncpg.Record):
+    pass
+
+
+@pytest.mark.trio
+async def test_map_record_class(triopg_pool):
+    query = "SELECT $1::int * 2 AS value"
+    args = [(1,), (2,)]
+    rows = await triopg_pool.fetch_many(
+        query, args, method="fetchrow", record_class=Doubled
+    )
+    assert rows == [Doubled(2), Doubled(4)]
+    rows = await triopg_pool.fetch_many(
+        query, args, method="fetchrow", record_class=DoubledRecord
+    )
+    assert [type(row) for row in rows] == [DoubledRecord] * 2
+    assert [row["value"] for row in rows] == [2, 4]
+
+
+@pytest.mark.trio
+async def test_map_arguments(triopg_pool):
+    with pytest.raises(ValueError):
+        await triopg_pool.fetch_many(DOUBLE, [(1,)], method="execute")
+    with pytest.raises(ValueError):
+        await triopg_pool.fetch_many(DOUBLE, [(1,)], concurrency=0)
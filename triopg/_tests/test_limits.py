@@ -0,0 +1,149 @@
+import math
+from dataclasses import dataclass
+
+import pytest
+import asyncpg
+
+import triopg
+
+SERIES = "SELECT i, repeat('x', 100) AS padding FROM generate_series(1, $1) i"
+
+
+@dataclass
+class Row:
+    i: int
+
+
+@pytest.mark.trio
+async def test_fetch_max_rows(triopg_conn):
+    rows = await triopg_conn.fetch(SERIES, 10, max_rows=10)
+    assert [row["i"] for row in rows] == list(range(1, 11))
+    with pytest.raises(triopg.ResultTooLargeError):
+        await triopg_conn.fetch(SERIES, 10, max_rows=9)
+    rows = await triopg_conn.fetch(SERIES, 3, max_rows=5, record_class=Row)
+    assert rows == [Row(1), Row(2), Row(3)]
+    assert await triopg_conn.fetchval("SELECT 1") == 1
+
+
+@pytest.mark.trio
+async def test_fetch_max_bytes(triopg_conn):
+    # Several chunks
+    rows = await triopg_conn.fetch(SERIES, 2500, max_bytes=10**8)
+    assert [row["i"] for row in rows] == list(range(1, 2501))
+    with pytest.raises(triopg.ResultTooLargeError):
+        await triopg_conn.fetch(SERIES, 2500, max_bytes=100000)
+    with pytest.raises(triopg.ResultTooLargeError):
+        await triopg_conn.fetch(SERIES, 2500, max_rows=2000, max_bytes=10**8)
+    assert not triopg_conn.is_in_transaction()
+
+    async with triopg_conn.transaction():
+        rows = await triopg_conn.fetch(SERIES, 10, max_bytes=10**8)
+        assert len(rows) == 10
+        with pytest.raises(triopg.ResultTooLargeError):
+            await triopg_conn.fetch(SERIES, 2500, max_bytes=100000)
+        # The transaction is still usable
+        assert await triopg_conn.fetchval("SELECT 1") == 1
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("limits", [{"max_rows": 2}, {"max_bytes": 100}])
+async def test_fetch_too_large_rolled_back(triopg_conn, limits):
+    insert = "INSERT INTO limits_test SELECT generate_series(1, 5) RETURNING i"
+    count = "SELECT count(*) FROM limits_test"
+    await triopg_conn.execute("CREATE TABLE limits_test (i int)")
+    try:
+        with pytest.raises(triopg.ResultTooLargeError):
+            await triopg_conn.fetch(insert, **limits)
+        assert await triopg_conn.fetchval(count) == 0
+        assert not triopg_conn.is_in_transaction()
+
+        async with triopg_conn.transaction():
+            await triopg_conn.execute("INSERT INTO limits_test VALUES (0)")
+            with pytest.raises(triopg.ResultTooLargeError):
+                await triopg_conn.fetch(insert, **limits)
+            # Only back to the savepoint
+            assert await triopg_conn.fetchval(count) == 1
+        assert await triopg_conn.fetchval(count) == 1
+    finally:
+        await triopg_conn.execute("DROP TABLE limits_test")
+
+
+@pytest.mark.trio
+async def test_pool_fetch_too_large_rolled_back(triopg_pool):
+    await triopg_pool.execute("CREATE TABLE limits_test (i int)")
+    try:
+        with pytest.raises(triopg.ResultTooLargeError):
+            await triopg_pool.fetch(
+                "INSERT INTO limits_test VALUES (1), (2) RETURNING i",
+                max_rows=1
+            )
+        count = "SELECT count(*) FROM limits_test"
+        assert await triopg_pool.fetchval(count) == 0
+    finally:
+        await triopg_pool.execute("DROP TABLE limits_test")
+
+
+@pytest.mark.trio
+async def test_fetch_errors(triopg_conn):
+    with pytest.raises(asyncpg.DivisionByZeroError):
+        await triopg_conn.fetch("SELECT 1 / 0", max_bytes=1000)
+    with pytest.raises(ValueError):
+        await triopg_conn.fetch(SERIES, 1, max_rows=0)
+
+
+@pytest.mark.trio
+async def test_pool_defaults(pool_factory):
+    async with pool_factory(fetch_max_rows=5, min_size=1, max_size=1) as pool:
+        assert len(await pool.fetch(SERIES, 5)) == 5
+        pid = await pool.fetchval("SELECT pg_backend_pid()")
+        with pytest.raises(triopg.ResultTooLargeError):
+            await pool.fetch(SERIES, 6)
+        # The connection is kept
+        assert await pool.fetchval("SELECT pg_backend_pid()") == pid
+        assert len(await pool.fetch(SERIES, 6, max_rows=math.inf)) == 6
+        assert len(await pool.fetch(SERIES, 6, max_rows=6)) == 6
+        with pytest.raises(triopg.ResultTooLargeError):
+            await pool.fetch(SERIES, 5, max_bytes=100)
+        async with pool.acquire() as conn:
+            with pytest.raises(triopg.ResultTooLargeError):
+                await conn.fetch(SERIES, 6)
+        assert pool.statistics().in_use == 0
+
+    async with pool_factory(fetch_max_bytes=100000) as pool:
+        with pytest.raises(triopg.ResultTooLargeError):
+            await pool.fetch(SERIES, 2500)
+        rows = await pool.fetch(SERIES, 2500, max_bytes=math.inf)
+        assert len(rows) == 2500
+
+    with pytest.raises(ValueError):
+        pool_factory(fetch_max_bytes=0)
+
+
+@pytest.mark.trio
+async def test_stream(triopg_conn):
+    async with triopg_conn.stream(SERIES, 2500, chunk_size=1000) as rows:
+        values = [row["i"] async for row in rows]
+    assert values == list(range(1, 2501))
+    assert not triopg_conn.is_in_transaction()
+
+    async with triopg_conn.transaction():
+        async with triopg_conn.stream(SERIES, 3, record_class=Row) as rows:
+            assert [row async for row in rows] == [Row(1), Row(2), Row(3)]
+        assert triopg_conn.is_in_transaction()
+
+    # Leaving early
+    async with triopg_conn.stream(SERIES, 2500) as rows:
+        async for row in rows:
+            break
+    assert await triopg_conn.fetchval("SELECT 1") == 1
+
+
+@pytest.mark.trio
+async def test_pool_stream(triopg_pool):
+    async with triopg_pool.stream(SERIES, 2500, chunk_size=100) as rows:
+        assert triopg_pool.statistics().in_use == 1
+        count = 0
+        async for row in rows:
+            count += 1
+    assert count == 2500
+    assert triopg_pool.statistics().in_use == 0
@@ -0,0 +1,215 @@
+import gc
+import weakref
+
+import pytest
+import trio
+import trio.testing
+
+import triopg
+
+
+@pytest.fixture
+def native_pool_factory(asyncio_loop, postgresql_connection_specs):
+    def _native_pool_factory(**kwargs):
+        return triopg.create_pool(
+            trio_native=True, **postgresql_connection_specs, **kwargs
+        )
+
+    return _native_pool_factory
+
+
+@pytest.mark.trio
+async def test_native_pool_size(native_pool_factory):
+    async with native_pool_factory(min_size=0, max_size=2) as pool:
+        assert isinstance(pool, triopg.TrioNativePool)
+        assert pool.get_size() == 0
+        assert await pool.fetchval("SELECT 1") == 1
+        assert pool.get_size() == 1
+        assert pool.get_idle_size() == 1
+
+        max_seen = 0
+
+        async def _query():
+            nonlocal max_seen
+            await pool.execute("SELECT pg_sleep(0.01)")
+            max_seen = max(max_seen, pool.get_size())
+
+        async with trio.open_nursery() as nursery:
+            for _ in range(10):
+                nursery.start_soon(_query)
+        assert max_seen == 2
+        assert pool.get_size() == pool.get_idle_size() == 2
+
+    async with native_pool_factory(min_size=3, max_size=5) as pool:
+        assert pool.get_size() == pool.get_idle_size() == 3
+    assert pool.get_size() == 0
+
+
+@pytest.mark.trio
+async def test_native_pool_fifo_fairness(native_pool_factory):
+    order = []
+
+    async def _waiter(pool, index, task_status=trio.TASK_STATUS_IGNORED):
+        task_status.started()
+        async with pool.acquire():
+            order.append(index)
+
+    async with native_pool_factory(min_size=1, max_size=1) as pool:
+        async with trio.open_nursery() as nursery:
+            async with pool.acquire():
+                for index in range(5):
+                    await nursery.start(_waiter, pool, index)
+                    await trio.testing.wait_all_tasks_blocked()
+    assert order == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.trio
+async def test_native_pool_connection_reuse(native_pool_factory):
+    async with native_pool_factory(min_size=1, max_size=1) as pool:
+        pid = await pool.fetchval("SELECT pg_backend_pid()")
+
+        # Server-side errors don't discard the connection
+        with pytest.raises(triopg.DivisionByZeroError):
+            await pool.fetchval("SELECT 1 / 0")
+        assert await pool.fetchval("SELECT pg_backend_pid()") == pid
+
+        # ...but a connection left in a transaction is
+        await pool.execute("BEGIN")
+        assert pool.get_size() == 0
+        assert await pool.fetchval("SELECT pg_backend_pid()") != pid
+
+
+@pytest.mark.trio
+async def test_native_pool_acquire_resets_connection(native_pool_factory):
+    async with native_pool_factory(min_size=1, max_size=1) as pool:
+        async with pool.acquire() as conn:
+            await conn.execute("SET application_name = 'dirty'")
+        async with pool.acquire() as conn:
+            assert await conn.fetchval("SHOW application_name") == ""
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("kwarg", ["setup", "reset", "connect"])
+async def test_native_pool_unsupported_arguments(native_pool_factory, kwarg):
+    with pytest.raises(TypeError, match=kwarg):
+        native_pool_factory(**{kwarg: None})
+
+
+@pytest.mark.trio
+async def test_native_pool_max_queries(native_pool_factory):
+    async with native_pool_factory(min_size=1, max_size=1,
+                                   max_queries=2) as pool:
+        pid1 = await pool.fetchval("SELECT pg_backend_pid()")
+        pid2 = await pool.fetchval("SELECT pg_backend_pid()")
+        pid3 = await pool.fetchval("SELECT pg_backend_pid()")
+        assert pid1 == pid2 != pid3
+
+
+@pytest.mark.trio
+async def test_native_pool_frees_replaced_connections(native_pool_factory):
+    async with native_pool_factory(min_size=1, max_size=1,
+                                   max_queries=1) as pool:
+        async with pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+            replaced = weakref.ref(conn._asyncpg_conn)
+        del conn
+        async with pool.acquire() as conn:
+            assert conn._asyncpg_conn is not replaced()
+        del conn
+        # Replaced connections are closed in the background
+        await trio.sleep(0.1)
+        gc.collect()
+        assert replaced() is None
+
+
+@pytest.mark.trio
+async def test_native_pool_inactive_connection_lifetime(native_pool_factory):
+    async with native_pool_factory(
+            min_size=1, max_size=3,
+            max_inactive_connection_lifetime=0.1) as pool:
+        async with pool.acquire(), pool.acquire(), pool.acquire():
+            pass
+        assert pool.get_size() == 3
+        await trio.sleep(0.5)
+        # Never goes below min_size
+        assert pool.get_size() == 1
+
+
+@pytest.mark.trio
+async def test_native_pool_init(native_pool_factory):
+    initialized = []
+
+    async def _init(asyncpg_conn):
+        initialized.append(asyncpg_conn)
+        assert await asyncpg_conn.fetchval("SELECT 1") == 1
+
+    async with native_pool_factory(min_size=1, max_size=2, init=_init) as pool:
+        assert len(initialized) == 1
+        async with pool.acquire(), pool.acquire() as conn:
+            assert await conn.fetchval("SELECT 1") == 1
+        assert len(initialized) == 2
+
+
+@pytest.mark.trio
+async def test_native_pool_acquire_cancelled(native_pool_factory):
+    async with native_pool_factory(min_size=1, max_size=1) as pool:
+        async with pool.acquire():
+            with trio.move_on_after(0.01):
+                await pool.fetchval("SELECT 1")  # Waits for a free slot
+        assert await pool.fetchval("SELECT 1") == 1
+
+        with trio.move_on_after(0.1):
+            await pool.execute("SELECT pg_sleep(10)")
+        assert await pool.fetchval("SELECT 1") == 1
+
+
+@pytest.mark.trio
+async def test_native_pool_closed(native_pool_factory):
+    pool = native_pool_factory(min_size=1, max_size=1)
+    with pytest.raises(triopg.InterfaceError):
+        await pool.fetchval("SELECT 1")
+
+    async with pool:
+        pass
+
+    with pytest.raises(triopg.InterfaceError):
+        await pool.fetchval("SELECT 1")
+    with pytest.raises(triopg.InterfaceError):
+        async with pool.acquire():
+            pass  # pragma: no cover
+
+
+@pytest.mark.trio
+async def test_native_pool_close_waits_for_release(native_pool_factory):
+    async with native_pool_factory(min_size=1, max_size=1) as pool:
+        released = False
+
+        async def _hold_connection(task_status=trio.TASK_STATUS_IGNORED):
+            nonlocal released
+            async with pool.acquire() as conn:
+                task_status.started()
+                await trio.sleep(0.1)
+                await conn.fetchval("SELECT 1")
+                released = True
+
+        async with trio.open_nursery() as nursery:
+            await nursery.start(_hold_connection)
+            await pool.close()
+            assert released
+            assert pool.get_size() == 0
+
+
+@pytest.mark.trio
+async def test_native_pool_connect_failure(
+        asyncio_loop, postgresql_connection_specs
+):
+    specs = {**postgresql_connection_specs, "database": "does_not_exist"}
+    with pytest.raises(triopg.InvalidCatalogNameError):
+        async with triopg.create_pool(trio_native=True, min_size=1, **specs):
+            pass  # pragma: no cover
+
+    async with triopg.create_pool(trio_native=True, min_size=0,
+                                  **specs) as pool:
+        with pytest.raises(triopg.InvalidCatalogNameError):
+            await pool.fetchval("SELECT 1")
+        assert pool.get_size() == 0
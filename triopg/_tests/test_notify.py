@@ -0,0 +1,175 @@
+import pytest
+import trio
+
+import triopg
+
+
+@pytest.fixture
+async def hub(triopg_pool):
+    async with triopg_pool.notification_hub(reconnect_delay=0.01) as hub:
+        yield hub
+
+
+async def listening_channels(hub):
+    query = "SELECT array(SELECT pg_listening_channels())"
+    return sorted(await hub._conn.fetchval(query))
+
+
+async def wait_listening(hub, channels):
+    while hub._conn is None or await listening_channels(hub) != channels:
+        await trio.sleep(0.01)
+
+
+@pytest.mark.trio
+async def test_hub_fan_out(hub, asyncpg_execute):
+    async with hub.subscribe("foo", max_buffer_size=10) as foo1, \
+            hub.subscribe("foo", max_buffer_size=10) as foo2, \
+            hub.subscribe("bar", max_buffer_size=10) as bar:
+        # A single LISTEN per channel
+        assert await listening_channels(hub) == ["bar", "foo"]
+
+        await asyncpg_execute("NOTIFY foo, '1'")
+        await asyncpg_execute("NOTIFY bar, '2'")
+        assert await foo1.receive() == "1"
+        assert await foo2.receive() == "1"
+        assert await bar.receive() == "2"
+
+        async with hub.subscribe("foo", max_buffer_size=10) as foo3:
+            await asyncpg_execute("NOTIFY foo, '3'")
+            assert await foo3.receive() == "3"
+        assert await foo1.receive() == "3"
+        assert await foo2.receive() == "3"
+
+    assert await listening_channels(hub) == []
+    with pytest.raises(trio.ClosedResourceError):
+        await foo1.receive()
+
+
+@pytest.mark.trio
+async def test_hub_unlisten_last_subscriber(hub):
+    async with hub.subscribe("foo", max_buffer_size=1):
+        async with hub.subscribe("bar", max_buffer_size=1):
+            assert await listening_channels(hub) == ["bar", "foo"]
+        assert await listening_channels(hub) == ["foo"]
+    assert await listening_channels(hub) == []
+
+
+@pytest.mark.trio
+async def test_hub_overflow_per_subscriber(hub, asyncpg_execute):
+    async with hub.subscribe("foo", max_buffer_size=1) as notify, \
+            hub.subscribe(
+                "foo", max_buffer_size=2, overflow="drop_oldest"
+            ) as drop_oldest:
+        for i in range(4):
+            await asyncpg_execute("NOTIFY foo, '{}'".format(i))
+        assert await drop_oldest.receive() == "2"
+        assert await drop_oldest.receive() == "3"
+        assert await notify.receive() == "0"
+        assert await notify.receive() is triopg.NOTIFY_OVERFLOW
+
+
+@pytest.mark.trio
+async def test_hub_coalesce(hub, asyncpg_execute):
+    async with hub.subscribe("foo", max_buffer_size=10, coalesce="latest",
+                             key=len, batch=True) as latest:
+        async with hub.subscribe("sync", max_buffer_size=1) as sync:
+            for payload in ["a", "bb", "c", "dd"]:
+                await asyncpg_execute("NOTIFY foo, '{}'".format(payload))
+            # Notifications are delivered in order
+            await asyncpg_execute("NOTIFY sync")
+            await sync.receive()
+        assert await latest.receive() == ["c", "dd"]
+
+        pid = hub._conn.get_server_pid()
+        await asyncpg_execute("SELECT pg_terminate_backend({})".format(pid))
+        assert await latest.receive() == [triopg.NOTIFY_OVERFLOW]
+
+
+@pytest.mark.trio
+async def test_hub_reconnect(hub, asyncpg_execute):
+    async with hub.subscribe("foo", max_buffer_size=10) as foo:
+        pid = hub._conn.get_server_pid()
+        await asyncpg_execute("SELECT pg_terminate_backend({})".format(pid))
+        # Notifications may have been lost in between
+        assert await foo.receive() is triopg.NOTIFY_OVERFLOW
+
+        await wait_listening(hub, ["foo"])
+        assert hub._conn.get_server_pid() != pid
+        await asyncpg_execute("NOTIFY foo, 'back'")
+        assert await foo.receive() == "back"
+
+        # Subscribing while reconnecting is fine too
+        pid = hub._conn.get_server_pid()
+        await asyncpg_execute("SELECT pg_terminate_backend({})".format(pid))
+        while hub._conn is not None:
+            await trio.sleep(0)
+        async with hub.subscribe("bar", max_buffer_size=10) as bar:
+            assert await foo.receive() is triopg.NOTIFY_OVERFLOW
+            await wait_listening(hub, ["bar", "foo"])
+            # Subscribed while nobody was listening
+            assert await bar.receive() is triopg.NOTIFY_OVERFLOW
+            await asyncpg_execute("NOTIFY bar, 'new'")
+            assert await bar.receive() == "new"
+
+
+@pytest.mark.trio
+async def test_hub_overflow_once_listening_again(triopg_pool, asyncpg_execute):
+    async with triopg_pool.notification_hub(reconnect_delay=0.5) as hub:
+        async with hub.subscribe("foo", max_buffer_size=10) as foo:
+            pid = hub._conn.get_server_pid()
+            await asyncpg_execute(
+                "SELECT pg_terminate_backend({})".format(pid)
+            )
+            with trio.fail_after(5):
+                while hub._conn is not None:
+                    await trio.sleep(0.01)
+            # Nobody is listening, this one is lost
+            await asyncpg_execute("NOTIFY foo, 'lost'")
+            await trio.sleep(0.1)
+            with pytest.raises(trio.WouldBlock):
+                foo.receive_nowait()
+
+            # Only delivered once a resync can't miss notifications anymore
+            assert await foo.receive() is triopg.NOTIFY_OVERFLOW
+            assert await listening_channels(hub) == ["foo"]
+            await asyncpg_execute("NOTIFY foo, 'back'")
+            assert await foo.receive() == "back"
+
+
+@pytest.mark.trio
+async def test_hub_subscribe_while_relistening(hub, asyncpg_execute):
+    done = trio.Event()
+
+    async def _subscriber(channel, task_status=trio.TASK_STATUS_IGNORED):
+        async with hub.subscribe(channel, max_buffer_size=10):
+            task_status.started()
+            await done.wait()
+
+    channels = ["chan{:02}".format(i) for i in range(40)]
+    async with trio.open_nursery() as nursery:
+        for channel in channels[:20]:
+            await nursery.start(_subscriber, channel)
+        pid = hub._conn.get_server_pid()
+        await asyncpg_execute("SELECT pg_terminate_backend({})".format(pid))
+        # New channels show up while the new connection LISTENs
+        for channel in channels[20:]:
+            await nursery.start(_subscriber, channel)
+            await trio.sleep(0.001)
+        await wait_listening(hub, channels)
+        done.set()
+
+
+@pytest.mark.trio
+async def test_hub_closed(
+        triopg_pool, asyncio_loop, postgresql_connection_specs
+):
+    hub = triopg_pool.notification_hub()
+    with pytest.raises(triopg.InterfaceError):
+        async with hub.subscribe("foo", max_buffer_size=1):
+            pass  # pragma: no cover
+
+    specs = {**postgresql_connection_specs, "database": "does_not_exist"}
+    async with triopg.create_pool(min_size=0, **specs) as pool:
+        with pytest.raises(triopg.InvalidCatalogNameError):
+            async with pool.notification_hub():
+                pass  # pragma: no cover
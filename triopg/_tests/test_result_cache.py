@@ -0,0 +1,172 @@
+import pytest
+import trio
+import asyncpg
+
+SELECT = "SELECT value FROM cache_test WHERE id = $1"
+UPDATE = "UPDATE cache_test SET value = $2 WHERE id = $1"
+
+
+@pytest.fixture
+async def pool(pool_factory):
+    async with pool_factory() as pool:
+        await pool.execute(
+            "CREATE TABLE cache_test (id int PRIMARY KEY, value text)"
+        )
+        await pool.execute(
+            "INSERT INTO cache_test VALUES (1, 'a'), (2, 'b'), (3, 'c')"
+        )
+        try:
+            yield pool
+        finally:
+            await pool.execute("DROP TABLE cache_test")
+
+
+async def wait_for_invalidations(cache, count):
+    with trio.fail_after(5):
+        while cache.statistics().invalidations < count:
+            await trio.sleep(0.01)
+
+
+@pytest.mark.trio
+async def test_hits_and_misses(pool):
+    async with pool.result_cache() as cache:
+        assert await cache.fetchval(SELECT, 1) == "a"
+        await pool.execute(UPDATE, 1, "updated")
+        # Served from the cache
+        assert await cache.fetchval(SELECT, 1) == "a"
+        assert await cache.fetchval(SELECT, 2) == "b"
+        row = await cache.fetchrow(SELECT, 1)
+        assert tuple(row) == ("updated",)
+
+        records = await cache.fetch("SELECT id FROM cache_test ORDER BY id")
+        records.clear()
+        records = await cache.fetch("SELECT id FROM cache_test ORDER BY id")
+        assert [record["id"] for record in records] == [1, 2, 3]
+
+        stats = cache.statistics()
+        assert stats.size == 4
+        assert stats.max_size == 1000
+        assert stats.hits == 2
+        assert stats.misses == 4
+
+
+@pytest.mark.trio
+async def test_ttl(pool):
+    async with pool.result_cache(ttl=0.05) as cache:
+        assert await cache.fetchval(SELECT, 1) == "a"
+        assert await cache.fetchval(SELECT, 2, ttl=None) == "b"
+        await pool.execute(UPDATE, 1, "updated")
+        await pool.execute(UPDATE, 2, "updated")
+        await trio.sleep(0.1)
+        assert await cache.fetchval(SELECT, 1) == "updated"
+        assert await cache.fetchval(SELECT, 2) == "b"
+        stats = cache.statistics()
+        assert stats.expirations == 1
+        assert stats.hits == 1
+
+
+@pytest.mark.trio
+async def test_lru_eviction(pool):
+    async with pool.result_cache(max_size=2) as cache:
+        await cache.fetchval(SELECT, 1)
+        await cache.fetchval(SELECT, 2)
+        # 1 is now the most recently used
+        await cache.fetchval(SELECT, 1)
+        await cache.fetchval(SELECT, 3)
+        stats = cache.statistics()
+        assert stats.size == 2
+        assert stats.evictions == 1
+
+        await pool.execute(UPDATE, 1, "updated")
+        await pool.execute(UPDATE, 2, "updated")
+        assert await cache.fetchval(SELECT, 1) == "a"
+        assert await cache.fetchval(SELECT, 2) == "updated"
+
+
+@pytest.mark.trio
+async def test_notify_invalidation(pool):
+    async with pool.result_cache() as cache:
+        assert await cache.fetchval(SELECT, 1, channels=["cache_1"]) == "a"
+        assert await cache.fetchval(
+            SELECT, 2, channels=["cache_1", "cache_2"]
+        ) == "b"
+        assert await cache.fetchval(SELECT, 3, channels=["cache_3"]) == "c"
+        await pool.execute(UPDATE, 1, "updated")
+        await pool.execute(UPDATE, 3, "updated")
+
+        await pool.execute("SELECT pg_notify('cache_1', 'payload')")
+        await wait_for_invalidations(cache, 2)
+        assert await cache.fetchval(SELECT, 1) == "updated"
+        # Not tied to cache_1
+        assert await cache.fetchval(SELECT, 3, channels=["cache_3"]) == "c"
+
+        # Bursts of notifications are fine
+        for _ in range(10):
+            await pool.execute("NOTIFY cache_3")
+        await wait_for_invalidations(cache, 3)
+        assert await cache.fetchval(SELECT, 3) == "updated"
+
+
+@pytest.mark.trio
+async def test_hub_reconnect(pool):
+    async with pool.result_cache(ttl=None) as cache:
+        assert await cache.fetchval(SELECT, 1, channels=["cache_1"]) == "a"
+        hub = cache._hub
+        pid = hub._conn.get_server_pid()
+        await pool.execute("SELECT pg_terminate_backend($1)", pid)
+        with trio.fail_after(5):
+            while hub._conn is not None:
+                await trio.sleep(0.01)
+
+        # Nobody listens to these
+        await pool.execute(UPDATE, 1, "updated")
+        await pool.execute("NOTIFY cache_1")
+        # Not cached until listening again
+        assert await cache.fetchval(SELECT, 2, channels=["cache_1"]) == "b"
+        assert cache.statistics().size == 1
+        await pool.execute(UPDATE, 2, "updated")
+
+        await wait_for_invalidations(cache, 1)
+        assert hub._is_listening("cache_1")
+        assert await cache.fetchval(
+            SELECT, 1, channels=["cache_1"]
+        ) == "updated"
+        assert await cache.fetchval(
+            SELECT, 2, channels=["cache_1"]
+        ) == "updated"
+        assert await cache.fetchval(
+            SELECT, 1, channels=["cache_1"]
+        ) == "updated"
+        assert cache.statistics().hits == 1
+
+
+@pytest.mark.trio
+async def test_invalidate_and_clear(pool):
+    async with pool.result_cache() as cache:
+        await cache.fetchval(SELECT, 1, channels=["cache_1"])
+        await cache.fetchval(SELECT, 2)
+        cache.invalidate("cache_1")
+        assert cache.statistics().size == 1
+        cache.invalidate("unknown")
+        cache.clear()
+        stats = cache.statistics()
+        assert stats.size == 0
+        assert stats.invalidations == 2
+
+
+@pytest.mark.trio
+async def test_uncacheable(pool):
+    async with pool.result_cache() as cache:
+        # Lists can't be keys
+        assert await cache.fetchval("SELECT $1::int[]", [1, 2]) == [1, 2]
+        stats = cache.statistics()
+        assert stats.size == 0
+        assert stats.misses == 0
+    with pytest.raises(asyncpg.InterfaceError):
+        await cache.fetchval(SELECT, 1)
+
+
+@pytest.mark.trio
+async def test_arguments(pool):
+    with pytest.raises(ValueError):
+        pool.result_cache(max_size=0)
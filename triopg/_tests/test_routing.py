@@ -0,0 +1,165 @@
+import socket
+
+import pytest
+import trio
+import asyncpg
+
+import triopg
+
+WHOAMI = "SELECT current_setting('application_name')"
+
+SIZE = {"min_size": 1, "max_size": 2}
+
+
+@pytest.fixture(params=["asyncpg_pool", "native_pool"])
+def make_pool(request, asyncio_loop):
+    def _make_pool(specs, name, **kwargs):
+        return triopg.create_pool(
+            trio_native=request.param == "native_pool",
+            server_settings={"application_name": name},
+            **specs,
+            **kwargs
+        )
+
+    return _make_pool
+
+
+@pytest.fixture
+def routing_pool_factory(
+        make_pool, postgresql_connection_specs, replica_connection_specs
+):
+    def _routing_pool_factory(replicas=2, **kwargs):
+        primary = make_pool(postgresql_connection_specs, "primary", **SIZE)
+        replica_pools = [
+            make_pool(replica_connection_specs, "replica{}".format(i), **SIZE)
+            for i in range(replicas)
+        ]
+        return triopg.RoutingPool(primary, replica_pools, **kwargs)
+
+    return _routing_pool_factory
+
+
+async def whoami(pool, times):
+    return [await pool.fetchval(WHOAMI) for _ in range(times)]
+
+
+@pytest.fixture
+def unreachable_specs():
+    # Bound but not listening: connections are refused
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        yield {
+            "host": "127.0.0.1",
+            "port": sock.getsockname()[1],
+            "database": "postgres",
+        }
+
+
+@pytest.mark.trio
+async def test_round_robin(routing_pool_factory):
+    async with routing_pool_factory() as pool:
+        assert await whoami(pool, 4) == ["replica0", "replica1"] * 2
+        assert (await pool.fetchrow(WHOAMI))[0] == "replica0"
+        assert (await pool.fetch(WHOAMI))[0][0] == "replica1"
+        columns = await pool.fetch_columns(WHOAMI + " AS name")
+        assert columns["name"] == ["replica0"]
+
+        # Per-call overrides
+        assert await pool.fetchval(WHOAMI, primary=True) == "primary"
+        async with pool.acquire(replica=True) as conn:
+            assert await conn.fetchval(WHOAMI) == "replica1"
+
+
+@pytest.mark.trio
+async def test_writes_go_to_primary(routing_pool_factory):
+    exists = "SELECT to_regclass('routing_test') IS NOT NULL"
+    async with routing_pool_factory() as pool:
+        async with pool.acquire() as conn:
+            assert await conn.fetchval(WHOAMI) == "primary"
+        await pool.execute("CREATE TABLE routing_test (id int)")
+        try:
+            await pool.executemany(
+                "INSERT INTO routing_test VALUES ($1)", [(1,), (2,)]
+            )
+            await pool.copy_records_to_table("routing_test", records=[(3,)])
+            assert await pool.fetchval(exists, primary=True)
+            assert not await pool.fetchval(exists)
+            assert await pool.primary.fetchval(
+                "SELECT count(*) FROM routing_test"
+            ) == 3
+        finally:
+            await pool.execute("DROP TABLE routing_test")
+
+
+@pytest.mark.trio
+async def test_least_outstanding(routing_pool_factory):
+    async with routing_pool_factory(strategy="least_outstanding") as pool:
+        async with pool.acquire(replica=True) as conn:
+            assert await conn.fetchval(WHOAMI) == "replica0"
+            # replica0 is busy with the connection above
+            assert await whoami(pool, 3) == ["replica1"] * 3
+        assert await whoami(pool, 2) == ["replica0", "replica1"]
+
+
+@pytest.mark.trio
+async def test_unhealthy_replica(
+        make_pool, postgresql_connection_specs, replica_connection_specs,
+        unreachable_specs
+):
+    healthy = make_pool(replica_connection_specs, "replica0")
+    # No connection opened upfront, so it is only found out when used
+    unhealthy = make_pool(unreachable_specs, "replica1", min_size=0)
+    pool = triopg.RoutingPool(
+        make_pool(postgresql_connection_specs, "primary"),
+        [unhealthy, healthy],
+        unhealthy_delay=0.2,
+    )
+    async with pool:
+        # Retried on the next replica
+        assert await pool.fetchval(WHOAMI) == "replica0"
+        assert pool.healthy_replicas() == [healthy]
+        assert await whoami(pool, 3) == ["replica0"] * 3
+        async with pool.acquire(replica=True) as conn:
+            assert await conn.fetchval(WHOAMI) == "replica0"
+
+        # Query errors don't count
+        with pytest.raises(asyncpg.DivisionByZeroError):
+            await pool.fetchval("SELECT 1 / 0")
+        assert pool.healthy_replicas() == [healthy]
+
+        # Back in rotation after unhealthy_delay
+        await trio.sleep(0.2)
+        assert pool.healthy_replicas() == [unhealthy, healthy]
+
+
+@pytest.mark.trio
+async def test_no_healthy_replica(
+        make_pool, postgresql_connection_specs, unreachable_specs
+):
+    pool = triopg.RoutingPool(
+        make_pool(postgresql_connection_specs, "primary"),
+        [make_pool(unreachable_specs, "replica0", min_size=0)],
+    )
+    async with pool:
+        assert await pool.fetchval(WHOAMI) == "primary"
+        assert pool.healthy_replicas() == []
+        async with pool.acquire(replica=True) as conn:
+            assert await conn.fetchval(WHOAMI) == "primary"
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        triopg.RoutingPool(None, [], strategy="random")
+
+
+@pytest.mark.trio
+async def test_close(routing_pool_factory):
+    async with routing_pool_factory() as pool:
+        await whoami(pool, 2)
+        await pool.close()
+        for member in (pool.primary, *pool.replicas):
+            assert member.statistics().size == 0
+        with pytest.raises(asyncpg.InterfaceError):
+            await pool.fetchval(WHOAMI)
+        with pytest.raises(asyncpg.InterfaceError):
+            await pool.execute(WHOAMI)
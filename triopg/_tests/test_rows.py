@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import asyncpg
+import pytest
+
+import triopg
+
+QUERY = "SELECT i AS id, 'user ' || i AS name FROM generate_series(1, $1) i"
+
+
+class UserTuple(NamedTuple):
+    name: str
+    id: int
+
+
+@dataclass(frozen=True)
+class UserData:
+    id: int
+    name: str
+    admin: bool = False
+
+
+class UserSlots:
+    __slots__ = ("id", "name", "admin")
+
+    def __init__(self, name, admin=False, *, id):
+        self.id = id
+        self.name = name
+        self.admin = admin
+
+    def _fields(self):
+        return self.id, self.name, self.admin
+
+    def __eq__(self, other):
+        return self._fields() == other._fields()
+
+
+class UserRecord(asyncpg.Record):
+    pass
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("record_class", [UserTuple, UserData, UserSlots])
+async def test_fetch_record_class(triopg_conn, record_class):
+    users = await triopg_conn.fetch(QUERY, 3, record_class=record_class)
+    assert users == [
+        record_class(id=i, name="user {}".format(i)) for i in range(1, 4)
+    ]
+    assert await triopg_conn.fetch(QUERY, 0, record_class=record_class) == []
+
+    user = await triopg_conn.fetchrow(QUERY, 1, record_class=record_class)
+    assert user == record_class(id=1, name="user 1")
+    assert await triopg_conn.fetchrow(
+        QUERY, 0, record_class=record_class
+    ) is None
+
+
+@pytest.mark.trio
+async def test_fetch_record_class_mapping(triopg_conn):
+    # Columns are matched by name, extra ones are ignored
+    user = await triopg_conn.fetchrow(
+        "SELECT 'root' AS name, true AS admin, 0 AS id, 42 AS extra",
+        record_class=UserData
+    )
+    assert user == UserData(id=0, name="root", admin=True)
+
+    def _user_id(id):
+        return id
+
+    assert await triopg_conn.fetch(QUERY, 2, record_class=_user_id) == [1, 2]
+
+    with pytest.raises(triopg.InterfaceError):
+        await triopg_conn.fetch("SELECT 1 AS id", record_class=UserData)
+
+    # asyncpg's own record classes are still built by asyncpg
+    users = await triopg_conn.fetch(QUERY, 2, record_class=UserRecord)
+    assert [type(user) for user in users] == [UserRecord, UserRecord]
+
+
+@pytest.mark.trio
+async def test_pool_fetch_record_class(triopg_pool):
+    users = await triopg_pool.fetch(QUERY, 2, record_class=UserTuple)
+    assert users == [UserTuple("user 1", 1), UserTuple("user 2", 2)]
+    user = await triopg_pool.fetchrow(QUERY, 1, record_class=UserData)
+    assert user == UserData(1, "user 1")
+    user = await triopg_pool.fetchrow(QUERY, 1, record_class=UserRecord)
+    assert type(user) is UserRecord
+
+
+@pytest.mark.trio
+async def test_statement_record_class(triopg_conn):
+    statement = await triopg_conn.prepare(QUERY)
+    users = await statement.fetch(2, record_class=UserTuple)
+    assert users == [UserTuple("user 1", 1), UserTuple("user 2", 2)]
+    user = await statement.fetchrow(1, record_class=UserData)
+    assert user == UserData(1, "user 1")
+
+    async with triopg_conn.transaction():
+        cursor = statement.cursor(5, prefetch=2, record_class=UserSlots)
+        users = [user async for user in cursor]
+    assert [user.id for user in users] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.trio
+async def test_statement_asyncpg_record_class(triopg_conn):
+    statement = await triopg_conn.prepare(QUERY)
+    with pytest.raises(triopg.InterfaceError):
+        await statement.fetch(2, record_class=UserRecord)
+    with pytest.raises(triopg.InterfaceError):
+        await statement.fetchrow(1, record_class=UserRecord)
+    with pytest.raises(triopg.InterfaceError):
+        statement.cursor(5, record_class=UserRecord)
+
+    # Set when preparing instead
+    statement = await triopg_conn.prepare(QUERY, record_class=UserRecord)
+    assert type(await statement.fetchrow(1)) is UserRecord
+    async with triopg_conn.transaction():
+        users = [user async for user in statement.cursor(3, prefetch=2)]
+    assert [type(user) for user in users] == [UserRecord] * 3
+
+
+@pytest.mark.trio
+async def test_cursor_record_class(triopg_conn):
+    async with triopg_conn.transaction():
+        cursor = triopg_conn.cursor(
+            QUERY, 5, prefetch=2, record_class=UserData
+        )
+        users = [user async for user in cursor]
+        assert users[-1] == UserData(id=5, name="user 5")
+
+        cursor = await triopg_conn.cursor(QUERY, 5, record_class=UserTuple)
+        assert await cursor.fetchrow() == UserTuple(id=1, name="user 1")
+        assert await cursor.fetch(2) == [
+            UserTuple(id=2, name="user 2"),
+            UserTuple(id=3, name="user 3")
+        ]
+
+        cursor = await triopg_conn.cursor(QUERY, 1, record_class=UserRecord)
+        assert type(await cursor.fetchrow()) is UserRecord
@@ -0,0 +1,120 @@
+import pytest
+import trio
+
+ROWS = 10000
+
+
+@pytest.fixture
+async def pool(pool_factory):
+    async with pool_factory() as pool:
+        await pool.execute(
+            """
+            CREATE TABLE scan_test (id int PRIMARY KEY, name text NOT NULL);
+            INSERT INTO scan_test
+            SELECT i, 'name ' || i FROM generate_series(1, {}) i;
+            """.format(ROWS)
+        )
+        try:
+            yield pool
+        finally:
+            await pool.execute("DROP TABLE scan_test")
+
+
+async def scan_ids(pool, table="scan_test", **kwargs):
+    ids = []
+    async with pool.scan(table, **kwargs) as pages:
+        async for page in pages:
+            assert 0 < len(page) <= kwargs.get("page_size", 1000)
+            ids += [record["id"] for record in page]
+    return ids
+
+
+@pytest.mark.trio
+async def test_scan(pool):
+    ids = await scan_ids(pool, partitions=4, page_size=300)
+    assert sorted(ids) == list(range(1, ROWS + 1))
+
+    # More partitions than connections
+    ids = await scan_ids(pool, partitions=8, concurrency=2)
+    assert sorted(ids) == list(range(1, ROWS + 1))
+
+    # Sampled boundaries, once the table size is known
+    await pool.execute("ANALYZE scan_test")
+    ids = await scan_ids(pool, partitions=20, page_size=100)
+    assert sorted(ids) == list(range(1, ROWS + 1))
+
+
+@pytest.mark.trio
+async def test_scan_per_partition(pool):
+    partitions = {}
+
+    async def consume(index, pages):
+        partitions[index] = [
+            record["id"] async for page in pages for record in page
+        ]
+
+    async with pool.scan("scan_test", partitions=4,
+                         per_partition=True) as channels:
+        assert len(channels) == 4
+        async with trio.open_nursery() as nursery:
+            for index, pages in enumerate(channels):
+                nursery.start_soon(consume, index, pages)
+
+    ids = [id for index in range(4) for id in partitions[index]]
+    # Partitions are key ranges, in key order
+    assert ids == list(range(1, ROWS + 1))
+    assert all(partitions.values())
+
+
+@pytest.mark.trio
+async def test_scan_key_and_columns(pool):
+    await pool.execute(
+        """
+        CREATE TABLE "Scan Test" ("Name" text, id int);
+        INSERT INTO "Scan Test" SELECT 'name ' || i, i FROM generate_series(1, 500) i;
+        """
+    )
+    try:
+        names = []
+        async with pool.scan('"Scan Test"', key="Name", columns=["id"],
+                             partitions=3, page_size=50) as pages:
+            async for page in pages:
+                assert all(len(record) == 2 for record in page)
+                names += [record["Name"] for record in page]
+        assert sorted(names) == sorted(
+            "name {}".format(i) for i in range(1, 501)
+        )
+
+        # No primary key to partition by
+        with pytest.raises(ValueError):
+            await scan_ids(pool, '"Scan Test"')
+    finally:
+        await pool.execute('DROP TABLE "Scan Test"')
+
+
+@pytest.mark.trio
+async def test_scan_empty(pool):
+    await pool.execute("DELETE FROM scan_test")
+    assert await scan_ids(pool, partitions=4) == []
+
+
+@pytest.mark.trio
+async def test_scan_leave_early(pool):
+    with trio.fail_after(5):
+        async with pool.scan("scan_test", page_size=10) as pages:
+            async for page in pages:
+                break
+    with trio.fail_after(5):
+        while pool.statistics().in_use:
+            await trio.sleep(0.01)
+
+
+@pytest.mark.trio
+async def test_scan_arguments(pool):
+    for kwargs in [
+        {"partitions": 0},
+        {"concurrency": 0},
+        {"page_size": 0},
+    ]:
+        with pytest.raises(ValueError):
+            await scan_ids(pool, **kwargs)
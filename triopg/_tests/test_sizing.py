@@ -0,0 +1,106 @@
+import pytest
+import trio
+
+import triopg
+from triopg._sizing import _SizeController
+from triopg._stats import _PoolMetrics
+
+
+@pytest.mark.trio
+async def test_size_controller():
+    metrics = _PoolMetrics()
+    controller = _SizeController(
+        min_size=0, max_size=10, target_acquire_wait=0.01, interval=1
+    )
+    assert controller.target_size == 1
+
+    # Slow acquires: grow by the number of waiters
+    metrics.acquire_wait.record(0.05)
+    metrics.waiters = 3
+    assert controller.decide(metrics, peak_in_use=1) == 4
+    # Tasks waiting all along, with no acquire completed
+    assert controller.decide(metrics, peak_in_use=4) == 7
+    metrics.acquire_wait.record(0.05)
+    metrics.waiters = 20
+    assert controller.decide(metrics, peak_in_use=7) == 10
+
+    # Fast acquires, but all connections in use: keep the size
+    metrics.waiters = 0
+    metrics.acquire_wait.record(0.001)
+    assert controller.decide(metrics, peak_in_use=10) == 10
+    # Shrink by half of the unused connections
+    assert controller.decide(metrics, peak_in_use=2) == 6
+    assert controller.decide(metrics, peak_in_use=2) == 4
+    assert controller.decide(metrics, peak_in_use=0) == 2
+    assert controller.decide(metrics, peak_in_use=0) == 1
+    assert controller.decide(metrics, peak_in_use=0) == 1
+
+    resizes = list(controller.resizes)
+    assert [(r.old_target_size, r.new_target_size) for r in resizes] == [
+        (1, 4), (4, 7), (7, 10), (10, 6), (6, 4), (4, 2), (2, 1)
+    ]
+    reasons = ["acquire_wait"] * 3 + ["low_utilization"] * 4
+    assert [r.reason for r in resizes] == reasons
+    assert resizes[0].acquire_wait == pytest.approx(0.05)
+    assert resizes[1].acquire_wait == 0.0
+    assert resizes[3].peak_in_use == 2
+
+
+def test_size_controller_arguments():
+    with pytest.raises(ValueError):
+        _SizeController(1, 10, target_acquire_wait=0, interval=1)
+    with pytest.raises(ValueError):
+        _SizeController(1, 10, target_acquire_wait=0.01, interval=0)
+
+
+async def wait_for(predicate):
+    with trio.fail_after(5):
+        while not predicate():
+            await trio.sleep(0.01)
+
+
+@pytest.mark.trio
+async def test_adaptive_pool(asyncio_loop, postgresql_connection_specs):
+    async with triopg.create_pool(trio_native=True, min_size=1, max_size=4,
+                                  target_acquire_wait=0.005,
+                                  resize_interval=0.05,
+                                  **postgresql_connection_specs) as pool:
+        stats = pool.statistics()
+        assert (stats.target_size, stats.size, stats.resizes) == (1, 1, ())
+
+        async def worker():
+            while True:
+                await pool.fetchval("SELECT pg_sleep(0.02)")
+
+        async with trio.open_nursery() as nursery:
+            for _ in range(4):
+                nursery.start_soon(worker)
+            await wait_for(lambda: pool.statistics().target_size == 4)
+            assert pool.statistics().size <= 4
+            nursery.cancel_scope.cancel()
+
+        stats = pool.statistics()
+        assert {resize.reason for resize in stats.resizes} == {"acquire_wait"}
+        assert stats.max_size == 4
+
+        # Idle connections are closed as the target size shrinks
+        def shrunk():
+            stats = pool.statistics()
+            return stats.target_size == stats.size == 1
+
+        await wait_for(shrunk)
+        stats = pool.statistics()
+        assert stats.resizes[-1].reason == "low_utilization"
+        assert await pool.fetchval("SELECT 1") == 1
+
+
+@pytest.mark.trio
+async def test_fixed_size_statistics(pool_factory):
+    async with pool_factory(min_size=1, max_size=3) as pool:
+        stats = pool.statistics()
+        assert (stats.target_size, stats.resizes) == (3, ())
+
+
+def test_adaptive_asyncpg_pool():
+    with pytest.raises(TypeError):
+        triopg.create_pool(target_acquire_wait=0.01)
@@ -0,0 +1,87 @@
+import asyncpg
+import pytest
+
+import triopg
+
+QUERY = "SELECT i FROM generate_series(1, $1) i"
+
+
+@pytest.mark.trio
+async def test_statement_cache(pool_factory):
+    async with pool_factory(min_size=1, max_size=1,
+                            prepared_statement_cache_size=2) as pool:
+        async with pool.acquire() as conn:
+            statement = await conn.prepare(QUERY)
+            assert await statement.fetchval(3) == 1
+        async with pool.acquire() as conn:
+            assert await conn.prepare(QUERY) is statement
+            assert await conn.prepare(QUERY, timeout=10) is statement
+            # Explicitly named or typed statements are not cached
+            named = await conn.prepare(QUERY, name="named_query")
+            assert named is not statement
+            typed = await conn.prepare(QUERY, record_class=asyncpg.Record)
+            assert typed is not statement
+            assert [r[0] for r in await statement.fetch(2)] == [1, 2]
+
+        stats = pool.statistics().statement_cache
+        assert isinstance(stats, triopg.StatementCacheStatistics)
+        assert stats == (2, 2, 1, 0, 0)
+
+
+@pytest.mark.trio
+async def test_statement_cache_eviction(pool_factory):
+    async with pool_factory(min_size=1, max_size=1,
+                            prepared_statement_cache_size=2) as pool:
+        async with pool.acquire() as conn:
+            first = await conn.prepare("SELECT 1")
+            second = await conn.prepare("SELECT 2")
+            assert await conn.prepare("SELECT 1") is first
+            await conn.prepare("SELECT 3")
+            # Least recently used first
+            assert await conn.prepare("SELECT 1") is first
+            assert await conn.prepare("SELECT 2") is not second
+
+        stats = pool.statistics().statement_cache
+        assert (stats.hits, stats.misses, stats.evictions) == (2, 4, 2)
+
+
+@pytest.mark.trio
+async def test_statement_cache_invalidation(pool_factory):
+    async with pool_factory(min_size=1, max_size=1,
+                            prepared_statement_cache_size=10) as pool:
+        await pool.execute("CREATE TABLE stmts (id int)")
+        try:
+            async with pool.acquire() as conn:
+                statement = await conn.prepare("SELECT * FROM stmts")
+            await pool.execute("ALTER TABLE stmts ADD COLUMN name text")
+            pool.invalidate_statements()
+            async with pool.acquire() as conn:
+                statement = await conn.prepare("SELECT * FROM stmts")
+                assert [
+                    attribute.name for attribute in statement.get_attributes()
+                ] == ["id", "name"]
+        finally:
+            await pool.execute("DROP TABLE stmts")
+
+        assert pool.statistics().statement_cache.invalidations == 1
+
+
+@pytest.mark.trio
+async def test_statement_cache_disabled(pool_factory, triopg_conn):
+    async with pool_factory(min_size=1, max_size=1) as pool:
+        async with pool.acquire() as conn:
+            statement = await conn.prepare(QUERY)
+            assert await conn.prepare(QUERY) is not statement
+            pool.invalidate_statements()
+        assert pool.statistics().statement_cache is None
+
+    # Nor on connections outside of a pool
+    statement = await triopg_conn.prepare(QUERY)
+    assert await triopg_conn.prepare(QUERY) is not statement
+
+
+def test_statement_cache_size():
+    with pytest.raises(ValueError):
+        triopg.create_pool(prepared_statement_cache_size=-1)
+    with pytest.raises(ValueError):
+        triopg.create_pool(trio_native=True, prepared_statement_cache_size=-1)
@@ -0,0 +1,94 @@
+import pytest
+import trio
+import trio.testing
+
+import triopg
+
+
+def test_histogram():
+    histogram = triopg.Histogram()
+    assert histogram.count == 0
+    assert histogram.mean == 0.0
+    assert histogram.percentile(0.5) == 0.0
+    assert histogram.buckets() == []
+
+    for value in [0.001] * 98 + [0.5, 2.0]:
+        histogram.record(value)
+    assert histogram.count == 100
+    assert histogram.max == 2.0
+    assert histogram.mean == pytest.approx((0.098 + 2.5) / 100)
+    assert 0.001 <= histogram.percentile(0.5) < 0.002
+    assert 0.5 <= histogram.percentile(0.99) < 1.0
+    assert histogram.percentile(1) == 2.0
+    assert [count for _, count in histogram.buckets()] == [98, 1, 1]
+
+    copy = histogram.copy()
+    histogram.record(100)
+    assert copy.count == 100
+    assert histogram.buckets()[-1] == (float('inf'), 1)
+    assert "count=100" in repr(copy)
+
+
+@pytest.mark.trio
+async def test_pool_statistics(pool_factory):
+    pool = pool_factory(min_size=1, max_size=1)
+    stats = pool.statistics()
+    assert isinstance(stats, triopg.PoolStatistics)
+    assert (stats.size, stats.min_size, stats.max_size) == (0, 1, 1)
+
+    async with pool:
+        stats = pool.statistics()
+        assert (stats.size, stats.idle, stats.in_use) == (1, 1, 0)
+        assert stats.waiters == 0
+        assert stats.acquire_wait.count == stats.hold_time.count == 0
+        assert stats.call_sites is None
+
+        async def _waiter(task_status=trio.TASK_STATUS_IGNORED):
+            task_status.started()
+            assert await pool.fetchval("SELECT 1") == 1
+
+        async with trio.open_nursery() as nursery:
+            async with pool.acquire() as conn:
+                await nursery.start(_waiter)
+                await nursery.start(_waiter)
+                await trio.testing.wait_all_tasks_blocked()
+                stats = pool.statistics()
+                assert (stats.size, stats.idle, stats.in_use) == (1, 0, 1)
+                assert stats.waiters == 2
+                await conn.fetchval("SELECT pg_sleep(0.01)")
+
+        stats = pool.statistics()
+        assert (stats.idle, stats.in_use, stats.waiters) == (1, 0, 0)
+        assert stats.acquire_wait.count == stats.hold_time.count == 3
+        assert stats.hold_time.max >= 0.01
+        assert stats.acquire_wait.max >= 0.01
+
+
+@pytest.mark.trio
+async def test_pool_statistics_failed_acquire(pool_factory):
+    async with pool_factory(min_size=1, max_size=1) as pool:
+        async with pool.acquire():
+            with trio.move_on_after(0.01):
+                await pool.fetchval("SELECT 1")
+        stats = pool.statistics()
+        assert (stats.in_use, stats.waiters) == (0, 0)
+        assert stats.acquire_wait.count == stats.hold_time.count == 1
+
+
+@pytest.mark.trio
+async def test_pool_statistics_call_sites(pool_factory):
+    async with pool_factory(min_size=1, max_size=1,
+                            track_call_sites=True) as pool:
+        for _ in range(3):
+            await pool.fetchval("SELECT 1")
+        async with pool.acquire():
+            pass
+
+        call_sites = pool.statistics().call_sites
+        assert len(call_sites) == 2
+        counts = {}
+        for call_site, (acquire_wait, hold_time) in call_sites.items():
+            assert call_site.startswith(__file__ + ":")
+            assert acquire_wait.count == hold_time.count
+            counts[int(call_site.rsplit(":", 1)[1])] = acquire_wait.count
+        assert sorted(counts.values()) == [1, 3]
@@ -0,0 +1,163 @@
+import pytest
+
+import triopg
+
+
+class RecordingTracer(triopg.QueryTracer):
+    def __init__(self):
+        self.events = []
+
+    def before_query(self, event):
+        assert event.total_time is None
+        event.context = "started"
+
+    def after_query(self, event):
+        assert event.context == "started"
+        self.events.append(event)
+
+    def summary(self):
+        summary = [
+            (event.method, event.query, event.args_count, event.rows)
+            for event in self.events
+        ]
+        self.events.clear()
+        return summary
+
+
+@pytest.fixture
+def tracer():
+    return RecordingTracer()
+
+
+@pytest.fixture(params=["from_connect", "from_pool", "from_native_pool"])
+async def traced_conn(
+        request, tracer, asyncio_loop, postgresql_connection_specs
+):
+    if request.param == "from_connect":
+        async with triopg.connect(tracer=tracer,
+                                  **postgresql_connection_specs) as conn:
+            yield conn
+
+    else:
+        async with triopg.create_pool(
+                trio_native=request.param == "from_native_pool", tracer=tracer,
+                **postgresql_connection_specs) as pool:
+            async with pool.acquire() as conn:
+                yield conn
+
+
+@pytest.mark.trio
+async def test_trace_connection_queries(traced_conn, tracer):
+    await traced_conn.execute(
+        "CREATE TEMPORARY TABLE traced (id int PRIMARY KEY)"
+    )
+    await traced_conn.executemany(
+        "INSERT INTO traced (id) VALUES ($1)", [(1,), (2,), (3,)]
+    )
+    assert await traced_conn.execute(
+        "DELETE FROM traced WHERE id > $1", 2
+    ) == "DELETE 1"
+    await traced_conn.fetch("SELECT * FROM traced")
+    await traced_conn.fetchrow("SELECT * FROM traced WHERE id = $1", 42)
+    await traced_conn.fetchval("SELECT count(*) FROM traced")
+    assert tracer.summary() == [
+        (
+            "execute", "CREATE TEMPORARY TABLE traced (id int PRIMARY KEY)", 0,
+            None
+        ),
+        ("executemany", "INSERT INTO traced (id) VALUES ($1)", 3, None),
+        ("execute", "DELETE FROM traced WHERE id > $1", 1, 1),
+        ("fetch", "SELECT * FROM traced", 0, 2),
+        ("fetchrow", "SELECT * FROM traced WHERE id = $1", 1, 0),
+        ("fetchval", "SELECT count(*) FROM traced", 0, None),
+    ]
+
+    # Not a query, not traced
+    traced_conn.get_server_pid()
+    await traced_conn.reload_schema_state()
+    assert tracer.summary() == []
+
+
+@pytest.mark.trio
+async def test_trace_timings_and_errors(traced_conn, tracer):
+    await traced_conn.execute("SELECT pg_sleep(0.05)")
+    with pytest.raises(triopg.DivisionByZeroError):
+        await traced_conn.fetchval("SELECT 1 / 0")
+
+    sleep_event, error_event = tracer.events
+    assert sleep_event.error is None
+    assert sleep_event.total_time >= sleep_event.asyncpg_time >= 0.05
+    assert sleep_event.bridge_time == pytest.approx(
+        sleep_event.total_time - sleep_event.asyncpg_time
+    )
+    assert sleep_event.bridge_time >= 0
+    assert isinstance(error_event.error, triopg.DivisionByZeroError)
+    assert error_event.asyncpg_time is not None
+    assert "fetchval" in repr(error_event)
+
+
+@pytest.mark.trio
+async def test_trace_prepared_statement_and_cursors(traced_conn, tracer):
+    stmt = await traced_conn.prepare("SELECT generate_series(1, $1)")
+    assert tracer.summary() == []
+    await stmt.fetch(3)
+    await stmt.fetchval(3)
+    assert tracer.summary() == [
+        ("fetch", "SELECT generate_series(1, $1)", 1, 3),
+        ("fetchval", "SELECT generate_series(1, $1)", 1, None),
+    ]
+
+    async with traced_conn.transaction():
+        rows = [row async for row in stmt.cursor(5, prefetch=2)]
+        assert len(rows) == 5
+        assert tracer.summary() == [
+            ("fetch", "SELECT generate_series(1, $1)", 1, 2),
+            ("fetch", "SELECT generate_series(1, $1)", 1, 2),
+            ("fetch", "SELECT generate_series(1, $1)", 1, 1),
+        ]
+
+        cursor = await traced_conn.cursor("SELECT generate_series(1, 10)")
+        await cursor.fetchrow()
+        await cursor.forward(2)
+        await cursor.fetch(3)
+        assert tracer.summary() == [
+            ("fetchrow", "SELECT generate_series(1, 10)", 0, 1),
+            ("forward", "SELECT generate_series(1, 10)", 0, 2),
+            ("fetch", "SELECT generate_series(1, 10)", 0, 3),
+        ]
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("trio_native", [False, True])
+async def test_trace_pool_shortcuts(
+        tracer, trio_native, asyncio_loop, postgresql_connection_specs
+):
+    async with triopg.create_pool(trio_native=trio_native, tracer=tracer,
+                                  **postgresql_connection_specs) as pool:
+        assert await pool.fetchval("SELECT $1::int", 1) == 1
+        await pool.fetch("SELECT generate_series(1, 4)")
+        await pool.executemany("SELECT $1::int", [(1,), (2,)])
+        assert tracer.summary() == [
+            ("fetchval", "SELECT $1::int", 1, None),
+            ("fetch", "SELECT generate_series(1, 4)", 0, 4),
+            ("executemany", "SELECT $1::int", 2, None),
+        ]
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("trio_native", [False, True])
+async def test_trace_guarded_fetch(
+        tracer, trio_native, asyncio_loop, postgresql_connection_specs
+):
+    async with triopg.create_pool(trio_native=trio_native, tracer=tracer,
+                                  fetch_max_rows=10,
+                                  **postgresql_connection_specs) as pool:
+        await pool.fetch("SELECT generate_series(1, $1)", 4)
+        await pool.fetch("SELECT generate_series(1, 4)", max_bytes=10000)
+        with pytest.raises(triopg.ResultTooLargeError):
+            await pool.fetch("SELECT generate_series(1, 20)")
+        assert tracer.summary() == [
+            ("fetch", "SELECT generate_series(1, $1)", 1, 4),
+            ("fetch", "SELECT generate_series(1, 4)", 0, 4),
+            ("fetch", "SELECT generate_series(1, 20)", 0, None),
+        ]
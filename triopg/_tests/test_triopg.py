@@ -1,3 +1,7 @@
+import asyncio
+import gc
+import weakref
+
 import pytest
 import trio
 import trio_asyncio
@@ -54,6 +58,55 @@ async def test_cursor(triopg_conn):
         assert items == [("1", 1), ("2", 2), ("3", 3)]
 
 
+@pytest.mark.trio
+@pytest.mark.parametrize("prefetch", [None, 1, 2, 5, 6])
+async def test_cursor_prefetch(triopg_conn, prefetch):
+    async with triopg_conn.transaction():
+        items = []
+        async for row in triopg_conn.cursor("SELECT generate_series(1, 5)",
+                                            prefetch=prefetch):
+            items.append(row[0])
+        assert items == [1, 2, 3, 4, 5]
+
+        stmt = await triopg_conn.prepare("SELECT generate_series(1, $1)")
+        items = []
+        async for row in stmt.cursor(5, prefetch=prefetch):
+            items.append(row[0])
+        assert items == [1, 2, 3, 4, 5]
+
+        items = []
+        async for row in stmt.cursor(0, prefetch=prefetch):
+            items.append(row[0])  # pragma: no cover
+        assert items == []
+
+        # Exhausted cursors don't leave their portal open
+        assert await triopg_conn.fetchval(
+            "SELECT count(*) FROM pg_cursors WHERE name != ''"
+        ) == 0
+
+
+@pytest.mark.trio
+async def test_cursor_prefetch_timeout(triopg_conn):
+    query = "SELECT pg_sleep(0.3) FROM generate_series(1, 3)"
+    async with triopg_conn.transaction():
+        # The timeout also applies to the fetches following the first one
+        with pytest.raises(asyncio.TimeoutError):
+            async for row in triopg_conn.cursor(query, prefetch=1,
+                                                timeout=0.2):
+                pass
+
+
+@pytest.mark.trio
+async def test_cursor_prefetch_invalid(triopg_conn):
+    async with triopg_conn.transaction():
+        with pytest.raises(triopg.InterfaceError):
+            await triopg_conn.cursor("VALUES (1)", prefetch=1)
+
+        with pytest.raises(triopg.InterfaceError):
+            async for row in triopg_conn.cursor("VALUES (1)", prefetch=0):
+                pass  # pragma: no cover
+
+
 @pytest.mark.trio
 async def test_transaction(triopg_conn, asyncpg_execute):
     # Execute without transaction
@@ -168,6 +221,36 @@ async def test_use_pool_without_acquire_connection(triopg_pool):
     assert val == "1"
 
 
+@pytest.mark.trio
+async def test_pool_reuses_connection_proxies(
+        asyncio_loop, postgresql_connection_specs
+):
+    async with triopg.create_pool(min_size=1, max_size=1,
+                                  **postgresql_connection_specs) as pool:
+        async with pool.acquire() as conn1:
+            assert await conn1.fetchval("SELECT 1") == 1
+        async with pool.acquire() as conn2:
+            assert await conn2.fetchval("SELECT 2") == 2
+        assert conn1 is conn2
+
+
+@pytest.mark.trio
+async def test_pool_frees_replaced_connections(
+        asyncio_loop, postgresql_connection_specs
+):
+    async with triopg.create_pool(min_size=1, max_size=1, max_queries=1,
+                                  **postgresql_connection_specs) as pool:
+        async with pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+            replaced = weakref.ref(conn._asyncpg_conn)
+        del conn
+        async with pool.acquire() as conn:
+            assert conn._asyncpg_conn is not replaced()
+        del conn
+        gc.collect()
+        assert replaced() is None
+
+
 @pytest.mark.trio
 async def test_listener(triopg_conn, asyncpg_execute):
     listener_sender, listener_receiver = trio.open_memory_channel(100)
@@ -274,6 +357,75 @@ async def test_listen_overflow(triopg_conn, asyncpg_execute):
         assert await changes.receive() == "6"
 
 
+@pytest.mark.trio
+async def test_listen_overflow_drop_oldest(triopg_conn, asyncpg_execute):
+    async with triopg_conn.listen("foo", max_buffer_size=2,
+                                  overflow="drop_oldest") as changes:
+        for i in range(5):
+            await asyncpg_execute("NOTIFY foo, '{}'".format(i))
+        assert await changes.receive() == "3"
+        assert await changes.receive() == "4"
+
+    with pytest.raises(ValueError):
+        async with triopg_conn.listen("foo", 1, overflow="unknown"):
+            pass  # pragma: no cover
+
+
+async def notify_all(conn, asyncpg_execute, payloads):
+    """NOTIFY foo with `payloads`, return once `conn` was notified of all"""
+    async with conn.listen("sync", max_buffer_size=1) as sync:
+        for payload in payloads:
+            await asyncpg_execute("NOTIFY foo, '{}'".format(payload))
+        # Notifications are delivered in order
+        await asyncpg_execute("NOTIFY sync")
+        await sync.receive()
+
+
+@pytest.mark.trio
+async def test_listen_coalesce_latest(triopg_conn, asyncpg_execute):
+    async with triopg_conn.listen(
+            "foo", max_buffer_size=2, coalesce="latest",
+            key=lambda payload: payload.split(":")[0]) as changes:
+        payloads = ["{}:{}".format(key, i) for i in range(100) for key in "ab"]
+        await notify_all(triopg_conn, asyncpg_execute, payloads + ["c:0"])
+        # One payload per key, in order of first arrival
+        assert await changes.receive() == "a:99"
+        assert await changes.receive() == "b:99"
+        assert await changes.receive() == triopg.NOTIFY_OVERFLOW
+        await asyncpg_execute("NOTIFY foo, 'a:100'")
+        assert await changes.receive() == "a:100"
+
+    with pytest.raises(trio.ClosedResourceError):
+        await changes.receive()
+
+
+@pytest.mark.trio
+async def test_listen_coalesce_dedupe_batch(triopg_conn, asyncpg_execute):
+    async with triopg_conn.listen("foo", max_buffer_size=10, coalesce="dedupe",
+                                  batch=True) as changes:
+        await notify_all(
+            triopg_conn, asyncpg_execute, ["1", "2", "1", "3", "2"]
+        )
+        assert await changes.receive() == ["1", "2", "3"]
+        await asyncpg_execute("NOTIFY foo, '1'")
+        assert await changes.receive() == ["1"]
+
+    async with triopg_conn.listen("foo", max_buffer_size=3,
+                                  overflow="drop_oldest",
+                                  batch=True) as changes:
+        await notify_all(
+            triopg_conn, asyncpg_execute, ["1", "1", "2", "3", "4"]
+        )
+        assert await changes.receive() == ["2", "3", "4"]
+
+    with pytest.raises(ValueError):
+        async with triopg_conn.listen("foo", 1, coalesce="unknown"):
+            pass  # pragma: no cover
+    with pytest.raises(ValueError):
+        async with triopg_conn.listen("foo", 1, key=len):
+            pass  # pragma: no cover
+
+
 @pytest.mark.trio
 async def test_listen_cancel(triopg_conn):
     with trio.CancelScope() as cancel_scope:
@@ -282,3 +434,96 @@ async def test_listen_cancel(triopg_conn):
             await assert_listeners(triopg_conn, True)
             cancel_scope.cancel()
     await assert_listeners(triopg_conn, False)
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("transaction", [False, True])
+async def test_pool_parallel_executemany(triopg_pool, transaction):
+    await triopg_pool.execute(
+        """
+        DROP TABLE IF EXISTS bulk;
+        CREATE TABLE bulk (id int PRIMARY KEY, backend int)"""
+    )
+    reported = []
+
+    def _progress(done, total):
+        reported.append((done, total))
+
+    await triopg_pool.parallel_executemany(
+        "INSERT INTO bulk VALUES ($1, pg_backend_pid())",
+        [(i,) for i in range(1050)],
+        chunk_size=100,
+        concurrency=4,
+        transaction=transaction,
+        progress=_progress,
+    )
+    assert await triopg_pool.fetchval("SELECT count(*) FROM bulk") == 1050
+    assert 1 < await triopg_pool.fetchval(
+        "SELECT count(DISTINCT backend) FROM bulk"
+    ) <= 4
+    # Chunks complete in any order
+    assert len(reported) == 11
+    dones = [done for done, _ in reported]
+    assert dones == sorted(dones)
+    assert reported[-1] == (1050, 1050)
+
+    # Lazily consumed iterables
+    await triopg_pool.parallel_executemany(
+        "INSERT INTO bulk VALUES ($1, 0)", ((i,) for i in range(2000, 2010)),
+        chunk_size=3,
+        progress=_progress
+    )
+    assert reported[-1] == (10, None)
+    await triopg_pool.parallel_executemany("INSERT INTO bulk VALUES ($1)", [])
+
+
+@pytest.mark.trio
+async def test_pool_parallel_executemany_shares_pool(triopg_pool):
+    executed = 0
+
+    def _progress(done, total):
+        nonlocal executed
+        executed = done
+
+    async def _batch():
+        await triopg_pool.parallel_executemany(
+            "SELECT pg_sleep($1)", [(0.01,)] * 200,
+            chunk_size=1,
+            concurrency=triopg_pool.statistics().max_size,
+            progress=_progress
+        )
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(_batch)
+        await trio.sleep(0.05)
+        # Gets a connection between two chunks, long before the batch ends
+        assert await triopg_pool.fetchval("SELECT 1") == 1
+        assert executed < 100
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("transaction", [False, True])
+async def test_pool_parallel_executemany_error(triopg_pool, transaction):
+    await triopg_pool.execute(
+        """
+        DROP TABLE IF EXISTS bulk;
+        CREATE TABLE bulk (id int PRIMARY KEY)"""
+    )
+    # The duplicated id makes the last chunk fail
+    args = [(i,) for i in range(100)] + [(100,), (0,)]
+
+    with pytest.raises(triopg.UniqueViolationError):
+        await triopg_pool.parallel_executemany(
+            "INSERT INTO bulk VALUES ($1)",
+            args,
+            chunk_size=10,
+            concurrency=1,
+            transaction=transaction
+        )
+    # Chunks executed before the failure are kept, not the failed one
+    assert await triopg_pool.fetchval("SELECT max(id) FROM bulk") == 99
+
+    with pytest.raises(ValueError):
+        await triopg_pool.parallel_executemany(
+            "INSERT INTO bulk VALUES ($1)", args, chunk_size=0
+        )
@@ -0,0 +1,70 @@
+import asyncpg
+import pytest
+
+import triopg
+
+
+class CountingConnection(asyncpg.Connection):
+    introspected = []
+
+    async def _introspect_types(self, typeoids, timeout):
+        self.introspected.append(sorted(typeoids))
+        return await super()._introspect_types(typeoids, timeout)
+
+    async def _introspect_type(self, typename, schema):
+        self.introspected.append(typename)
+        return await super()._introspect_type(typename, schema)
+
+
+@pytest.fixture
+async def mood_type(asyncio_loop, postgresql_connection_specs):
+    async with triopg.connect(**postgresql_connection_specs) as conn:
+        await conn.execute(
+            "CREATE TYPE mood AS ENUM ('sad', 'ok', 'happy');"
+            "CREATE DOMAIN mood_domain AS mood"
+        )
+        CountingConnection.introspected.clear()
+        yield
+        await conn.execute("DROP TYPE mood CASCADE")
+
+
+@pytest.mark.trio
+async def test_pool_shares_type_introspection(pool_factory, mood_type):
+    # Every query runs on a new connection
+    async with pool_factory(min_size=0, max_size=2, max_queries=1,
+                            connection_class=CountingConnection) as pool:
+        for _ in range(3):
+            assert await pool.fetchval("SELECT 'ok'::mood") == "ok"
+            assert await pool.fetchval("SELECT ARRAY['sad'::mood]") == ["sad"]
+        assert len(CountingConnection.introspected) == 2
+
+        # Telling asyncpg the schema changed drops the shared types as well,
+        # so new connections introspect them again
+        async with pool.acquire() as conn:
+            await conn.reload_schema_state()
+            assert await pool.fetchval("SELECT 'ok'::mood") == "ok"
+        assert len(CountingConnection.introspected) == 3
+
+
+@pytest.mark.trio
+async def test_pool_shares_type_codecs(pool_factory, mood_type):
+    codec = {"typename": "mood", "encoder": str.lower, "decoder": str.upper}
+    async with pool_factory(min_size=1, max_size=1, max_queries=1,
+                            connection_class=CountingConnection,
+                            type_codecs=[codec]) as pool:
+        for _ in range(3):
+            assert await pool.fetchval("SELECT $1::mood", "HAPPY") == "HAPPY"
+        assert CountingConnection.introspected == ["mood"]
+
+
+@pytest.mark.trio
+async def test_pool_type_codec_errors(pool_factory, mood_type):
+    codec = {
+        "typename": "mood_domain",
+        "encoder": str.lower,
+        "decoder": str.upper,
+    }
+    pool = pool_factory(min_size=1, type_codecs=[codec])
+    with pytest.raises(triopg.UnsupportedClientFeatureError):
+        async with pool:
+            pass
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import triopg
+
+QUERY = "SELECT i FROM generate_series(1, $1) i"
+
+COUNT_PREPARED = (
+    "SELECT count(*) FROM pg_prepared_statements WHERE statement = $1"
+)
+
+JSON_CODEC = {
+    "typename": "json",
+    "schema": "pg_catalog",
+    "encoder": json.dumps,
+    "decoder": json.loads,
+}
+
+
+@pytest.mark.trio
+async def test_pool_warm_up(pool_factory):
+    inits = []
+
+    async def init(asyncpg_conn):
+        # Type codecs are already set
+        inits.append(await asyncpg_conn.fetchval("SELECT '[1]'::json"))
+
+    async with pool_factory(min_size=2, max_size=3, init=init,
+                            warm_up_queries=[QUERY],
+                            type_codecs=[JSON_CODEC]) as pool:
+        # Connections are opened and warmed up before the pool is returned
+        assert pool.statistics().size == 2
+        assert inits == [[1], [1]]
+
+        async with pool.acquire() as conn:
+            assert await conn.fetchval(COUNT_PREPARED, QUERY) == 1
+            assert await conn.fetchval("SELECT $1::json", {"a": 1}) == {"a": 1}
+            # Runs the warmed up statement
+            assert await conn.fetchval(QUERY, 3) == 1
+            assert await conn.fetchval(COUNT_PREPARED, QUERY) == 1
+
+
+@pytest.mark.trio
+async def test_pool_warm_up_statement_cache(pool_factory):
+    async with pool_factory(min_size=1, max_size=1, warm_up_queries=[QUERY],
+                            prepared_statement_cache_size=10) as pool:
+        async with pool.acquire() as conn:
+            statement = await conn.prepare(QUERY)
+            assert await statement.fetchval(3) == 1
+            # The warmed up statement is shared
+            assert await conn.fetchval(COUNT_PREPARED, QUERY) == 1
+
+
+@pytest.mark.trio
+async def test_pool_warm_up_error(pool_factory):
+    pool = pool_factory(min_size=1, warm_up_queries=["SELECT * FROM nope"])
+    with pytest.raises(triopg.UndefinedTableError):
+        async with pool:
+            pass
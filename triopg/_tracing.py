@@ -0,0 +1,130 @@
+from time import perf_counter
+
+import trio_asyncio
+
+
+class QueryTracer:
+    """Base class for the ``tracer`` passed to `connect` and `create_pool`
+
+    Both hooks are called from trio, around every query-running call
+    (``execute``, ``executemany``, ``fetch*``, ``copy_*``, prepared
+    statement and cursor calls), with the same `QueryEvent`. They are
+    synchronous and should be cheap: they run on the query hot path.
+    """
+
+    def before_query(self, event):
+        pass
+
+    def after_query(self, event):
+        pass
+
+
+class QueryEvent:
+    """Description of a traced query
+
+    - ``method``: name of the called method (``"fetch"``, ``"execute"``...)
+    - ``query``: SQL text (table name for ``copy_*_table`` methods)
+    - ``args_count``: number of query arguments (number of argument
+      sequences for ``executemany``), or None if unknown
+    - ``rows``: number of rows returned or affected, or None if unknown
+    - ``error``: exception raised by the query, if any
+    - ``total_time``: seconds spent in the call, as seen from trio
+    - ``asyncpg_time``: seconds spent in asyncpg, on the asyncio side
+    - ``bridge_time``: the rest, spent crossing the trio_asyncio bridge
+    - ``context``: free for tracers to carry state (e.g. a span) from
+      ``before_query`` to ``after_query``
+
+    Timings and ``rows`` are only set when ``after_query`` is called.
+    """
+
+    __slots__ = (
+        'method',
+        'query',
+        'args_count',
+        'rows',
+        'error',
+        'total_time',
+        'asyncpg_time',
+        'context',
+        '_aio_started',
+        '_aio_finished',
+    )
+
+    def __init__(self, method, query, args_count):
+        self.method = method
+        self.query = query
+        self.args_count = args_count
+        self.rows = None
+        self.error = None
+        self.total_time = None
+        self.asyncpg_time = None
+        self.context = None
+        self._aio_started = None
+        self._aio_finished = None
+
+    @property
+    def bridge_time(self):
+        if self.total_time is None:
+            return None
+        return self.total_time - (self.asyncpg_time or 0.0)
+
+    def __repr__(self):
+        return '<QueryEvent {} {!r} rows={} total_time={}>'.format(
+            self.method, self.query, self.rows, self.total_time
+        )
+
+
+def _status_rows(status):
+    # Command status tags end with the number of rows, e.g. "INSERT 0 5"
+    count = status.rpartition(' ')[2] if isinstance(status, str) else ''
+    return int(count) if count.isdigit() else None
+
+
+_ROW_COUNTERS = {
+    'fetch': len,
+    'fetchmany': len,
+    'fetchrow': lambda record: 0 if record is None else 1,
+    'fetch_columns': lambda builder: builder.rows,
+    'forward': int,
+    'execute': _status_rows,
+    'copy_from_query': _status_rows,
+    'copy_from_table': _status_rows,
+    'copy_to_table': _status_rows,
+    'copy_records_to_table': _status_rows,
+}
+
+
+async def _aio_timed(event, aio_callable, args, kwargs):
+    """Run on the asyncio side, time the asyncpg call itself"""
+    event._aio_started = perf_counter()
+    try:
+        return await aio_callable(*args, **kwargs)
+    finally:
+        event._aio_finished = perf_counter()
+
+
+_aio_timed_call = trio_asyncio.aio_as_trio(_aio_timed)
+
+
+async def _trace_query(tracer, event, crossing, *args):
+    """Call the trio async function `crossing`, reporting it to `tracer`
+
+    `crossing` runs the query on the asyncio side through `_aio_timed` with
+    the same `event`, so asyncpg time can be told apart from bridge time.
+    """
+    tracer.before_query(event)
+    started = perf_counter()
+    try:
+        result = await crossing(*args)
+        counter = _ROW_COUNTERS.get(event.method)
+        if counter is not None:
+            event.rows = counter(result)
+        return result
+    except BaseException as exc:
+        event.error = exc
+        raise
+    finally:
+        event.total_time = perf_counter() - started
+        if event._aio_finished is not None:
+            event.asyncpg_time = event._aio_finished - event._aio_started
+        tracer.after_query(event)
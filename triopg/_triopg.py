@@ -1,10 +1,39 @@
+from collections import deque
 from functools import wraps, partial
-from inspect import iscoroutinefunction
+from inspect import getmembers, iscoroutinefunction
+from itertools import islice
 import trio
 import asyncpg
 import trio_asyncio
 from async_generator import asynccontextmanager
 
+from ._batching import WriteBatcher
+from ._columns import DEFAULT_COLUMNS_CHUNK_SIZE, _fetch_columns
+from . import _cancel
+from ._cancel import _aio_spawn, _is_cancelled
+from ._deadlines import _bounded_by_deadline, _takes_timeout
+from ._fanout import _map
+from ._limits import (
+    DEFAULT_STREAM_CHUNK_SIZE, ResultTooLargeError, _aio_guarded_fetch,
+    _aio_guarded_fetch_call, _fetch_limits
+)
+from ._copy import (
+    _copy_in_streamed, _copy_out_streamed, _is_async_iterable, _is_trio_output
+)
+from ._notify import NOTIFY_OVERFLOW, NotificationHub, _notification_buffer
+from ._result_cache import ResultCache
+from ._rows import (
+    _build_row, _build_rows, _fetch_with_record_class, _is_row_class,
+    _statement_row_class
+)
+from ._scan import _scan
+from ._sizing import _SizeController
+from ._statements import _reattached, _StatementCache, _StatementRegistry
+from ._stats import _PoolMetrics
+from ._tracing import QueryEvent, _aio_timed, _aio_timed_call, _trace_query
+from ._types import _TypeCache
+from ._warm_up import _warm_up_init
+
 
 def _shielded(f):
     @wraps(f)
@@ -15,11 +44,89 @@ def _shielded(f):
     return wrapper
 
 
+def _is_coroutine_function(target):
+    # iscoroutinefunction(target) is not enough, because PreparedStatement
+    # methods are wrapped with @connresource.guarded
+    return iscoroutinefunction(getattr(target, '__wrapped__', target))
+
+
+def _aio_method(name, target, resource_attr):
+    @wraps(target)
+    async def method(self, *args, **kwargs):
+        resource = getattr(self, resource_attr)
+        return await getattr(resource, name)(*args, **kwargs)
+
+    return trio_asyncio.aio_as_trio(method)
+
+
+def _aio_query_method(name, target, resource_attr):
+    untraced = _aio_method(name, target, resource_attr)
+
+    @wraps(target)
+    async def method(self, *args, **kwargs):
+        if self._tracer is None:
+            return await untraced(self, *args, **kwargs)
+        event = QueryEvent(name, *self._describe_query(name, args, kwargs))
+        aio_callable = getattr(getattr(self, resource_attr), name)
+        return await _trace_query(
+            self._tracer, event, _aio_timed_call, event, aio_callable, args,
+            kwargs
+        )
+
+    if _takes_timeout(target):
+        return _bounded_by_deadline(method)
+    return method
+
+
+def _proxy_aio_methods(asyncpg_cls, resource_attr, query_methods=()):
+    """Generate the trio wrappers of `asyncpg_cls` coroutine methods
+
+    This is done once at class definition time (instead of lazily from
+    `__getattr__` on each new proxy instance) so proxies are cheap to create.
+    Methods explicitly defined by the proxy class are left untouched.
+
+    `query_methods` are reported to the proxy's `_tracer` (if any), the proxy
+    class must then provide `_describe_query(method, args, kwargs)`.
+    """
+
+    def decorator(proxy_cls):
+        for name, target in getmembers(asyncpg_cls):
+            if name.startswith('_') or hasattr(proxy_cls, name):
+                continue
+            if name in query_methods:
+                setattr(
+                    proxy_cls, name,
+                    _aio_query_method(name, target, resource_attr)
+                )
+            elif _is_coroutine_function(target):
+                setattr(
+                    proxy_cls, name, _aio_method(name, target, resource_attr)
+                )
+        return proxy_cls
+
+    return decorator
+
+
+def _describe_connection_query(method, args, kwargs):
+    if args:
+        query = args[0]
+    else:
+        query = kwargs.get(
+            'query', kwargs.get('command', kwargs.get('table_name'))
+        )
+    if method == 'executemany':
+        batch = args[1] if len(args) > 1 else kwargs.get('args')
+        return query, len(batch) if hasattr(batch, '__len__') else None
+    return query, max(len(args) - 1, 0)
+
+
 def connect(*args, **kwargs):
     return TrioConnectionProxy(*args, **kwargs)
 
 
-def create_pool(*args, **kwargs):
+def create_pool(*args, trio_native=False, **kwargs):
+    if trio_native:
+        return TrioNativePool(*args, **kwargs)
     return TrioPoolProxy(*args, **kwargs)
 
 
@@ -31,69 +138,269 @@ class TrioTransactionProxy:
     async def __aenter__(self, *args):
         return await self._asyncpg_transaction.__aenter__(*args)
 
-    @_shielded
-    @trio_asyncio.aio_as_trio
     async def __aexit__(self, *args):
+        with trio.CancelScope(shield=True) as scope:
+            if _is_cancelled(args[1]):
+                # The rollback first waits for the server to acknowledge the
+                # cancellation of the interrupted query, don't wait forever
+                scope.deadline = (
+                    trio.current_time() + _cancel.CANCEL_RECOVERY_TIMEOUT
+                )
+            return await self._aio_aexit(*args)
+        self._asyncpg_transaction._connection.terminate()
+
+    @trio_asyncio.aio_as_trio
+    async def _aio_aexit(self, *args):
         return await self._asyncpg_transaction.__aexit__(*args)
 
 
+@_proxy_aio_methods(
+    asyncpg.cursor.Cursor,
+    '_asyncpg_cursor',
+    query_methods=('fetch', 'fetchrow', 'forward')
+)
 class TrioCursorProxy:
-    def __init__(self, asyncpg_cursor):
+    def __init__(
+            self,
+            asyncpg_cursor,
+            query=None,
+            args_count=None,
+            tracer=None,
+            row_class=None
+    ):
         self._asyncpg_cursor = asyncpg_cursor
+        self._query = query
+        self._args_count = args_count
+        self._tracer = tracer
+        self._row_class = row_class
+
+    def _describe_query(self, method, args, kwargs):
+        return self._query, self._args_count
+
+    _aio_fetch = _aio_query_method(
+        'fetch', asyncpg.cursor.Cursor.fetch, '_asyncpg_cursor'
+    )
+    _aio_fetchrow = _aio_query_method(
+        'fetchrow', asyncpg.cursor.Cursor.fetchrow, '_asyncpg_cursor'
+    )
+
+    async def fetch(self, n, *, timeout=None):
+        rows = await self._aio_fetch(n, timeout=timeout)
+        if self._row_class is None:
+            return rows
+        return _build_rows(self._row_class, rows)
+
+    async def fetchrow(self, *, timeout=None):
+        row = await self._aio_fetchrow(timeout=timeout)
+        if self._row_class is None:
+            return row
+        return _build_row(self._row_class, row)
+
+
+class TrioCursorIterator:
+    """Iterate over a cursor without crossing the asyncio loop for every row
+
+    Rows are fetched by chunks of `prefetch` and then served from a trio-side
+    buffer, so the bridge is only crossed once per chunk.
+    """
+
+    def __init__(
+            self,
+            asyncpg_cursor_factory,
+            prefetch,
+            timeout=None,
+            query=None,
+            args_count=None,
+            tracer=None,
+            row_class=None
+    ):
+        self._asyncpg_cursor_factory = asyncpg_cursor_factory
+        self._asyncpg_cursor = None
+        self._prefetch = prefetch
+        self._timeout = timeout
+        self._query = query
+        self._args_count = args_count
+        self._tracer = tracer
+        self._row_class = row_class
+        self._rows = deque()
+        self._exhausted = False
 
-    @trio_asyncio.aio_as_trio
-    async def fetch(self, *args, **kwargs):
-        return await self._asyncpg_cursor.fetch(*args, **kwargs)
+    def __aiter__(self):
+        return self
 
-    @trio_asyncio.aio_as_trio
-    async def fetchrow(self, *args, **kwargs):
-        return await self._asyncpg_cursor.fetchrow(*args, **kwargs)
+    async def __anext__(self):
+        if not self._rows:
+            if self._exhausted:
+                raise StopAsyncIteration
+            rows = await self._fetch_chunk(timeout=self._timeout)
+            if len(rows) < self._prefetch:
+                self._exhausted = True
+            if not rows:
+                raise StopAsyncIteration
+            if self._row_class is not None:
+                rows = _build_rows(self._row_class, rows)
+            self._rows.extend(rows)
+        return self._rows.popleft()
+
+    @_bounded_by_deadline
+    async def _fetch_chunk(self, timeout):
+        if self._tracer is None:
+            return await self._aio_fetch_chunk(timeout)
+        event = QueryEvent('fetch', self._query, self._args_count)
+        return await _trace_query(
+            self._tracer, event, _aio_timed_call, event, self._fetch_rows,
+            (timeout,), {}
+        )
 
     @trio_asyncio.aio_as_trio
-    async def forward(self, *args, **kwargs):
-        return await self._asyncpg_cursor.forward(*args, **kwargs)
+    async def _aio_fetch_chunk(self, timeout):
+        return await self._fetch_rows(timeout)
+
+    async def _fetch_rows(self, timeout):
+        if self._asyncpg_cursor is None:
+            self._asyncpg_cursor = await self._asyncpg_cursor_factory
+        rows = await self._asyncpg_cursor.fetch(
+            self._prefetch, timeout=timeout
+        )
+        if len(rows) < self._prefetch:
+            # Like asyncpg's cursor iterator, don't leave the portal open
+            # until the end of the transaction
+            await self._asyncpg_cursor._close_portal(timeout)
+        return rows
 
 
 class TrioCursorFactoryProxy:
-    def __init__(self, asyncpg_transaction_factory):
+    # Same default as asyncpg's own cursor iterator
+    DEFAULT_PREFETCH = 50
+
+    def __init__(
+            self,
+            asyncpg_transaction_factory,
+            prefetch=None,
+            timeout=None,
+            query=None,
+            args_count=None,
+            tracer=None,
+            row_class=None
+    ):
+        # `prefetch` is handled here rather than by asyncpg, whose cursor
+        # factory cannot be awaited (hence can't `fetch(n)`) once it is set.
         self._asyncpg_transaction_factory = asyncpg_transaction_factory
-        self._asyncpg_cursor_aiter = None
+        self._prefetch = prefetch
+        self._timeout = timeout
+        self._query = query
+        self._args_count = args_count
+        self._tracer = tracer
+        self._row_class = row_class
 
     def __await__(self):
+        if self._prefetch is not None:
+            raise asyncpg.InterfaceError(
+                'prefetch argument can only be specified for iterable cursor'
+            )
         return self._wrapped_asyncpg_await().__await__()
 
     @trio_asyncio.aio_as_trio
     async def _wrapped_asyncpg_await(self):
         asyncpg_cursor = await self._asyncpg_transaction_factory
-        return TrioCursorProxy(asyncpg_cursor)
+        return TrioCursorProxy(
+            asyncpg_cursor, self._query, self._args_count, self._tracer,
+            self._row_class
+        )
 
     def __aiter__(self):
-        self._asyncpg_cursor_aiter = self._asyncpg_transaction_factory.__aiter__(
+        if self._prefetch is None:
+            prefetch = self.DEFAULT_PREFETCH
+        elif self._prefetch <= 0:
+            raise asyncpg.InterfaceError('prefetch argument must be > 0')
+        else:
+            prefetch = self._prefetch
+        return TrioCursorIterator(
+            self._asyncpg_transaction_factory, prefetch, self._timeout,
+            self._query, self._args_count, self._tracer, self._row_class
         )
-        return self
-
-    @trio_asyncio.aio_as_trio
-    async def __anext__(self):
-        return await self._asyncpg_cursor_aiter.__anext__()
 
 
+@_proxy_aio_methods(
+    asyncpg.prepared_stmt.PreparedStatement,
+    '_asyncpg_statement',
+    query_methods=(
+        'fetch', 'fetchrow', 'fetchval', 'fetchmany', 'executemany', 'explain'
+    )
+)
 class TrioStatementProxy:
-    def __init__(self, asyncpg_statement):
+    def __init__(self, asyncpg_statement, tracer=None):
         self._asyncpg_statement = asyncpg_statement
+        self._tracer = tracer
+
+    def _describe_query(self, method, args, kwargs):
+        if method == 'executemany':
+            batch = args[0] if args else kwargs.get('args')
+            args_count = len(batch) if hasattr(batch, '__len__') else None
+        else:
+            args_count = len(args)
+        return self._asyncpg_statement.get_query(), args_count
+
+    _aio_fetch = _aio_query_method(
+        'fetch', asyncpg.prepared_stmt.PreparedStatement.fetch,
+        '_asyncpg_statement'
+    )
+    _aio_fetchrow = _aio_query_method(
+        'fetchrow', asyncpg.prepared_stmt.PreparedStatement.fetchrow,
+        '_asyncpg_statement'
+    )
+
+    async def fetch(self, *args, record_class=None, **kwargs):
+        """Same as `asyncpg.PreparedStatement.fetch`
+
+        `record_class` - any class (or callable) built from each record's
+          columns, see `TrioConnectionProxy.fetch`. `asyncpg.Record`
+          subclasses are given to `prepare()` instead.
+        """
+        row_class = _statement_row_class(record_class)
+        return await _fetch_with_record_class(
+            self._aio_fetch, _build_rows, row_class, args, kwargs
+        )
+
+    async def fetchrow(self, *args, record_class=None, **kwargs):
+        row_class = _statement_row_class(record_class)
+        return await _fetch_with_record_class(
+            self._aio_fetchrow, _build_row, row_class, args, kwargs
+        )
+
+    @_bounded_by_deadline
+    async def fetch_columns(
+            self,
+            *args,
+            timeout: float = None,
+            chunk_size: int = DEFAULT_COLUMNS_CHUNK_SIZE,
+            numpy: bool = False
+    ):
+        """Same as `TrioConnectionProxy.fetch_columns` for this statement"""
+
+        async def get_statement():
+            return self._asyncpg_statement
+
+        return await _fetch_columns(
+            self._tracer, self._asyncpg_statement.get_query(), get_statement,
+            args, timeout, chunk_size, numpy
+        )
 
-    def cursor(self, *args, **kwargs):
+    def cursor(self, *args, prefetch=None, record_class=None, **kwargs):
+        row_class = _statement_row_class(record_class)
         asyncpg_cursor_factory = self._asyncpg_statement.cursor(
             *args, **kwargs
         )
-        return TrioCursorFactoryProxy(asyncpg_cursor_factory)
+        return TrioCursorFactoryProxy(
+            asyncpg_cursor_factory, prefetch, kwargs.get('timeout'),
+            self._asyncpg_statement.get_query(), len(args), self._tracer,
+            row_class
+        )
 
     def __getattr__(self, attr):
         target = getattr(self._asyncpg_statement, attr)
 
-        # iscoroutinefunction(target) is not enough, because PreparedStatement
-        # methods are wrapped with @connresource.guarded
-        if iscoroutinefunction(target.__wrapped__
-                               if hasattr(target, '__wrapped__') else target):
+        if _is_coroutine_function(target):
 
             @wraps(target)
             @trio_asyncio.aio_as_trio
@@ -108,31 +415,320 @@ class TrioStatementProxy:
         return target
 
 
-NOTIFY_OVERFLOW = object()
-
-
+@_proxy_aio_methods(
+    asyncpg.connection.Connection,
+    '_asyncpg_conn',
+    query_methods=(
+        'execute',
+        'executemany',
+        'fetch',
+        'fetchrow',
+        'fetchval',
+        'fetchmany',
+        'copy_from_query',
+        'copy_from_table',
+        'copy_to_table',
+        'copy_records_to_table',
+    )
+)
 class TrioConnectionProxy:
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, tracer=None, **kwargs):
         self._asyncpg_create_connection = partial(
             asyncpg.connect, *args, **kwargs
         )
         self._asyncpg_conn = None
+        self._tracer = tracer
+        # Set on pool connections, see `create_pool`
+        self._statement_cache = None
+        self._fetch_limits = None
+
+    _describe_query = staticmethod(_describe_connection_query)
+
+    _aio_fetch = _aio_query_method(
+        'fetch', asyncpg.connection.Connection.fetch, '_asyncpg_conn'
+    )
+    _aio_fetchrow = _aio_query_method(
+        'fetchrow', asyncpg.connection.Connection.fetchrow, '_asyncpg_conn'
+    )
+    _aio_copy_from_query = _aio_query_method(
+        'copy_from_query', asyncpg.connection.Connection.copy_from_query,
+        '_asyncpg_conn'
+    )
+    _aio_copy_from_table = _aio_query_method(
+        'copy_from_table', asyncpg.connection.Connection.copy_from_table,
+        '_asyncpg_conn'
+    )
+    _aio_copy_to_table = _aio_query_method(
+        'copy_to_table', asyncpg.connection.Connection.copy_to_table,
+        '_asyncpg_conn'
+    )
+    _aio_copy_records_to_table = _aio_query_method(
+        'copy_records_to_table',
+        asyncpg.connection.Connection.copy_records_to_table, '_asyncpg_conn'
+    )
+
+    async def fetch(
+            self,
+            query,
+            *args,
+            record_class=None,
+            max_rows=None,
+            max_bytes=None,
+            **kwargs
+    ):
+        """Same as `asyncpg.Connection.fetch`
+
+        `record_class` can also be any class (dataclass, NamedTuple,
+        ``__slots__`` class...) or callable: its arguments are matched with
+        the columns by name once per query shape, then each record is built
+        into it.
+
+        `ResultTooLargeError` is raised as soon as more than `max_rows` rows,
+        or rows taking more than (an estimated) `max_bytes` bytes, are
+        received. Both default to the pool's `fetch_max_rows` and
+        `fetch_max_bytes`, `math.inf` lifts them. With `max_bytes`, rows are
+        fetched by chunks from a cursor, within a transaction opened for the
+        occasion if needed.
+        """
+        limits = _fetch_limits(max_rows, max_bytes, self._fetch_limits)
+        if limits is None:
+            fetch = self._aio_fetch
+        else:
+            fetch = partial(self._guarded_fetch, limits=limits)
+        return await _fetch_with_record_class(
+            fetch, _build_rows, record_class, (query,) + args, kwargs
+        )
+
+    @_bounded_by_deadline
+    async def _guarded_fetch(self, query, *args, **kwargs):
+        aio_args = (self._asyncpg_conn, query) + args
+        if self._tracer is None:
+            return await _aio_guarded_fetch_call(*aio_args, **kwargs)
+        event = QueryEvent('fetch', query, len(args))
+        return await _trace_query(
+            self._tracer, event, _aio_timed_call, event, _aio_guarded_fetch,
+            aio_args, kwargs
+        )
+
+    @asynccontextmanager
+    async def stream(
+            self,
+            query,
+            *args,
+            chunk_size=DEFAULT_STREAM_CHUNK_SIZE,
+            timeout=None,
+            record_class=None
+    ):
+        """Run `query` and return an async iterator over its rows
+
+        Rows are fetched by chunks of `chunk_size` from a cursor, within a
+        transaction opened for the occasion if needed, so no more than a
+        chunk of them is held at once.
+
+        For example:
+
+        async with conn.stream('SELECT * FROM events') as rows:
+            async for row in rows:
+                print(row)
+        """
+        cursor = self.cursor(
+            query,
+            *args,
+            prefetch=chunk_size,
+            timeout=timeout,
+            record_class=record_class
+        )
+        if self._asyncpg_conn.is_in_transaction():
+            yield cursor.__aiter__()
+        else:
+            async with self.transaction():
+                yield cursor.__aiter__()
+
+    async def fetchrow(self, query, *args, record_class=None, **kwargs):
+        """Same as `asyncpg.Connection.fetchrow`, see `fetch`"""
+        return await _fetch_with_record_class(
+            self._aio_fetchrow, _build_row, record_class, (query,) + args,
+            kwargs
+        )
+
+    async def copy_from_query(
+            self,
+            query,
+            *args,
+            output,
+            chunk_size=None,
+            max_buffer_size=None,
+            **kwargs
+    ):
+        """Same as `asyncpg.Connection.copy_from_query`
+
+        `output` can also be a `trio.Path`, a `trio.abc.SendStream` or a
+        `trio.abc.SendChannel` (e.g. the sending end of a memory channel
+        whose receiving end is iterated over). The data crosses over to trio
+        by chunks of at least `chunk_size` bytes, and at most
+        `max_buffer_size` chunks are buffered: a slow output throttles the
+        server.
+        """
+        if not _is_trio_output(output):
+            return await self._aio_copy_from_query(
+                query, *args, output=output, **kwargs
+            )
+        return await _copy_out_streamed(
+            partial(self._aio_copy_from_query, query, *args, **kwargs), output,
+            chunk_size, max_buffer_size
+        )
+
+    async def copy_from_table(
+            self,
+            table_name,
+            *,
+            output,
+            chunk_size=None,
+            max_buffer_size=None,
+            **kwargs
+    ):
+        """Same as `asyncpg.Connection.copy_from_table`
+
+        `output` can also be a trio output, see `copy_from_query`.
+        """
+        if not _is_trio_output(output):
+            return await self._aio_copy_from_table(
+                table_name, output=output, **kwargs
+            )
+        return await _copy_out_streamed(
+            partial(self._aio_copy_from_table, table_name, **kwargs), output,
+            chunk_size, max_buffer_size
+        )
+
+    async def copy_to_table(
+            self, table_name, *, source, chunk_size=None, **kwargs
+    ):
+        """Same as `asyncpg.Connection.copy_to_table`
+
+        `source` can also be a trio async iterable of bytes (e.g. a
+        `trio.MemoryReceiveChannel` or an async file opened in binary mode),
+        streamed to the server by chunks of `chunk_size` items, with the
+        iteration throttled by the COPY progress.
+        """
+        if not _is_async_iterable(source):
+            return await self._aio_copy_to_table(
+                table_name, source=source, **kwargs
+            )
+        return await _copy_in_streamed(
+            partial(self._aio_copy_to_table, table_name, **kwargs), 'source',
+            source, chunk_size
+        )
+
+    async def copy_records_to_table(
+            self, table_name, *, records, chunk_size=None, **kwargs
+    ):
+        """Same as `asyncpg.Connection.copy_records_to_table`
+
+        `records` can also be a trio async iterable (e.g. a
+        `trio.MemoryReceiveChannel`), streamed to the server by chunks of
+        `chunk_size` records, with the iteration throttled by the COPY
+        progress.
+        """
+        if not _is_async_iterable(records):
+            return await self._aio_copy_records_to_table(
+                table_name, records=records, **kwargs
+            )
+        return await _copy_in_streamed(
+            partial(self._aio_copy_records_to_table, table_name, **kwargs),
+            'records', records, chunk_size
+        )
+
+    @_bounded_by_deadline
+    async def fetch_columns(
+            self,
+            query,
+            *args,
+            timeout: float = None,
+            chunk_size: int = DEFAULT_COLUMNS_CHUNK_SIZE,
+            numpy: bool = False
+    ):
+        """Run `query` and return its result as a dict of columns
+
+        Columns of fixed width types (bool, integers, floats) are
+        `array.array` (or NumPy arrays with `numpy`), the others (and
+        columns holding NULLs) are lists.
+
+        Records are fetched by chunks of `chunk_size` (all at once if None)
+        and transposed into columns on the asyncio side, so only the columns
+        cross over to trio and no more than a chunk of records is alive at
+        once. Chunks are fetched from a cursor, within a transaction opened
+        for the occasion if the connection is not already in one.
+        """
+        # Goes through asyncpg's statement cache, unlike `prepare()`
+        prepare = self._asyncpg_conn._prepare
+        get_statement = partial(
+            prepare, query, timeout=timeout, use_cache=True
+        )
+        return await _fetch_columns(
+            self._tracer, query, get_statement, args, timeout, chunk_size,
+            numpy
+        )
 
     def transaction(self, *args, **kwargs):
         asyncpg_transaction = self._asyncpg_conn.transaction(*args, **kwargs)
         return TrioTransactionProxy(asyncpg_transaction)
 
-    async def prepare(self, *args, **kwargs):
-        asyncpg_statement = await trio_asyncio.aio_as_trio(
-            self._asyncpg_conn.prepare(*args, **kwargs)
-        )
-        return TrioStatementProxy(asyncpg_statement)
+    async def prepare(self, query, **kwargs):
+        """Same as `asyncpg.Connection.prepare`
+
+        On connections from a pool created with a
+        `prepared_statement_cache_size`, the statement prepared the last time
+        for this `query` is returned (unless `name` or `record_class` are
+        given).
+        """
+        cache = self._statement_cache
+        if cache is None or not kwargs.keys() <= {'timeout'}:
+            return await self._prepare(query, **kwargs)
+        statement = cache.get(query)
+        if statement is None:
+            # Reuses the statements asyncpg already prepared for this query,
+            # by the pool warm-up for instance
+            statement = await self._prepare(query, use_cache=True, **kwargs)
+            cache.put(query, statement)
+        else:
+            statement._asyncpg_statement = _reattached(
+                statement._asyncpg_statement
+            )
+        return statement
+
+    @_bounded_by_deadline
+    async def _prepare(self, query, use_cache=False, **kwargs):
+        if use_cache:
+            aio_prepare = self._asyncpg_conn._prepare(
+                query, use_cache=True, **kwargs
+            )
+        else:
+            aio_prepare = self._asyncpg_conn.prepare(query, **kwargs)
+        asyncpg_statement = await trio_asyncio.aio_as_trio(aio_prepare)
+        return TrioStatementProxy(asyncpg_statement, self._tracer)
 
     @asynccontextmanager
-    async def listen(self, channel, max_buffer_size):
-        """LISTEN on `channel` notifications and return memory channel to iterate over
+    async def listen(
+            self,
+            channel,
+            max_buffer_size,
+            overflow='notify',
+            *,
+            coalesce=None,
+            key=None,
+            batch=False
+    ):
+        """LISTEN on `channel` notifications and return channel to iterate over
 
         max_buffer_size - memory channel max buffer size
+        overflow - what to do once the buffer is full:
+          'notify' - drop new payloads, NOTIFY_OVERFLOW is received instead
+          'drop_oldest' - drop the oldest buffered payload
+        coalesce - merge buffered payloads with the same `key(payload)`
+          (the payload itself by default), `max_buffer_size` then counts keys:
+          'latest' - keep the latest payload
+          'dedupe' - keep the first payload
+        batch - receive lists of all the payloads buffered at once
 
         For example:
 
@@ -142,24 +738,17 @@ class TrioConnectionProxy:
                     print('Postgres notification received:', notification)
         """
 
-        assert max_buffer_size >= 1
-        send_channel, receive_channel = trio.open_memory_channel(
-            max_buffer_size + 1
+        buffer = _notification_buffer(
+            max_buffer_size, overflow, coalesce, key, batch
         )
 
         def _listen_callback(c, pid, chan, payload):
-            stats = send_channel.statistics()
-            if stats.current_buffer_used == stats.max_buffer_size - 1:
-                send_channel.send_nowait(NOTIFY_OVERFLOW)
-            try:
-                send_channel.send_nowait(payload)
-            except trio.WouldBlock:
-                pass  # drop payload on the floor
+            buffer.push(payload)
 
-        async with receive_channel, send_channel:
+        async with buffer:
             await self.add_listener(channel, _listen_callback)
             try:
-                yield receive_channel
+                yield buffer.receive_channel
             finally:
                 with trio.CancelScope(shield=True):
                     await self.remove_listener(channel, _listen_callback)
@@ -181,9 +770,19 @@ class TrioConnectionProxy:
 
         return target
 
-    def cursor(self, *args, **kwargs):
+    def cursor(self, *args, prefetch=None, record_class=None, **kwargs):
+        if _is_row_class(record_class):
+            row_class = record_class
+        else:
+            row_class = None
+            if record_class is not None:
+                kwargs['record_class'] = record_class
         asyncpg_cursor_factory = self._asyncpg_conn.cursor(*args, **kwargs)
-        return TrioCursorFactoryProxy(asyncpg_cursor_factory)
+        query = args[0] if args else kwargs.get('query')
+        return TrioCursorFactoryProxy(
+            asyncpg_cursor_factory, prefetch, kwargs.get('timeout'), query,
+            max(len(args) - 1, 0), self._tracer, row_class
+        )
 
     @_shielded
     @trio_asyncio.aio_as_trio
@@ -198,35 +797,194 @@ class TrioConnectionProxy:
         return self
 
     async def __aexit__(self, *exc):
+        if _is_cancelled(exc[1]):
+            # Close in the background, the connection first has to recover
+            # from the cancellation
+            _aio_spawn(
+                self._asyncpg_conn._loop,
+                self._asyncpg_conn.close(
+                    timeout=_cancel.CANCEL_RECOVERY_TIMEOUT
+                )
+            )
+            return
         return await self.close()
 
 
+def _get_connection_proxy(
+        conn_proxy, asyncpg_conn, tracer, statement_registry, fetch_limits
+):
+    # Reuse the proxy (and the method wrappers and statements it has cached)
+    # built the last time this connection was acquired. The pools keep it
+    # alongside their own per connection bookkeeping, so it goes away with
+    # it.
+    if conn_proxy is None or conn_proxy._asyncpg_conn is not asyncpg_conn:
+        conn_proxy = TrioConnectionProxy(tracer=tracer)
+        conn_proxy._asyncpg_conn = asyncpg_conn
+        conn_proxy._fetch_limits = fetch_limits
+        if statement_registry is not None:
+            conn_proxy._statement_cache = _StatementCache(
+                statement_registry, asyncpg_conn
+            )
+    return conn_proxy
+
+
+def _statement_registry(prepared_statement_cache_size):
+    if not prepared_statement_cache_size:
+        return None
+    return _StatementRegistry(prepared_statement_cache_size)
+
+
 class TrioPoolAcquireContextProxy:
-    def __init__(self, asyncpg_acquire_context):
+    def __init__(
+            self, asyncpg_acquire_context, connection_proxies, pool_metrics,
+            tracer, statement_registry, fetch_limits
+    ):
         self._asyncpg_acquire_context = asyncpg_acquire_context
+        self._connection_proxies = connection_proxies
+        self._pool_metrics = pool_metrics
+        self._tracer = tracer
+        self._statement_registry = statement_registry
+        self._fetch_limits = fetch_limits
+        self._acquisition = None
 
-    @trio_asyncio.aio_as_trio
     async def __aenter__(self, *args):
+        self._acquisition = self._pool_metrics.acquire_started()
+        try:
+            conn_proxy = await self._aio_aenter(*args)
+        except BaseException:
+            self._pool_metrics.acquire_failed(self._acquisition)
+            raise
+        self._pool_metrics.acquired(self._acquisition)
+        return conn_proxy
+
+    @trio_asyncio.aio_as_trio
+    async def _aio_aenter(self, *args):
         proxy = await self._asyncpg_acquire_context.__aenter__(*args)
-        conn_proxy = TrioConnectionProxy()
-        conn_proxy._asyncpg_conn = proxy._con
+        # Keyed by asyncpg's connection holders: there are at most
+        # `max_size` of them and the one replacing a connection drops it
+        conn_proxy = self._connection_proxies[proxy._holder] = (
+            _get_connection_proxy(
+                self._connection_proxies.get(proxy._holder), proxy._con,
+                self._tracer, self._statement_registry, self._fetch_limits
+            )
+        )
         return conn_proxy
 
+    async def __aexit__(self, *args):
+        self._pool_metrics.released(self._acquisition)
+        if _is_cancelled(args[1]):
+            self._release_in_background()
+            return
+        return await self._aio_aexit(*args)
+
+    def _release_in_background(self):
+        # Don't keep the cancelled task waiting for the connection to recover
+        # from the cancellation, asyncpg terminates it if that times out
+        acquire_context = self._asyncpg_acquire_context
+        proxy = acquire_context.connection
+        acquire_context.done = True
+        acquire_context.connection = None
+        pool = acquire_context.pool
+        _aio_spawn(
+            pool._loop,
+            pool.release(proxy, timeout=_cancel.CANCEL_RECOVERY_TIMEOUT)
+        )
+
     @_shielded
     @trio_asyncio.aio_as_trio
-    async def __aexit__(self, *args):
+    async def _aio_aexit(self, *args):
         return await self._asyncpg_acquire_context.__aexit__(*args)
 
 
 class TrioPoolProxy:
-    def __init__(self, *args, **kwargs):
+    def __init__(
+            self,
+            *args,
+            track_call_sites=False,
+            tracer=None,
+            prepared_statement_cache_size=None,
+            warm_up_queries=None,
+            type_codecs=None,
+            fetch_max_rows=None,
+            fetch_max_bytes=None,
+            **kwargs
+    ):
+        unsupported = sorted(
+            name for name in ('target_acquire_wait', 'resize_interval')
+            if name in kwargs
+        )
+        if unsupported:
+            raise TypeError(
+                'asyncpg pool does not support {} argument(s), use a pool '
+                'created with trio_native=True instead'.format(
+                    ', '.join(unsupported)
+                )
+            )
+        self._type_cache = _TypeCache()
+        kwargs['connection_class'] = self._type_cache.connection_class(
+            kwargs.get('connection_class', asyncpg.Connection)
+        )
+        kwargs['init'] = _warm_up_init(
+            kwargs.pop('init', None), warm_up_queries, type_codecs,
+            self._type_cache
+        )
         self._asyncpg_create_pool = partial(
             asyncpg.create_pool, *args, **kwargs
         )
         self._asyncpg_pool = None
+        self._connection_proxies = {}
+        self._metrics = _PoolMetrics(track_call_sites)
+        self._tracer = tracer
+        self._statement_registry = _statement_registry(
+            prepared_statement_cache_size
+        )
+        self._fetch_limits = _fetch_limits(fetch_max_rows, fetch_max_bytes)
 
     def acquire(self):
-        return TrioPoolAcquireContextProxy(self._asyncpg_pool.acquire())
+        return TrioPoolAcquireContextProxy(
+            self._asyncpg_pool.acquire(), self._connection_proxies,
+            self._metrics, self._tracer, self._statement_registry,
+            self._fetch_limits
+        )
+
+    def invalidate_statements(self):
+        """Drop the prepared statements cached by the pool connections
+
+        To be called after schema changes affecting them. Statements (and
+        asyncpg's statement and type caches) are dropped the next time their
+        connection prepares a statement.
+        """
+        if self._statement_registry is not None:
+            self._statement_registry.invalidate()
+
+    def _statement_cache_statistics(self):
+        if self._statement_registry is None:
+            return None
+        return self._statement_registry.statistics()
+
+    def statistics(self):
+        """Return a `PoolStatistics` snapshot of the pool usage
+
+        Pass ``track_call_sites=True`` to `create_pool` to get the acquire
+        wait and hold times broken down by the code acquiring connections.
+        """
+        if self._asyncpg_pool is None:
+            kwargs = self._asyncpg_create_pool.keywords
+            # asyncpg's defaults
+            return self._metrics.statistics(
+                size=0,
+                min_size=kwargs.get('min_size', 10),
+                max_size=kwargs.get('max_size', 10),
+                idle=0,
+                statement_cache=self._statement_cache_statistics(),
+            )
+        return self._metrics.statistics(
+            size=self._asyncpg_pool.get_size(),
+            min_size=self._asyncpg_pool.get_min_size(),
+            max_size=self._asyncpg_pool.get_max_size(),
+            idle=self._asyncpg_pool.get_idle_size(),
+            statement_cache=self._statement_cache_statistics(),
+        )
 
     async def execute(self, statement: str, *args, timeout: float = None):
         async with self.acquire() as conn:
@@ -238,17 +996,228 @@ class TrioPoolProxy:
         async with self.acquire() as conn:
             return await conn.executemany(statement, args, timeout=timeout)
 
-    async def fetch(self, query, *args, timeout: float = None):
+    async def parallel_executemany(
+            self,
+            statement: str,
+            args,
+            *,
+            chunk_size: int = 1000,
+            concurrency: int = None,
+            transaction: bool = False,
+            progress=None,
+            timeout: float = None
+    ):
+        """Run `executemany` by chunks, concurrently over pool connections
+
+        `args` (any iterable, consumed lazily) is split into chunks of
+        `chunk_size` argument sequences, run by up to `concurrency` (half
+        the pool's max size by default) connections at once: chunks may be
+        executed in any order. With `transaction`, each chunk runs in its
+        own transaction.
+
+        A connection is acquired per chunk, so other pool users queue up
+        with the chunks instead of waiting for the whole run. Still, a high
+        `concurrency` leaves them fewer connections while it runs.
+
+        `progress(done, total)` is called after each chunk, with the
+        number of argument sequences executed so far and `len(args)` (None
+        if unknown).
+
+        On error or cancellation the remaining chunks are cancelled, the
+        chunks already executed are not rolled back.
+        """
+        if chunk_size <= 0:
+            raise ValueError('chunk_size is expected to be greater than zero')
+        if concurrency is None:
+            concurrency = max(self.statistics().max_size // 2, 1)
+        elif concurrency <= 0:
+            raise ValueError('concurrency is expected to be greater than zero')
+        total = len(args) if hasattr(args, '__len__') else None
+        if total is not None:
+            # No need to hold more connections than there are chunks
+            concurrency = min(concurrency, -(-total // chunk_size))
+        done = 0
+        send_channel, receive_channel = trio.open_memory_channel(0)
+
+        async def _send_chunks():
+            async with send_channel:
+                iterator = iter(args)
+                while True:
+                    chunk = list(islice(iterator, chunk_size))
+                    if not chunk:
+                        break
+                    await send_channel.send(chunk)
+
+        async def _execute_chunks():
+            nonlocal done
+            async for chunk in receive_channel:
+                async with self.acquire() as conn:
+                    if transaction:
+                        async with conn.transaction():
+                            await conn.executemany(
+                                statement, chunk, timeout=timeout
+                            )
+                    else:
+                        await conn.executemany(
+                            statement, chunk, timeout=timeout
+                        )
+                done += len(chunk)
+                if progress is not None:
+                    progress(done, total)
+
+        async with receive_channel:
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(_send_chunks)
+                for _ in range(concurrency):
+                    nursery.start_soon(_execute_chunks)
+
+    def map(
+            self,
+            query,
+            args,
+            *,
+            concurrency: int = None,
+            ordered: bool = True,
+            method: str = 'fetch',
+            **kwargs
+    ):
+        """Run `query` once per argument sequence of `args`, concurrently
+
+        Return an async context manager yielding an async iterator over the
+        results, in the order of `args` or, with ``ordered=False``, as
+        ``(index, result)`` pairs in completion order. `args` (any iterable)
+        is consumed lazily.
+
+        Up to `concurrency` (the pool's max size by default) connections
+        each prepare `query` once and run it with `method` (``'fetch'``,
+        ``'fetchrow'`` or ``'fetchval'``), `kwargs` being passed along. At
+        most twice that many results are computed ahead of the consumer.
+
+        The first error cancels the other queries and is raised out of the
+        ``async with`` block. Leaving the block early cancels them too.
+        """
+        return _map(self, query, args, concurrency, ordered, method, kwargs)
+
+    async def fetch_many(self, query, args, **kwargs):
+        """Return the list of `map` results"""
+        async with self.map(query, args, **kwargs) as results:
+            return [result async for result in results]
+
+    def scan(
+            self,
+            table,
+            *,
+            key: str = None,
+            columns=None,
+            partitions: int = None,
+            concurrency: int = None,
+            page_size: int = 1000,
+            per_partition: bool = False
+    ):
+        """Read all the rows of `table`, by key ranges scanned concurrently
+
+        Return an async context manager yielding a channel of pages (lists
+        of up to `page_size` records) from all the partitions, in no
+        particular order. With `per_partition`, it yields instead a list of
+        channels, one per partition in key order, each to be consumed by
+        its own task.
+
+        `table` is split into `partitions` (`concurrency` by default) ranges
+        of `key` (the primary key by default, it must be a unique non null
+        column) whose boundaries are sampled with TABLESAMPLE. Up to
+        `concurrency` (the pool's max size by default) connections each
+        scan a range at a time, page by page with keyset pagination.
+        `columns` (all by default) always include `key`.
+
+        Pages are read in separate queries, not from a single snapshot.
+        Leaving the block early cancels the scan.
+        """
+        return _scan(
+            self, table, key, columns, partitions, concurrency, page_size,
+            per_partition
+        )
+
+    async def fetch(
+            self,
+            query,
+            *args,
+            timeout: float = None,
+            record_class=None,
+            max_rows=None,
+            max_bytes=None
+    ):
+        async with self.acquire() as conn:
+            return await conn.fetch(
+                query,
+                *args,
+                timeout=timeout,
+                record_class=record_class,
+                max_rows=max_rows,
+                max_bytes=max_bytes
+            )
+
+    @asynccontextmanager
+    async def stream(self, query, *args, **kwargs):
+        """Iterate over the rows of `query` by chunks
+
+        See `TrioConnectionProxy.stream`, the connection is held until the
+        ``async with`` block exits.
+        """
         async with self.acquire() as conn:
-            return await conn.fetch(query, *args, timeout=timeout)
+            async with conn.stream(query, *args, **kwargs) as rows:
+                yield rows
 
     async def fetchval(self, query, *args, timeout: float = None):
         async with self.acquire() as conn:
             return await conn.fetchval(query, *args, timeout=timeout)
 
-    async def fetchrow(self, query, *args, timeout: float = None):
+    async def fetchrow(
+            self, query, *args, timeout: float = None, record_class=None
+    ):
+        async with self.acquire() as conn:
+            return await conn.fetchrow(
+                query, *args, timeout=timeout, record_class=record_class
+            )
+
+    async def fetch_columns(self, query, *args, **kwargs):
+        async with self.acquire() as conn:
+            return await conn.fetch_columns(query, *args, **kwargs)
+
+    def notification_hub(self, **kwargs):
+        """Return a `NotificationHub` LISTENing on a connection of this pool"""
+        return NotificationHub(self, **kwargs)
+
+    def write_batcher(self, **kwargs):
+        """Return a `WriteBatcher` committing statements on this pool"""
+        return WriteBatcher(self, **kwargs)
+
+    def result_cache(self, **kwargs):
+        """Return a `ResultCache` caching read queries run on this pool"""
+        return ResultCache(self, **kwargs)
+
+    async def copy_from_query(self, query, *args, output, **kwargs):
+        async with self.acquire() as conn:
+            return await conn.copy_from_query(
+                query, *args, output=output, **kwargs
+            )
+
+    async def copy_from_table(self, table_name, *, output, **kwargs):
         async with self.acquire() as conn:
-            return await conn.fetchrow(query, *args, timeout=timeout)
+            return await conn.copy_from_table(
+                table_name, output=output, **kwargs
+            )
+
+    async def copy_to_table(self, table_name, *, source, **kwargs):
+        async with self.acquire() as conn:
+            return await conn.copy_to_table(
+                table_name, source=source, **kwargs
+            )
+
+    async def copy_records_to_table(self, table_name, *, records, **kwargs):
+        async with self.acquire() as conn:
+            return await conn.copy_records_to_table(
+                table_name, records=records, **kwargs
+            )
 
     @_shielded
     @trio_asyncio.aio_as_trio
@@ -267,3 +1236,454 @@ class TrioPoolProxy:
 
     async def __aexit__(self, *exc):
         return await self.close()
+
+
+class _PooledConnection:
+    __slots__ = ('asyncpg_conn', 'conn_proxy', 'released_at', 'acquisition')
+
+    def __init__(self):
+        # None until the connection has been opened by the first user
+        self.asyncpg_conn = None
+        self.conn_proxy = None
+        self.released_at = None
+        self.acquisition = None
+
+
+class TrioNativePoolAcquireContext:
+    def __init__(self, pool):
+        self._pool = pool
+        self._pooled = None
+
+    async def __aenter__(self):
+        self._pooled = await self._pool._acquire()
+        try:
+            if self._pooled.asyncpg_conn is None:
+                await self._pool._aio_open(self._pooled)
+        except BaseException:
+            self._pool._release(self._pooled, discard=True)
+            raise
+        self._pooled.conn_proxy = _get_connection_proxy(
+            self._pooled.conn_proxy, self._pooled.asyncpg_conn,
+            self._pool._tracer, self._pool._statement_registry,
+            self._pool._fetch_limits
+        )
+        return self._pooled.conn_proxy
+
+    async def __aexit__(self, *exc):
+        if _is_cancelled(exc[1]):
+            self._pool._release_in_background(self._pooled)
+            return
+        await self._pool._reset_and_release(self._pooled)
+
+
+class TrioNativePool(TrioPoolProxy):
+    """Connection pool whose bookkeeping lives entirely on the trio side
+
+    Waiting for a connection is done on a FIFO `trio.Semaphore` and idle
+    connections are kept in a trio-side stack, so the convenience methods
+    (`execute`, `fetch`...) cross the asyncio loop exactly once: to run the
+    query (and open the connection first if needed).
+
+    Unlike asyncpg's pool, connections used by the convenience methods are
+    not `reset()` on release (they are discarded if left in a transaction).
+    Connections from `acquire()` are reset as usual.
+
+    With a `target_acquire_wait` (in seconds), the number of connections
+    let out at once adapts to the load between `min_size` (or 1) and
+    `max_size`, starting from the former: every `resize_interval` seconds,
+    it grows when acquiring took longer than that on average and shrinks
+    when connections were left unused, closing idle ones beyond it.
+
+    Accept the same arguments as `asyncpg.create_pool` except for `setup`,
+    `reset` and `connect`.
+    """
+
+    # Time given to a discarded connection to close gracefully
+    CLOSE_TIMEOUT = 10
+
+    def __init__(
+            self,
+            *args,
+            min_size=10,
+            max_size=10,
+            max_queries=50000,
+            max_inactive_connection_lifetime=300.0,
+            init=None,
+            track_call_sites=False,
+            tracer=None,
+            prepared_statement_cache_size=None,
+            warm_up_queries=None,
+            type_codecs=None,
+            target_acquire_wait=None,
+            resize_interval=1.0,
+            fetch_max_rows=None,
+            fetch_max_bytes=None,
+            **kwargs
+    ):
+        if max_size <= 0:
+            raise ValueError('max_size is expected to be greater than zero')
+        if min_size < 0 or min_size > max_size:
+            raise ValueError(
+                'min_size is expected to be between 0 and max_size'
+            )
+        if max_queries <= 0:
+            raise ValueError('max_queries is expected to be greater than zero')
+        unsupported = sorted(
+            name for name in ('setup', 'reset', 'connect') if name in kwargs
+        )
+        if unsupported:
+            raise TypeError(
+                'trio native pool does not support {} argument(s), use a '
+                'pool created with trio_native=False instead'.format(
+                    ', '.join(unsupported)
+                )
+            )
+        self._type_cache = _TypeCache()
+        kwargs['connection_class'] = self._type_cache.connection_class(
+            kwargs.get('connection_class', asyncpg.Connection)
+        )
+        self._asyncpg_create_connection = partial(
+            asyncpg.connect, *args, **kwargs
+        )
+        self._min_size = min_size
+        self._max_size = max_size
+        self._max_queries = max_queries
+        self._max_inactive_connection_lifetime = (
+            max_inactive_connection_lifetime
+        )
+        self._init = _warm_up_init(
+            init, warm_up_queries, type_codecs, self._type_cache
+        )
+        self._metrics = _PoolMetrics(track_call_sites)
+        self._tracer = tracer
+        self._statement_registry = _statement_registry(
+            prepared_statement_cache_size
+        )
+        self._fetch_limits = _fetch_limits(fetch_max_rows, fetch_max_bytes)
+        if target_acquire_wait is None:
+            self._size_controller = None
+            self._target_size = max_size
+        else:
+            self._size_controller = _SizeController(
+                min_size, max_size, target_acquire_wait, resize_interval
+            )
+            self._target_size = self._size_controller.target_size
+        self._slots = trio.Semaphore(self._target_size)
+        # Slots to take back from connections in use as they are released,
+        # after the target size shrank below the number in use
+        self._slots_to_withdraw = 0
+        # Most connections in use at once since the last resize decision
+        self._peak_in_use = 0
+        # Most recently released last, so the least used connections age
+        # at the bottom of the stack until they expire
+        self._idle = deque()
+        self._in_use = set()
+        self._size = 0
+        self._all_released = trio.Event()
+        self._closing = False
+        self._nursery = None
+        self._nursery_manager = None
+
+    async def _aio_connect(self):
+        asyncpg_conn = await self._asyncpg_create_connection()
+        try:
+            await self._init(asyncpg_conn)
+        except BaseException:
+            asyncpg_conn.terminate()
+            raise
+        return asyncpg_conn
+
+    @trio_asyncio.aio_as_trio
+    async def _aio_open(self, pooled):
+        pooled.asyncpg_conn = await self._aio_connect()
+
+    @trio_asyncio.aio_as_trio
+    async def _aio_call(self, pooled, method, args, kwargs, event=None):
+        if pooled.asyncpg_conn is None:
+            pooled.asyncpg_conn = await self._aio_connect()
+        if kwargs.get('limits') is None:
+            aio_callable = getattr(pooled.asyncpg_conn, method)
+        else:
+            # A fetch bounded by `_fetch_limits`
+            aio_callable = partial(_aio_guarded_fetch, pooled.asyncpg_conn)
+        if event is None:
+            return await aio_callable(*args, **kwargs)
+        return await _aio_timed(event, aio_callable, args, kwargs)
+
+    async def _acquire(self):
+        acquisition = self._metrics.acquire_started()
+        try:
+            await self._acquire_slot()
+        except BaseException:
+            self._metrics.acquire_failed(acquisition)
+            raise
+        self._metrics.acquired(acquisition)
+        if self._metrics.in_use > self._peak_in_use:
+            self._peak_in_use = self._metrics.in_use
+
+        while self._idle:
+            pooled = self._idle.pop()
+            if not pooled.asyncpg_conn.is_closed():
+                break
+            self._size -= 1
+        else:
+            pooled = _PooledConnection()
+            self._size += 1
+        pooled.acquisition = acquisition
+        self._in_use.add(pooled)
+        return pooled
+
+    async def _acquire_slot(self):
+        if self._nursery is None or self._closing:
+            raise asyncpg.InterfaceError('pool is closed')
+        await self._slots.acquire()
+        if self._closing:
+            self._slots.release()
+            raise asyncpg.InterfaceError('pool is closed')
+
+    def _release(self, pooled, discard=False):
+        self._in_use.discard(pooled)
+        self._metrics.released(pooled.acquisition)
+        asyncpg_conn = pooled.asyncpg_conn
+        if (discard or asyncpg_conn is None or asyncpg_conn.is_closed()
+                or asyncpg_conn.is_in_transaction()
+                or asyncpg_conn._protocol.queries_count >= self._max_queries
+                or self._size > self._target_size):
+            self._discard(pooled)
+        else:
+            pooled.released_at = trio.current_time()
+            self._idle.append(pooled)
+        if self._slots_to_withdraw:
+            self._slots_to_withdraw -= 1
+        else:
+            self._slots.release()
+        if self._closing and not self._in_use:
+            self._all_released.set()
+
+    def _discard(self, pooled):
+        self._size -= 1
+        asyncpg_conn = pooled.asyncpg_conn
+        if asyncpg_conn is not None and not asyncpg_conn.is_closed():
+            self._nursery.start_soon(self._close_connection, asyncpg_conn)
+
+    async def _close_connection(self, asyncpg_conn):
+        with trio.CancelScope(shield=True):
+            with trio.move_on_after(self.CLOSE_TIMEOUT):
+                try:
+                    await trio_asyncio.aio_as_trio(asyncpg_conn.close)()
+                    return
+                except Exception:
+                    pass
+            asyncpg_conn.terminate()
+
+    @_shielded
+    async def _reset_and_release(self, pooled):
+        try:
+            await trio_asyncio.aio_as_trio(pooled.asyncpg_conn.reset)()
+        except Exception:
+            self._release(pooled, discard=True)
+        else:
+            self._release(pooled)
+
+    def _release_in_background(self, pooled):
+        self._nursery.start_soon(self._recover_and_release, pooled)
+
+    async def _recover_and_release(self, pooled):
+        asyncpg_conn = pooled.asyncpg_conn
+        if asyncpg_conn is None or asyncpg_conn.is_closed():
+            self._release(pooled)
+            return
+        try:
+            with trio.fail_after(_cancel.CANCEL_RECOVERY_TIMEOUT):
+                await trio_asyncio.aio_as_trio(asyncpg_conn.reset)()
+        except Exception:
+            asyncpg_conn.terminate()
+            self._release(pooled, discard=True)
+        else:
+            self._release(pooled)
+
+    async def _run(self, method, *args, **kwargs):
+        pooled = await self._acquire()
+        try:
+            result = await self._call(pooled, method, args, **kwargs)
+        except (asyncpg.PostgresError, ResultTooLargeError):
+            # The connection itself is fine
+            self._release(pooled)
+            raise
+        except trio.Cancelled:
+            self._release_in_background(pooled)
+            raise
+        except BaseException:
+            self._release(pooled, discard=True)
+            raise
+        self._release(pooled)
+        return result
+
+    @_bounded_by_deadline
+    async def _call(self, pooled, method, args, **kwargs):
+        if self._tracer is None:
+            return await self._aio_call(pooled, method, args, kwargs)
+        event = QueryEvent(
+            method, *_describe_connection_query(method, args, kwargs)
+        )
+        return await _trace_query(
+            self._tracer, event, self._aio_call, pooled, method, args, kwargs,
+            event
+        )
+
+    async def _expire_idle_connections(self):
+        lifetime = self._max_inactive_connection_lifetime
+        while True:
+            await trio.sleep(lifetime / 2)
+            expired_before = trio.current_time() - lifetime
+            while (self._idle and self._size > self._min_size
+                   and self._idle[0].released_at < expired_before):
+                self._discard(self._idle.popleft())
+
+    async def _adapt_size(self):
+        while True:
+            await trio.sleep(self._size_controller.interval)
+            target_size = self._size_controller.decide(
+                self._metrics, self._peak_in_use
+            )
+            self._peak_in_use = self._metrics.in_use
+            self._set_target_size(target_size)
+
+    def _set_target_size(self, target_size):
+        change = target_size - self._target_size
+        self._target_size = target_size
+        for _ in range(change):
+            if self._slots_to_withdraw:
+                self._slots_to_withdraw -= 1
+            else:
+                self._slots.release()
+        for _ in range(-change):
+            try:
+                self._slots.acquire_nowait()
+            except trio.WouldBlock:
+                self._slots_to_withdraw += 1
+        while self._size > target_size and self._idle:
+            self._discard(self._idle.popleft())
+
+    async def _open_initial_connection(self):
+        pooled = _PooledConnection()
+        self._size += 1
+        try:
+            await self._aio_open(pooled)
+        except BaseException:
+            self._size -= 1
+            raise
+        pooled.released_at = trio.current_time()
+        self._idle.append(pooled)
+
+    def acquire(self):
+        return TrioNativePoolAcquireContext(self)
+
+    async def execute(self, statement: str, *args, timeout: float = None):
+        return await self._run('execute', statement, *args, timeout=timeout)
+
+    async def executemany(
+            self, statement: str, args, *, timeout: float = None
+    ):
+        return await self._run('executemany', statement, args, timeout=timeout)
+
+    async def fetch(
+            self,
+            query,
+            *args,
+            timeout: float = None,
+            record_class=None,
+            max_rows=None,
+            max_bytes=None
+    ):
+        kwargs = {'timeout': timeout}
+        limits = _fetch_limits(max_rows, max_bytes, self._fetch_limits)
+        if limits is not None:
+            kwargs['limits'] = limits
+        return await _fetch_with_record_class(
+            partial(self._run, 'fetch'), _build_rows, record_class,
+            (query,) + args, kwargs
+        )
+
+    async def fetchval(self, query, *args, timeout: float = None):
+        return await self._run('fetchval', query, *args, timeout=timeout)
+
+    async def fetchrow(
+            self, query, *args, timeout: float = None, record_class=None
+    ):
+        return await _fetch_with_record_class(
+            partial(self._run, 'fetchrow'), _build_row, record_class,
+            (query,) + args, {'timeout': timeout}
+        )
+
+    def get_size(self):
+        return self._size
+
+    def get_idle_size(self):
+        return len(self._idle)
+
+    def get_min_size(self):
+        return self._min_size
+
+    def get_max_size(self):
+        return self._max_size
+
+    def statistics(self):
+        return self._metrics.statistics(
+            size=self._size,
+            min_size=self._min_size,
+            max_size=self._max_size,
+            idle=len(self._idle),
+            statement_cache=self._statement_cache_statistics(),
+            target_size=self._target_size,
+            resizes=(
+                self._size_controller.resizes
+                if self._size_controller is not None else ()
+            ),
+        )
+
+    @_shielded
+    async def close(self):
+        """Wait for all connections to be released, then close them"""
+        self._closing = True
+        if self._in_use:
+            await self._all_released.wait()
+        while self._idle:
+            self._discard(self._idle.pop())
+
+    def terminate(self):
+        self._closing = True
+        for pooled in [*self._idle, *self._in_use]:
+            if pooled.asyncpg_conn is not None:
+                pooled.asyncpg_conn.terminate()
+        self._idle.clear()
+
+    async def __aenter__(self):
+        if self._nursery is not None:
+            return self
+        # The pool owns a nursery for its background work (closing discarded
+        # connections, expiring idle ones) for as long as it is open
+        nursery_manager = trio.open_nursery()
+        nursery = await nursery_manager.__aenter__()
+        try:
+            async with trio.open_nursery() as initial_nursery:
+                for _ in range(self._min_size):
+                    initial_nursery.start_soon(self._open_initial_connection)
+        except BaseException as exc:
+            self.terminate()
+            await nursery_manager.__aexit__(type(exc), exc, exc.__traceback__)
+            raise
+        self._nursery_manager = nursery_manager
+        self._nursery = nursery
+        if self._max_inactive_connection_lifetime:
+            nursery.start_soon(self._expire_idle_connections)
+        if self._size_controller is not None:
+            nursery.start_soon(self._adapt_size)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        # Only the idle expiration loop is left to be cancelled, connections
+        # being closed are shielded
+        self._nursery.cancel_scope.cancel()
+        return await self._nursery_manager.__aexit__(*exc)
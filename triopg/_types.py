@@ -0,0 +1,96 @@
+import asyncpg
+from asyncpg import introspection
+
+
+class _TypeCache:
+    """Type introspection results shared by the connections of a pool
+
+    asyncpg introspects the types used by a statement (and the types given
+    to `set_type_codec`) once per connection. Pools record what any of their
+    connections introspected, and hand it to new connections, so reconnects
+    and connection churn don't query the catalog again.
+    """
+
+    def __init__(self):
+        # Introspected type rows, by oid
+        self._types = {}
+        # `set_type_codec` arguments resolved to `add_python_codec` ones
+        self._codecs = {}
+
+    def connection_class(self, base=asyncpg.Connection):
+        """Return a `base` subclass recording its introspected types here"""
+        type_cache = self
+
+        class TypeCachingConnection(base):
+            async def _introspect_types(self, typeoids, timeout):
+                result = await super()._introspect_types(typeoids, timeout)
+                type_cache.add_types(result[0])
+                return result
+
+            def _drop_local_type_cache(self):
+                # The schema changed (or asyncpg is told so)
+                super()._drop_local_type_cache()
+                type_cache.clear()
+
+        return TypeCachingConnection
+
+    def add_types(self, types):
+        self._types.update((row['oid'], row) for row in types)
+
+    def clear(self):
+        self._types.clear()
+        self._codecs.clear()
+
+    async def setup_connection(self, asyncpg_conn, type_codecs):
+        """Give a new connection the known types, then `type_codecs`"""
+        if self._types:
+            asyncpg_conn._protocol.get_settings().register_data_types(
+                list(self._types.values())
+            )
+        for codec in type_codecs:
+            await self.set_type_codec(asyncpg_conn, **codec)
+
+    async def set_type_codec(
+            self,
+            asyncpg_conn,
+            typename,
+            *,
+            schema='public',
+            encoder,
+            decoder,
+            format='text'
+    ):
+        """Same as `asyncpg.Connection.set_type_codec`, introspecting once"""
+        resolved = self._codecs.get((typename, schema, format))
+        if resolved is None:
+            resolved = await self._resolve_codec(
+                asyncpg_conn, typename, schema, format
+            )
+            if resolved is None:
+                # Unsupported type, let asyncpg raise the appropriate error
+                return await asyncpg_conn.set_type_codec(
+                    typename,
+                    schema=schema,
+                    encoder=encoder,
+                    decoder=decoder,
+                    format=format
+                )
+            self._codecs[typename, schema, format] = resolved
+        oid, typeinfos, kind = resolved
+        asyncpg_conn._protocol.get_settings().add_python_codec(
+            oid, typename, schema, typeinfos, kind, encoder, decoder, format
+        )
+        asyncpg_conn._drop_local_statement_cache()
+
+    async def _resolve_codec(self, asyncpg_conn, typename, schema, format):
+        typeinfo = await asyncpg_conn._introspect_type(typename, schema)
+        if introspection.is_domain_type(typeinfo):
+            return None
+        if introspection.is_scalar_type(typeinfo):
+            return typeinfo['oid'], [], 'scalar'
+        if introspection.is_composite_type(typeinfo) and format == 'tuple':
+            typeinfos, _ = await asyncpg_conn._introspect_types(
+                (typeinfo['oid'],), 10
+            )
+            return typeinfo['oid'], typeinfos, 'composite'
+        return None
@@ -0,0 +1,20 @@
+def _warm_up_init(init, warm_up_queries, type_codecs, type_cache):
+    """Return a pool `init` coroutine function also warming up connections
+
+    New connections get the types known to `type_cache` and `type_codecs`
+    (`set_type_codec` keyword arguments), run `init`, then prepare
+    `warm_up_queries` into asyncpg's statement cache, which also introspects
+    the types they use. Run on the asyncio side, by the pool opening the
+    connection.
+    """
+    warm_up_queries = tuple(warm_up_queries or ())
+    type_codecs = tuple(dict(codec) for codec in type_codecs or ())
+
+    async def warm_up(asyncpg_conn):
+        await type_cache.setup_connection(asyncpg_conn, type_codecs)
+        if init is not None:
+            await init(asyncpg_conn)
+        for query in warm_up_queries:
+            await asyncpg_conn._prepare(query, use_cache=True)
+
+    return warm_up